@@ -0,0 +1,92 @@
+#
+# Concurrent upload benchmark.
+#
+# Starts the backend with uvicorn on a scratch data directory and sends --concurrency
+# simultaneous POST /upload/ requests of --files_per_upload images each, every request
+# into its own folder, while a probe requests GET /openapi.json (an async route, so it
+# waits only for the event loop, not for a worker thread) every 10 ms. Reports the wall time,
+# per-request latency and the probe latency (a blocked event loop shows up there), and
+# checks that every file was written and got its own database record.
+#
+# Run from the repository root:  python -m backend.benchmark_concurrent_uploads
+#
+
+import os
+import time
+import asyncio
+import tempfile
+import threading
+from argparse import ArgumentParser
+import httpx
+from .check_resumable_upload import free_port, start_server
+
+def percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q / 100 * len(values)))]
+
+async def upload(client, index, payloads):
+    files = [("files", ("image_{:03d}.jpg".format(i), data, "image/jpeg")) for i, data in enumerate(payloads)]
+    start = time.perf_counter()
+    r = await client.post("/upload/", files=files, data={"stage": "image", "finalFolderName": "batch_{:03d}".format(index)})
+    r.raise_for_status()
+    return time.perf_counter() - start, r.json()
+
+def probe(base_url, stop, latencies):
+    # own thread and connection, so the uploading client's event loop does not delay it
+    with httpx.Client(base_url=base_url, timeout=60) as client:
+        while not stop.is_set():
+            start = time.perf_counter()
+            client.get("/openapi.json").raise_for_status()
+            latencies.append(time.perf_counter() - start)
+            stop.wait(0.01)
+
+async def run(base_url, args):
+    payloads = [os.urandom(args.file_kb * 1024) for _ in range(args.files_per_upload)]
+    limits = httpx.Limits(max_connections=None, max_keepalive_connections=None)
+    async with httpx.AsyncClient(base_url=base_url, timeout=300, limits=limits) as client:
+        (await client.post("/auth/register", json={"username": "bench", "email": "bench@example.com", "password": "secret"})).raise_for_status()
+        token = (await client.post("/auth/login", json={"username": "bench", "password": "secret"})).json()["access_token"]
+        client.headers["Authorization"] = "Bearer " + token
+
+        stop, probe_latencies = threading.Event(), []
+        probe_thread = threading.Thread(target=probe, args=(base_url, stop, probe_latencies))
+        probe_thread.start()
+        start = time.perf_counter()
+        try:
+            results = await asyncio.gather(*(upload(client, i, payloads) for i in range(args.concurrency)))
+        finally:
+            elapsed = time.perf_counter() - start
+            stop.set()
+            probe_thread.join()
+    return elapsed, results, probe_latencies
+
+if __name__ == "__main__":
+    parser = ArgumentParser(description="Concurrent upload benchmark")
+    parser.add_argument("--concurrency", type=int, default=100)
+    parser.add_argument("--files_per_upload", type=int, default=5)
+    parser.add_argument("--file_kb", type=int, default=256)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        port = free_port()
+        server = start_server(workdir, port)
+        try:
+            elapsed, results, probe_latencies = asyncio.run(run("http://127.0.0.1:{}".format(port), args))
+        finally:
+            server.kill()
+            server.wait()
+
+        latencies = [latency for latency, _ in results]
+        records = [record for _, body in results for record in body["uploaded_files"]]
+        total = args.concurrency * args.files_per_upload
+        assert len(records) == total and len({record["id"] for record in records}) == total, "missing file records"
+        assert all(os.path.getsize(os.path.join(workdir, record["path"])) == args.file_kb * 1024 for record in records)
+        print("{} concurrent uploads of {} x {} KB: {:.2f}s ({:.1f} MB/s, {:.0f} files/s)".format(
+            args.concurrency, args.files_per_upload, args.file_kb, elapsed,
+            total * args.file_kb / 1024 / elapsed, total / elapsed))
+        print("  request latency p50 {:.0f} ms, p95 {:.0f} ms, max {:.0f} ms".format(
+            percentile(latencies, 50) * 1000, percentile(latencies, 95) * 1000, max(latencies) * 1000))
+        print("  GET /openapi.json during the uploads: {} requests, p50 {:.1f} ms, p99 {:.1f} ms, max {:.1f} ms".format(
+            len(probe_latencies), percentile(probe_latencies, 50) * 1000, percentile(probe_latencies, 99) * 1000,
+            max(probe_latencies) * 1000))
+    print("OK")
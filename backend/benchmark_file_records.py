@@ -0,0 +1,87 @@
+#
+# File record insert benchmark.
+#
+# Writes --num_files small JPEG frames into a scratch upload directory and creates their
+# database records once per file (create_file_record, one commit each, as the upload and
+# frame-extraction loops used to) and in a single transaction (create_file_records, with
+# and without returning the ids), reporting records/s and checking the rows written. The
+# batched runs also report the insert alone, without reading each file's metadata.
+#
+# Run from the repository root:  python -m backend.benchmark_file_records
+#
+
+import os
+import io
+import time
+import tempfile
+from argparse import ArgumentParser
+from PIL import Image
+
+def write_frames(folder, num_files):
+    os.makedirs(folder)
+    buffer = io.BytesIO()
+    Image.new("RGB", (64, 48), (40, 80, 120)).save(buffer, "JPEG")
+    files = []
+    for i in range(num_files):
+        name = "frame_{:06d}.jpg".format(i)
+        path = os.path.join(folder, name)
+        with open(path, "wb") as f:
+            f.write(buffer.getvalue())
+        files.append((name, path))
+    return files
+
+if __name__ == "__main__":
+    parser = ArgumentParser(description="File record insert benchmark")
+    parser.add_argument("--num_files", type=int, default=10000)
+    args = parser.parse_args()
+
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as workdir:
+        # settings create the upload directory under the working directory
+        os.chdir(workdir)
+        os.environ["DB_URL"] = "sqlite:///" + os.path.join(workdir, "user.db")
+        from .database import Base, engine, SessionLocal
+        from .core.config import settings
+        from .models import file_model, job_model, user_model  # registers the tables and mappers
+        from .services import file_service
+
+        Base.metadata.create_all(bind=engine)
+        db = SessionLocal()
+        user = user_model.User(username="bench", email="bench@example.com", hashed_password="-")
+        db.add(user)
+        db.commit()
+
+        def per_file(files):
+            for name, path in files:
+                file_service.create_file_record(db, name, path, user.id)
+
+        def batched(return_ids):
+            def insert(files):
+                # create_file_records, with the metadata scan timed apart from the insert
+                mappings = file_service.build_file_mappings(files, user.id)
+                scanned = time.perf_counter()
+                file_service.insert_file_mappings(db, mappings, return_ids=return_ids)
+                return time.perf_counter() - scanned
+            return insert
+
+        variants = [
+            ("one commit per file", per_file),
+            ("single transaction", batched(True)),
+            ("single transaction, no ids", batched(False)),
+        ]
+        for i, (name, insert) in enumerate(variants):
+            folder = os.path.join(settings.upload_base_dir, "bench", "images", "run{}".format(i))
+            files = write_frames(folder, args.num_files)
+            start = time.perf_counter()
+            insert_time = insert(files)
+            elapsed = time.perf_counter() - start
+            count = db.query(file_model.File).filter(file_model.File.path.startswith(os.path.join(folder, ""))).count()
+            assert count == args.num_files, "{} records written, expected {}".format(count, args.num_files)
+            line = "{:<27} {} records in {:6.2f}s ({:6.0f} records/s)".format(name, args.num_files, elapsed, args.num_files / elapsed)
+            if insert_time is not None:
+                line += ", insert alone {:6.2f}s ({:6.0f} records/s)".format(insert_time, args.num_files / insert_time)
+            print(line)
+        db.close()
+        engine.dispose()
+        os.chdir(cwd)
+    print("OK")
@@ -0,0 +1,117 @@
+#
+# GET /files/get_files benchmark on a synthetic tree.
+#
+# Builds --folders folders of --files_per_folder frames (200k files by default) under a
+# scratch upload directory and times, for one page of --page_size entries:
+#   - the previous full scan (os.listdir + os.stat per entry, then listing every folder
+#     again to count its images);
+#   - the unauthenticated disk listing, cold (empty directory cache) and warm;
+#   - the listing of a registered user, served from the catalog: the first request builds
+#     it, later ones query one page, and a folder written outside the API appears in the
+#     next request.
+# Totals and image counts are checked against the full scan.
+#
+# Run from the repository root:  python -m backend.benchmark_listing
+#
+
+import os
+import time
+import tempfile
+from argparse import ArgumentParser
+
+IMAGE_EXTS = {'.jpg', '.jpeg', '.png', '.bmp', '.tiff', '.tif', '.webp'}
+
+def make_tree(stage_dir, folders, files_per_folder):
+    for i in range(folders):
+        folder = os.path.join(stage_dir, "video_{:03d}".format(i))
+        os.makedirs(folder)
+        for j in range(files_per_folder):
+            open(os.path.join(folder, "frame_{:06d}.jpg".format(j)), "wb").close()
+    for j in range(10):
+        open(os.path.join(stage_dir, "upload_{:02d}.mp4".format(j)), "wb").close()
+
+def full_scan(stage_dir):
+    folders, files = {}, []
+    for name in sorted(os.listdir(stage_dir)):
+        path = os.path.join(stage_dir, name)
+        stat = os.stat(path)
+        if os.path.isdir(path):
+            folders[name] = sum(1 for f in os.listdir(path) if os.path.splitext(f)[1].lower() in IMAGE_EXTS)
+        else:
+            files.append((name, stat.st_size))
+    return folders, files
+
+def timed(fn, *args, **kwargs):
+    start = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+if __name__ == "__main__":
+    parser = ArgumentParser(description="Directory listing benchmark")
+    parser.add_argument("--folders", type=int, default=40)
+    parser.add_argument("--files_per_folder", type=int, default=5000)
+    parser.add_argument("--page_size", type=int, default=100)
+    parser.add_argument("--repeats", type=int, default=20)
+    args = parser.parse_args()
+
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as workdir:
+        # settings create the upload directory under the working directory
+        os.chdir(workdir)
+        os.environ["DB_URL"] = "sqlite:///" + os.path.join(workdir, "user.db")
+        from fastapi.testclient import TestClient
+        from .main import app
+        from .utils.dir_cache import directory_cache
+
+        stage_dir = os.path.join("data", "images")
+        print("Writing {} files...".format(args.folders * args.files_per_folder))
+        make_tree(stage_dir, args.folders, args.files_per_folder)
+        # the same tree as the stage of a registered user
+        os.makedirs(os.path.join("data", "bench"))
+        os.symlink(os.path.abspath(stage_dir), os.path.join("data", "bench", "images"))
+        # directories modified within the last second are not cached
+        time.sleep(1.5)
+
+        (folders, files), elapsed = timed(full_scan, stage_dir)
+        print("full scan                  {:8.1f} ms".format(elapsed * 1000))
+
+        def check(listing):
+            assert listing["total_folders"] == len(folders) and listing["total_files"] == len(files), listing.get("error")
+            for folder in listing["folders"]:
+                assert folder["image_count"] == folders[folder["name"]]
+
+        with TestClient(app) as client:
+            params = {"stage": "image", "page": 1, "page_size": args.page_size}
+            directory_cache.invalidate()
+            response, elapsed = timed(client.get, "/files/get_files", params=params)
+            check(response.json())
+            print("disk listing, cold         {:8.1f} ms".format(elapsed * 1000))
+            start = time.perf_counter()
+            for _ in range(args.repeats):
+                check(client.get("/files/get_files", params=params).json())
+            print("disk listing, warm         {:8.1f} ms".format((time.perf_counter() - start) / args.repeats * 1000))
+
+            client.post("/auth/register", json={"username": "bench", "email": "bench@example.com", "password": "secret"}).raise_for_status()
+            params["username"] = "bench"
+            response, elapsed = timed(client.get, "/files/get_files", params=params)
+            check(response.json())
+            print("catalog, first request     {:8.1f} ms (builds the catalog)".format(elapsed * 1000))
+            for page in sorted({1, -(-(len(folders) + len(files)) // args.page_size)}):
+                params["page"] = page
+                start = time.perf_counter()
+                for _ in range(args.repeats):
+                    check(client.get("/files/get_files", params=params).json())
+                print("catalog, page {:<12} {:8.1f} ms".format(page, (time.perf_counter() - start) / args.repeats * 1000))
+
+            # a folder written outside the API (e.g. by frame extraction) shows up in the next listing
+            os.makedirs(os.path.join(stage_dir, "video_new"))
+            for j in range(args.page_size):
+                open(os.path.join(stage_dir, "video_new", "frame_{:06d}.jpg".format(j)), "wb").close()
+            time.sleep(1.5)
+            folders, files = full_scan(stage_dir)
+            params["page"] = 1
+            response, elapsed = timed(client.get, "/files/get_files", params=params)
+            check(response.json())
+            print("catalog, after new folder  {:8.1f} ms (reconciles inline)".format(elapsed * 1000))
+        os.chdir(cwd)
+    print("OK")
@@ -0,0 +1,107 @@
+#
+# Parallel frame extraction check.
+#
+# Extracts the same video three ways: with a single decoder, with the default plan
+# (the first frames are timed in-process and the rest is split across the shared
+# process pool only when each segment's work is large compared to its measured
+# open/seek cost), and forced into one segment per worker. All three must write the
+# same frame files with identical contents, and the default plan must be faster than
+# the single decoder whenever it decided to split; it never uses more processes than
+# there are usable CPUs. Without --video a synthetic clip is written whose frames carry their own
+# index as a row of black/white blocks, so the check also verifies that frame_N holds
+# source frame N * frame_interval. Pass a real H.264/HEVC file with --video to check
+# seeking on codecs with long GOPs.
+#
+# Run from the repository root:  python -m backend.check_frame_extraction
+#
+
+import os
+import time
+import filecmp
+import tempfile
+from argparse import ArgumentParser
+import cv2
+import numpy as np
+from .services import frame_extraction
+from .services.frame_extraction import extract_frames, shutdown_process_pool, _usable_cpus
+
+INDEX_BITS = 12
+BLOCK = 16
+BLOCK_HEIGHT = 32
+
+def write_indexed_video(path, num_frames, width, height, fps=30):
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"mp4v"), fps, (width, height))
+    if not writer.isOpened():
+        raise RuntimeError("cannot write mp4v video")
+    # a moving texture so frames cost about as much to decode as camera footage
+    texture = np.random.default_rng(0).integers(0, 256, (height, 2 * width, 3), np.uint8)
+    for i in range(num_frames):
+        shift = (4 * i) % width
+        frame = np.ascontiguousarray(texture[:, shift:shift + width])
+        for bit in range(INDEX_BITS):
+            frame[:BLOCK_HEIGHT, bit * BLOCK:(bit + 1) * BLOCK] = 255 if (i >> bit) & 1 else 0
+        writer.write(frame)
+    writer.release()
+
+def read_index(path):
+    frame = cv2.imread(path)
+    return sum(1 << bit for bit in range(INDEX_BITS) if frame[BLOCK_HEIGHT // 2, bit * BLOCK + BLOCK // 2, 0] > 127)
+
+def extract(label, video, output, workers, **kwargs):
+    start = time.perf_counter()
+    stats = extract_frames(video, output, workers=workers, **kwargs)
+    elapsed = time.perf_counter() - start
+    print("  {:<22} {} frames, {} segment(s), {:.2f}s".format(label, stats.saved_frames, stats.segments, elapsed))
+    return stats, elapsed
+
+if __name__ == "__main__":
+    parser = ArgumentParser(description="Serial vs parallel frame extraction check")
+    parser.add_argument("--video", type=str, default=None)
+    parser.add_argument("--num_frames", type=int, default=2400)
+    parser.add_argument("--width", type=int, default=1280)
+    parser.add_argument("--height", type=int, default=720)
+    parser.add_argument("--workers", type=int, default=_usable_cpus())
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as root:
+        video = args.video
+        if video is None:
+            video = os.path.join(root, "indexed.mp4")
+            write_indexed_video(video, args.num_frames, args.width, args.height)
+        try:
+            for options in ({"extract_all_frames": True}, {"frame_rate": 7}):
+                print("Options {}".format(options))
+                serial, planned, forced = (os.path.join(root, name) for name in ("serial", "planned", "forced"))
+                serial_stats, serial_time = extract("1 worker", video, serial, 1, **options)
+                planned_stats, planned_time = extract("{} workers, planned".format(args.workers), video, planned, args.workers, **options)
+                # split even where it does not pay off, to check the segment boundaries
+                forced_workers = max(2, args.workers)
+                min_work_ratio, usable_cpus = frame_extraction.MIN_WORK_RATIO, frame_extraction._usable_cpus
+                frame_extraction.MIN_WORK_RATIO, frame_extraction._usable_cpus = 0.0, lambda: forced_workers
+                try:
+                    forced_stats, _ = extract("{} workers, forced".format(forced_workers), video, forced, forced_workers, **options)
+                finally:
+                    frame_extraction.MIN_WORK_RATIO, frame_extraction._usable_cpus = min_work_ratio, usable_cpus
+
+                names = sorted(os.listdir(serial))
+                for folder in (planned, forced):
+                    assert names == sorted(os.listdir(folder)), "{} run wrote a different frame set".format(os.path.basename(folder))
+                    _, mismatch, errors = filecmp.cmpfiles(serial, folder, names, shallow=False)
+                    assert not mismatch and not errors, "frames differ: {}".format((mismatch + errors)[:5])
+                if args.video is None:
+                    interval = serial_stats.frame_interval
+                    wrong = [name for i, name in enumerate(names) if read_index(os.path.join(forced, name)) != i * interval]
+                    assert len(names) == -(-args.num_frames // interval) and not wrong, "misnumbered frames: {}".format(wrong[:5])
+                print("  {} frames identical".format(len(names)))
+
+                if planned_stats.segments > 1:
+                    assert planned_time < serial_time, "splitting was planned but made extraction slower"
+                    print("  planned split: {:.2f}x faster than 1 worker".format(serial_time / planned_time))
+                else:
+                    print("  not split (segments too short to pay for their open/seek cost, or 1 usable CPU): "
+                          "{:.2f}x the time of 1 worker".format(planned_time / serial_time))
+                for folder in (serial, planned, forced):
+                    for name in os.listdir(folder):
+                        os.remove(os.path.join(folder, name))
+        finally:
+            shutdown_process_pool()
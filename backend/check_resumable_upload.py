@@ -0,0 +1,141 @@
+#
+# Interrupted-upload check for the resumable upload protocol.
+#
+# Starts the backend with uvicorn on a scratch data directory, uploads part of a random
+# file, then SIGKILLs the server while a chunk body is half sent. After a restart the
+# session must report that chunk (and the ones never sent) as missing; resuming them and
+# finalizing must produce a file with the original sha256. Finally checks whole-file dedup:
+# a second init with the same sha256 is linked without transfer, but not once the indexed
+# file has been rewritten on disk.
+#
+# Run from the repository root:  python -m backend.check_resumable_upload
+#
+
+import os
+import sys
+import time
+import socket
+import hashlib
+import tempfile
+import subprocess
+from argparse import ArgumentParser
+import httpx
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+def start_server(workdir, port):
+    env = dict(os.environ, PYTHONPATH=REPO_ROOT, DB_URL="sqlite:///" + os.path.join(workdir, "user.db"))
+    server = subprocess.Popen([sys.executable, "-m", "uvicorn", "backend.main:app", "--port", str(port), "--log-level", "warning"],
+                              cwd=workdir, env=env)
+    deadline = time.time() + 30
+    while time.time() < deadline:
+        try:
+            httpx.get("http://127.0.0.1:{}/".format(port), timeout=1)
+            return server
+        except httpx.HTTPError:
+            time.sleep(0.2)
+    server.kill()
+    raise RuntimeError("server did not start")
+
+def put_chunk(client, upload_id, index, chunk_size, data):
+    chunk = data[index * chunk_size:(index + 1) * chunk_size]
+    r = client.put("/upload/resumable/" + upload_id, params={"offset": index * chunk_size}, content=chunk,
+                   headers={"X-Chunk-Sha256": hashlib.sha256(chunk).hexdigest()})
+    r.raise_for_status()
+    return r.json()
+
+if __name__ == "__main__":
+    parser = ArgumentParser(description="Resumable upload interruption check")
+    parser.add_argument("--size_mb", type=int, default=32)
+    parser.add_argument("--chunk_mb", type=int, default=4)
+    args = parser.parse_args()
+
+    data = os.urandom(args.size_mb * 2**20)
+    digest = hashlib.sha256(data).hexdigest()
+    chunk_size = args.chunk_mb * 2**20
+    num_chunks = (len(data) + chunk_size - 1) // chunk_size
+    sent = num_chunks // 2
+
+    with tempfile.TemporaryDirectory() as workdir:
+        port = free_port()
+        base_url = "http://127.0.0.1:{}".format(port)
+        server = start_server(workdir, port)
+        try:
+            client = httpx.Client(base_url=base_url, timeout=60)
+            client.post("/auth/register", json={"username": "resume", "email": "resume@example.com", "password": "secret"}).raise_for_status()
+            token = client.post("/auth/login", json={"username": "resume", "password": "secret"}).json()["access_token"]
+            client.headers["Authorization"] = "Bearer " + token
+
+            status = client.post("/upload/resumable/init", json={"filename": "video.bin", "total_size": len(data), "chunk_size": chunk_size,
+                                                                  "finalFolderName": "resume", "file_sha256": digest}).json()
+            upload_id = status["upload_id"]
+            for index in range(sent):
+                put_chunk(client, upload_id, index, chunk_size, data)
+
+            # kill the server once half of the next chunk's body is on the wire
+            chunk = data[sent * chunk_size:(sent + 1) * chunk_size]
+            def slow_body():
+                for i in range(0, len(chunk), 2**16):
+                    if i >= len(chunk) // 2 and server.poll() is None:
+                        server.kill()
+                        server.wait()
+                    yield chunk[i:i + 2**16]
+            try:
+                client.put("/upload/resumable/" + upload_id, params={"offset": sent * chunk_size}, content=slow_body())
+                raise AssertionError("chunk upload should have been interrupted")
+            except httpx.HTTPError:
+                pass
+            print("Killed the server mid-chunk after {}/{} chunks".format(sent, num_chunks))
+
+            server = start_server(workdir, port)
+            status = client.get("/upload/resumable/" + upload_id).json()
+            assert status["received_chunks"] == list(range(sent)), status["received_chunks"]
+            assert status["missing_chunks"] == list(range(sent, num_chunks)), status["missing_chunks"]
+
+            # bodies longer than the chunk are refused, whether or not they declare their length
+            oversized = os.urandom(chunk_size + 2**16)
+            r = client.put("/upload/resumable/" + upload_id, params={"offset": sent * chunk_size}, content=oversized)
+            assert r.status_code == 413, r.text
+            def streamed():
+                for i in range(0, len(oversized), 2**16):
+                    yield oversized[i:i + 2**16]
+            try:
+                r = client.put("/upload/resumable/" + upload_id, params={"offset": sent * chunk_size}, content=streamed())
+                assert r.status_code == 413, r.text
+            except httpx.HTTPError:
+                pass
+            status = client.get("/upload/resumable/" + upload_id).json()
+            assert status["missing_chunks"] == list(range(sent, num_chunks)), status["missing_chunks"]
+            print("Oversized chunk bodies were rejected")
+
+            for index in status["missing_chunks"]:
+                put_chunk(client, upload_id, index, chunk_size, data)
+            status = client.post("/upload/resumable/{}/finalize".format(upload_id))
+            status.raise_for_status()
+            path = os.path.join(workdir, status.json()["path"])
+            with open(path, "rb") as f:
+                assert hashlib.sha256(f.read()).hexdigest() == digest, "sha256 mismatch after resume"
+            print("Resumed {} missing chunks, final sha256 matches".format(num_chunks - sent))
+
+            # same content again: hard-linked, nothing transferred
+            status = client.post("/upload/resumable/init", json={"filename": "copy.bin", "total_size": len(data), "chunk_size": chunk_size,
+                                                                  "finalFolderName": "resume", "file_sha256": digest}).json()
+            assert status["status"] == "completed" and os.path.samefile(path, os.path.join(workdir, status["path"]))
+            print("Second upload of the same content was deduplicated")
+
+            # rewriting the indexed file must invalidate its dedup entry
+            with open(path, "r+b") as f:
+                f.write(b"\0" * 16)
+            status = client.post("/upload/resumable/init", json={"filename": "again.bin", "total_size": len(data), "chunk_size": chunk_size,
+                                                                  "finalFolderName": "resume", "file_sha256": digest}).json()
+            assert status["status"] == "uploading" and status["missing_chunks"] == list(range(num_chunks)), status
+            print("Rewritten file was not used for dedup")
+            print("OK")
+        finally:
+            server.kill()
+            server.wait()
@@ -0,0 +1,69 @@
+import time
+import threading
+from collections import OrderedDict
+from typing import NamedTuple, Optional, Tuple
+from .config import settings
+
+
+class CachedUser(NamedTuple):
+    """缓存中的用户快照，只含基本字段，可在线程间安全共享"""
+    id: int
+    username: str
+
+
+class TokenCache:
+    """
+    已验证 token → 用户 的缓存
+
+    get_current_user 命中缓存时既不重新解码 JWT，也不查询数据库。
+    条目在 token 的 exp 到期或超过 settings.auth_cache_ttl 秒后失效
+    （用户被修改或删除时由 user_service 的提交钩子立即清除），
+    按 LRU 淘汰，条目数量受 settings.auth_cache_size 限制。
+    """
+
+    def __init__(self, max_entries: Optional[int] = None, ttl: Optional[float] = None):
+        self.max_entries = max_entries or settings.auth_cache_size
+        self.ttl = ttl if ttl is not None else settings.auth_cache_ttl
+        self._entries: "OrderedDict[str, Tuple[float, CachedUser]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, token: str) -> Optional[CachedUser]:
+        """返回缓存的用户，不存在或已过期时返回 None"""
+        now = time.time()
+        with self._lock:
+            cached = self._entries.get(token)
+            if cached is None:
+                return None
+            expires_at, user = cached
+            if expires_at <= now:
+                del self._entries[token]
+                return None
+            self._entries.move_to_end(token)
+            return user
+
+    def put(self, token: str, user: CachedUser, token_exp: Optional[float] = None) -> None:
+        """缓存用户，过期时间取 token 的 exp 与 TTL 中较早者"""
+        if self.ttl <= 0:
+            return
+        expires_at = time.time() + self.ttl
+        if token_exp is not None:
+            expires_at = min(expires_at, float(token_exp))
+        with self._lock:
+            self._entries[token] = (expires_at, user)
+            self._entries.move_to_end(token)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate_user(self, user_id: int) -> None:
+        """清除某个用户的全部缓存条目（用户信息变更或删除时调用）"""
+        with self._lock:
+            for token in [t for t, (_, user) in self._entries.items() if user.id == user_id]:
+                del self._entries[token]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+# 创建全局实例
+token_cache = TokenCache()
@@ -1,19 +1,49 @@
 import os
 from dotenv import load_dotenv
-from ..database import SessionLocal
 from pathlib import Path
 # 加载环境变量
 load_dotenv()
 
 class Settings:
-    DB_URL = os.getenv("DB_URL", "sqlite:///./data/user.db")
+    DB_URL = os.getenv("DB_URL", f"sqlite:///{Path(__file__).resolve().parent.parent / 'data' / 'user.db'}")
+    # 连接池大小、溢出连接数、获取连接的超时（秒），以及 SQLite 等待写锁的超时（秒）
+    DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+    DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "20"))
+    DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+    DB_BUSY_TIMEOUT = float(os.getenv("DB_BUSY_TIMEOUT", "30"))
     SECRET_KEY = os.getenv("SECRET_KEY", "super-secret-key")
     ALGORITHM = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES = 120
+    # 已验证 token 的缓存：最大条目数、有效期（秒，0 表示不缓存）
+    auth_cache_size = 1024
+    auth_cache_ttl = 60
     
     # File Upload Configuration
     upload_base_dir = Path("data")
     max_file_size = 1000 * 1024 * 1024
+    # 流式写入时每次读取的块大小
+    upload_chunk_size = 1024 * 1024
+    # 断点续传会话目录（位于上传基础目录下）及允许的最大块大小
+    resumable_dir_name = ".resumable"
+    resumable_max_chunk_size = 64 * 1024 * 1024
+    
+    # 视频抽帧配置：解码进程数（None 表示 CPU 核数）、每个进程的编码线程数、输出格式
+    frame_extraction_workers = None
+    frame_encode_workers = 4
+    frame_encoder = "jpg"
+    
+    # 后台任务队列配置：同时运行的任务总数、单个用户的任务数、轮询间隔（秒）、最大尝试次数、
+    # 失败后首次重试的等待时间（秒，之后每次翻倍）
+    job_max_workers = 2
+    job_max_per_user = 1
+    job_poll_interval = 2.0
+    job_max_attempts = 3
+    job_retry_delay = 10.0
+    
+    # 目录列表缓存的最大目录数
+    listing_cache_size = 4096
+    # 目录索引的最长同步间隔（秒）：即使目录签名未变（如文件被原地改写）也会定期同步
+    catalog_reconcile_interval = 300.0
     
     # Valid stages for file organization
     valid_stages = {"images", "colmap", "pcd"}
@@ -1,11 +1,13 @@
 
 from fastapi import Depends, HTTPException, Header, status
 from sqlalchemy.orm import Session
-from ..database import SessionLocal
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import AsyncIterator
+from ..database import SessionLocal, AsyncSessionLocal
 from jose import jwt, JWTError
 from ..core.config import settings
 from ..core.security import verify_token
-from ..models.user_model import User
+from ..core.auth_cache import CachedUser, token_cache
 from ..services import user_service
 
 def get_db():
@@ -15,11 +17,16 @@ def get_db():
     finally:
         db.close()
 
+async def get_async_db() -> AsyncIterator[AsyncSession]:
+    """异步数据库会话，供 async 路由使用"""
+    async with AsyncSessionLocal() as db:
+        yield db
+
 def get_current_user(
     authorization: str = Header(None), 
     db: Session = Depends(get_db)
-) -> User:
-    """获取当前认证用户"""
+) -> CachedUser:
+    """获取当前认证用户（已验证的 token 在缓存有效期内不再解码和查库）"""
     if not authorization or not authorization.startswith("Bearer "):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED, 
@@ -27,6 +34,10 @@ def get_current_user(
         )
     
     token = authorization.split(" ", 1)[1]
+    cached_user = token_cache.get(token)
+    if cached_user is not None:
+        return cached_user
+    
     try:
         payload = verify_token(token)
         username = payload.get("sub")
@@ -44,7 +55,10 @@ def get_current_user(
                 detail="User not found"
             )
         
-        return user
+        # 只缓存基本字段，后续请求直接复用
+        cached_user = CachedUser(id=user.id, username=user.username)
+        token_cache.put(token, cached_user, payload.get("exp"))
+        return cached_user
     except Exception:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED, 
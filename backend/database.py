@@ -1,18 +1,86 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from pathlib import Path
 
+from .core.config import settings
+
 # 创建 data 目录（如果不存在）
 data_dir = Path(__file__).parent / "data"
 data_dir.mkdir(exist_ok=True)
 
-# 使用绝对路径
-SQLALCHEMY_DATABASE_URL = f"sqlite:///{data_dir}/user.db"
+# 数据库地址由 settings.DB_URL 决定，默认使用 data/user.db 的绝对路径
+SQLALCHEMY_DATABASE_URL = settings.DB_URL
 
-engine = create_engine(
-    SQLALCHEMY_DATABASE_URL, 
-    connect_args={"check_same_thread": False}
-)
+# 异步驱动
+ASYNC_DRIVERS = {
+    "sqlite": "sqlite+aiosqlite",
+    "postgresql": "postgresql+asyncpg",
+    "mysql": "mysql+aiomysql",
+}
+
+
+def _is_sqlite(url: str) -> bool:
+    return make_url(url).get_backend_name() == "sqlite"
+
+
+def _to_async_url(url: str) -> str:
+    """将同步驱动的地址转换为对应的异步驱动地址（已指定驱动时保持不变）"""
+    parsed = make_url(url)
+    if "+" in parsed.drivername:
+        return url
+    drivername = ASYNC_DRIVERS.get(parsed.drivername)
+    if drivername is None:
+        raise ValueError(f"不支持的异步数据库: {parsed.drivername}")
+    return parsed.set(drivername=drivername).render_as_string(hide_password=False)
+
+
+def _engine_options(url: str) -> dict:
+    options = {"pool_pre_ping": True}
+    if _is_sqlite(url):
+        options["connect_args"] = {
+            "check_same_thread": False,
+            "timeout": settings.DB_BUSY_TIMEOUT
+        }
+        # 内存数据库每个连接都是独立的库，不能使用连接池
+        if make_url(url).database in (None, "", ":memory:"):
+            return options
+    options["pool_size"] = settings.DB_POOL_SIZE
+    options["max_overflow"] = settings.DB_MAX_OVERFLOW
+    options["pool_timeout"] = settings.DB_POOL_TIMEOUT
+    return options
+
+
+def _set_sqlite_pragmas(dbapi_connection, connection_record):
+    """
+    WAL 模式下读写互不阻塞，后台任务写入时列表查询无需等待；
+    busy_timeout 让并发写入排队等待锁，而不是立即报 database is locked
+    """
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.execute(f"PRAGMA busy_timeout={int(settings.DB_BUSY_TIMEOUT * 1000)}")
+    cursor.close()
+
+
+# 同步引擎：供后台任务、线程池中的服务及认证依赖使用
+engine = create_engine(SQLALCHEMY_DATABASE_URL, **_engine_options(SQLALCHEMY_DATABASE_URL))
 SessionLocal = sessionmaker(bind=engine, autocommit=False, autoflush=False)
-Base = declarative_base()
\ No newline at end of file
+
+# 异步引擎：供 async 路由使用，数据库 IO 不阻塞事件循环
+ASYNC_DATABASE_URL = _to_async_url(SQLALCHEMY_DATABASE_URL)
+async_engine = create_async_engine(ASYNC_DATABASE_URL, **_engine_options(ASYNC_DATABASE_URL))
+AsyncSessionLocal = async_sessionmaker(
+    bind=async_engine,
+    class_=AsyncSession,
+    autoflush=False,
+    expire_on_commit=False
+)
+
+if _is_sqlite(SQLALCHEMY_DATABASE_URL):
+    event.listen(engine, "connect", _set_sqlite_pragmas)
+    event.listen(async_engine.sync_engine, "connect", _set_sqlite_pragmas)
+
+Base = declarative_base()
@@ -45,6 +45,12 @@ class ModelParams(ParamGroup):
         self._white_background = False
         self.train_test_exp = False
         self.data_device = "cuda"
+        self.model_device = "cuda"
+        self.packed_layout = False
+        self.image_budget_gb = -1.0
+        self.pin_images = False
+        self.load_workers = 0
+        self.image_cache_dir = ""
         self.eval = False
         super().__init__(parser, "Loading Parameters", sentinel)
 
@@ -59,6 +65,7 @@ class PipelineParams(ParamGroup):
         self.compute_cov3D_python = False
         self.debug = False
         self.antialiasing = False
+        self.rasterizer = "auto"
         super().__init__(parser, "Pipeline Parameters")
 
 class OptimizationParams(ParamGroup):
@@ -0,0 +1,69 @@
+#
+# Counts the activation kernels (exp, sigmoid, normalize, cat) launched by GaussianModel
+# per iteration, with and without the activation cache.
+#
+# A training iteration reads the activated parameters once with autograd on (always
+# computed) and, on densification iterations, several more times under no_grad
+# (served from the cache). A viewer iteration reads them under no_grad only.
+#
+
+import torch
+from argparse import ArgumentParser
+from torch.profiler import profile, ProfilerActivity
+from scene.gaussian_model import GaussianModel
+from arguments import OptimizationParams
+from utils.graphics_utils import BasicPointCloud
+
+ACTIVATION_OPS = ("aten::exp", "aten::sigmoid", "aten::norm", "aten::linalg_vector_norm", "aten::cat")
+
+def build_model(num_points, sh_degree, device, cache_activations):
+    gaussians = GaussianModel(sh_degree, device=device, cache_activations=cache_activations)
+    torch.manual_seed(0)
+    points = torch.rand((num_points, 3)).numpy()
+    colors = torch.rand((num_points, 3)).numpy()
+    gaussians.create_from_pcd(BasicPointCloud(points=points, colors=colors, normals=None), [], 1.0)
+    parser = ArgumentParser()
+    op = OptimizationParams(parser)
+    opt = op.extract(parser.parse_args([]))
+    gaussians.training_setup(opt)
+    return gaussians
+
+def read_activations(gaussians):
+    return gaussians.get_scaling, gaussians.get_rotation, gaussians.get_opacity, gaussians.get_features
+
+def training_iteration(gaussians, densify):
+    read_activations(gaussians)
+    with torch.no_grad():
+        if densify:
+            n = gaussians.get_xyz.shape[0]
+            gaussians.xyz_gradient_accum = torch.rand((n, 1), device=gaussians.device) * 4e-4
+            gaussians.denom = torch.ones((n, 1), device=gaussians.device)
+            gaussians.densify_and_prune(2e-4, 0.005, 1.0, 20, torch.zeros(n, device=gaussians.device))
+
+def viewer_iteration(gaussians):
+    with torch.no_grad():
+        for _ in range(4):
+            read_activations(gaussians)
+
+def count_activation_ops(fn, iterations):
+    with profile(activities=[ProfilerActivity.CPU]) as prof:
+        for _ in range(iterations):
+            fn()
+    counts = {event.key: event.count for event in prof.key_averages() if event.key in ACTIVATION_OPS}
+    return sum(counts.values()) / iterations, counts
+
+if __name__ == "__main__":
+    parser = ArgumentParser(description="Activation kernel count benchmark")
+    parser.add_argument("--num_points", type=int, default=100_000)
+    parser.add_argument("--sh_degree", type=int, default=3)
+    parser.add_argument("--device", type=str, default="cuda" if torch.cuda.is_available() else "cpu")
+    parser.add_argument("--iterations", type=int, default=10)
+    args = parser.parse_args()
+
+    for cache_activations in (False, True):
+        label = "cached" if cache_activations else "uncached"
+        gaussians = build_model(args.num_points, args.sh_degree, args.device, cache_activations)
+        per_iter, counts = count_activation_ops(lambda: viewer_iteration(gaussians), args.iterations)
+        print("[{}] viewer iteration: {:.1f} activation ops ({})".format(label, per_iter, counts))
+        per_iter, counts = count_activation_ops(lambda: training_iteration(gaussians, densify=True), 1)
+        print("[{}] densification iteration: {:.1f} activation ops ({})".format(label, per_iter, counts))
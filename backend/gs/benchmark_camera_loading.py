@@ -0,0 +1,92 @@
+#
+# Scene startup benchmark: builds a synthetic COLMAP dataset (by default 400 random 1600x1200
+# JPEGs on a ring of PINHOLE cameras, loaded at --resolution 4) and times
+# cameraList_from_camInfos with 1 and N loader threads, then with N threads through a cold
+# and a warm decoded-image cache (--image_cache_dir), checking that every run yields the
+# same cameras in the same order with the same pixels. N defaults to the usable CPUs.
+#
+
+import os
+import time
+import hashlib
+import tempfile
+import numpy as np
+from argparse import ArgumentParser, Namespace
+from PIL import Image
+from utils.read_write_model import Camera, Image as ColmapImage, Point3D, write_model, rotmat2qvec
+from scene.dataset_readers import readColmapSceneInfo
+from utils.camera_utils import cameraList_from_camInfos
+
+def make_dataset(root, num_images, width, height):
+    os.makedirs(os.path.join(root, "images"))
+    os.makedirs(os.path.join(root, "sparse", "0"))
+    rng = np.random.default_rng(0)
+    cameras = {1: Camera(id=1, model="PINHOLE", width=width, height=height,
+                         params=np.array([width, width, width / 2, height / 2], dtype=np.float64))}
+    images = {}
+    for i in range(num_images):
+        angle = 2 * np.pi * i / num_images
+        # looking at the origin from a ring of radius 4
+        R = np.array([[np.cos(angle), 0, -np.sin(angle)], [0, 1, 0], [np.sin(angle), 0, np.cos(angle)]])
+        name = "{:05d}.jpg".format(i)
+        images[i + 1] = ColmapImage(id=i + 1, qvec=rotmat2qvec(R), tvec=np.array([0.0, 0.0, 4.0]), camera_id=1, name=name,
+                                    xys=np.zeros((0, 2)), point3D_ids=np.zeros(0, dtype=np.int64))
+        pixels = rng.integers(0, 256, (height, width, 3), dtype=np.uint8)
+        Image.fromarray(pixels).save(os.path.join(root, "images", name), quality=90)
+    points3D = {i + 1: Point3D(id=i + 1, xyz=rng.normal(size=3), rgb=rng.integers(0, 256, 3, dtype=np.uint8), error=0.0,
+                               image_ids=np.zeros(0, dtype=np.int32), point2D_idxs=np.zeros(0, dtype=np.int32))
+                for i in range(1000)}
+    write_model(cameras, images, points3D, os.path.join(root, "sparse", "0"), ext=".bin")
+
+def usable_cpus():
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+def digest(image):
+    return hashlib.sha256(image.cpu().numpy().tobytes()).hexdigest()
+
+if __name__ == "__main__":
+    parser = ArgumentParser(description="Camera loading startup benchmark")
+    parser.add_argument("--num_images", type=int, default=400)
+    parser.add_argument("--width", type=int, default=1600)
+    parser.add_argument("--height", type=int, default=1200)
+    parser.add_argument("--resolution", type=int, default=4)
+    parser.add_argument("--workers", type=int, default=usable_cpus())
+    parser.add_argument("--data_device", type=str, default="cpu")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as root:
+        print("Writing {} synthetic {}x{} images...".format(args.num_images, args.width, args.height))
+        make_dataset(root, args.num_images, args.width, args.height)
+        scene_info = readColmapSceneInfo(root, "images", "", False, False)
+        load_args = Namespace(resolution=args.resolution, data_device=args.data_device, train_test_exp=False)
+        print("{} usable CPUs; decoding runs outside the GIL, so more threads only help with more cores".format(usable_cpus()))
+        # untimed warm-up, so the first timed run does not pay for one-time initialization
+        cameraList_from_camInfos(scene_info.train_cameras[:8], 1.0, load_args, False, False, num_workers=1)
+        serial_time = None
+        for workers in sorted({1, args.workers}):
+            start = time.perf_counter()
+            cameras = cameraList_from_camInfos(scene_info.train_cameras, 1.0, load_args, False, False, num_workers=workers)
+            elapsed = time.perf_counter() - start
+            serial_time = serial_time or elapsed
+            print("{:3d} workers: {} cameras in {:.2f}s ({:.1f} cameras/s, {:.2f}x 1 worker)".format(
+                workers, len(cameras), elapsed, len(cameras) / elapsed, serial_time / elapsed))
+            digests = [digest(camera.original_image) for camera in cameras]
+            if workers > 1:
+                assert digests == reference, "threaded loading changed the order or the pixels of the cameras"
+            reference = digests
+            del cameras
+
+        load_args.image_cache_dir = os.path.join(root, "image_cache")
+        for run in ("cold", "warm"):
+            start = time.perf_counter()
+            cameras = cameraList_from_camInfos(scene_info.train_cameras, 1.0, load_args, False, False, num_workers=args.workers)
+            elapsed = time.perf_counter() - start
+            assert [digest(camera.original_image) for camera in cameras] == reference, "cached images differ from decoded ones"
+            print("{:3d} workers, {} image cache: {} cameras in {:.2f}s ({:.1f} cameras/s, {:.2f}x 1 worker)".format(
+                args.workers, run, len(cameras), elapsed, len(cameras) / elapsed, serial_time / elapsed))
+            del cameras
+        entries = os.listdir(load_args.image_cache_dir)
+        assert len(entries) == len(reference) and all(name.endswith(".npy") for name in entries), entries
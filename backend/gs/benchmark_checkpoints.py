@@ -0,0 +1,83 @@
+#
+# Bytes written and restore time of full vs. delta checkpoints.
+#
+# Simulates a run on random Gaussians: between checkpoints a fraction of the rows receives
+# gradients and an optimizer step, and part of the checkpoints follow a densify/prune.
+#
+
+import os
+import time
+import tempfile
+import torch
+from argparse import ArgumentParser
+from scene.gaussian_model import GaussianModel
+from arguments import OptimizationParams
+from utils.graphics_utils import BasicPointCloud
+from utils.delta_checkpoint import DeltaCheckpointer, DEFAULT_BASE_INTERVAL, load_checkpoint
+
+def build_model(num_points, device):
+    gaussians = GaussianModel(3, device=device)
+    torch.manual_seed(0)
+    points = torch.rand((num_points, 3)).numpy()
+    colors = torch.rand((num_points, 3)).numpy()
+    gaussians.create_from_pcd(BasicPointCloud(points=points, colors=colors, normals=None), [], 1.0)
+    parser = ArgumentParser()
+    op = OptimizationParams(parser)
+    opt = op.extract(parser.parse_args([]))
+    gaussians.training_setup(opt)
+    return gaussians, opt
+
+def simulate_steps(gaussians, steps, visible_fraction):
+    for _ in range(steps):
+        visible = torch.rand(gaussians.get_xyz.shape[0], device=gaussians.device) < visible_fraction
+        for group in gaussians.optimizer.param_groups:
+            param = group["params"][0]
+            param.grad = torch.randn_like(param) * visible.reshape((-1,) + (1,) * (param.dim() - 1))
+        gaussians.optimizer.step()
+        gaussians.optimizer.zero_grad(set_to_none=True)
+        gaussians.invalidate_activations()
+
+def densify(gaussians, extent):
+    with torch.no_grad():
+        n = gaussians.get_xyz.shape[0]
+        gaussians.xyz_gradient_accum = torch.rand((n, 1), device=gaussians.device) * 4e-4
+        gaussians.denom = torch.ones((n, 1), device=gaussians.device)
+        gaussians.densify_and_prune(3e-4, 0.005, extent, None, torch.zeros(n, device=gaussians.device))
+
+def run(args, base_interval, out_dir):
+    gaussians, _ = build_model(args.num_points, args.device)
+    checkpointer = DeltaCheckpointer(base_interval)
+    paths = []
+    for i in range(args.checkpoints):
+        simulate_steps(gaussians, args.steps_between, args.visible_fraction)
+        if i % 2 == 1:
+            densify(gaussians, 1.0)
+        path = os.path.join(out_dir, "chkpnt{}.pth".format(i))
+        checkpointer.save(gaussians, i, path)
+        paths.append(path)
+    written = sum(os.path.getsize(path) for path in paths)
+
+    restored, opt = build_model(1, args.device)
+    start = time.perf_counter()
+    model_params, _ = load_checkpoint(paths[-1], map_location=args.device)
+    restored.restore(model_params, opt)
+    if torch.cuda.is_available():
+        torch.cuda.synchronize()
+    return written, time.perf_counter() - start
+
+if __name__ == "__main__":
+    parser = ArgumentParser(description="Full vs. delta checkpoint benchmark")
+    parser.add_argument("--num_points", type=int, default=200_000)
+    parser.add_argument("--device", type=str, default="cuda" if torch.cuda.is_available() else "cpu")
+    parser.add_argument("--checkpoints", type=int, default=10)
+    parser.add_argument("--steps_between", type=int, default=5)
+    parser.add_argument("--visible_fraction", type=float, default=0.3)
+    parser.add_argument("--base_interval", type=int, default=DEFAULT_BASE_INTERVAL)
+    args = parser.parse_args()
+
+    for base_interval in (1, args.base_interval):
+        with tempfile.TemporaryDirectory() as out_dir:
+            written, restore_time = run(args, base_interval, out_dir)
+        label = "full" if base_interval == 1 else "delta (base every {})".format(base_interval)
+        print("[{}] {:.1f} MB written for {} checkpoints, last restored in {:.3f}s".format(
+            label, written / 2**20, args.checkpoints, restore_time))
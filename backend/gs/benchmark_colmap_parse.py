@@ -0,0 +1,156 @@
+#
+# COLMAP binary parsing benchmark.
+#
+# Writes a synthetic points3D.bin (5M points with tracks of 1-8 observations by default)
+# and images.bin, and times the bulk NumPy readers against the previous per-record
+# struct.unpack readers, which are kept here as the reference:
+#   - colmap_loader.read_points3D_binary (xyz, rgb, error, as readColmapSceneInfo uses it);
+#   - read_points3D_binary_arrays with the CSR tracks;
+#   - colmap_loader.read_extrinsics_binary.
+# Every result is checked against the data that was written.
+#
+
+import os
+import time
+import struct
+import tempfile
+import numpy as np
+from argparse import ArgumentParser
+from scene.colmap_loader import read_points3D_binary, read_points3D_binary_arrays, read_extrinsics_binary, \
+    read_next_bytes, POINT3D_RECORD_DTYPE, TRACK_ELEM_DTYPE, POINT2D_DTYPE, IMAGE_HEADER
+
+BATCH = 1 << 16
+
+def write_points3D(path, points, tracks):
+    header_size, track_size = POINT3D_RECORD_DTYPE.itemsize, TRACK_ELEM_DTYPE.itemsize
+    lengths = points["track_length"].astype(np.int64)
+    offsets = np.concatenate(([0], np.cumsum(lengths)))
+    with open(path, "wb") as f:
+        f.write(struct.pack("<Q", len(points)))
+        for start in range(0, len(points), BATCH):
+            stop = min(start + BATCH, len(points))
+            sizes = header_size + track_size * lengths[start:stop]
+            starts = np.concatenate(([0], np.cumsum(sizes)[:-1]))
+            out = np.empty(sizes.sum(), dtype=np.uint8)
+            out[starts[:, None] + np.arange(header_size)] = points[start:stop].view(np.uint8).reshape(-1, header_size)
+            first, last = offsets[start], offsets[stop]
+            track_starts = np.repeat(starts + header_size - track_size * (offsets[start:stop] - first), lengths[start:stop]) \
+                + track_size * np.arange(last - first)
+            out[track_starts[:, None] + np.arange(track_size)] = tracks[first:last].view(np.uint8).reshape(-1, track_size)
+            out.tofile(f)
+
+def make_points3D(num_points, rng):
+    points = np.empty(num_points, dtype=POINT3D_RECORD_DTYPE)
+    points["id"] = np.arange(1, num_points + 1)
+    points["xyz"] = rng.standard_normal((num_points, 3))
+    points["rgb"] = rng.integers(0, 256, (num_points, 3))
+    points["error"] = rng.random(num_points)
+    points["track_length"] = rng.integers(1, 9, num_points)
+    tracks = np.empty(int(points["track_length"].sum()), dtype=TRACK_ELEM_DTYPE)
+    tracks["image_id"] = rng.integers(1, 1000, len(tracks))
+    tracks["point2D_idx"] = rng.integers(0, 10000, len(tracks))
+    return points, tracks
+
+def write_images(path, num_images, points2D_per_image, rng):
+    images = {}
+    with open(path, "wb") as f:
+        f.write(struct.pack("<Q", num_images))
+        for image_id in range(1, num_images + 1):
+            qvec, tvec = rng.standard_normal(4), rng.standard_normal(3)
+            name = "frame_{:05d}.jpg".format(image_id)
+            points2D = np.empty(points2D_per_image, dtype=POINT2D_DTYPE)
+            points2D["xy"] = rng.random((points2D_per_image, 2)) * 1000
+            points2D["point3D_id"] = rng.integers(-1, 1 << 20, points2D_per_image)
+            f.write(IMAGE_HEADER.pack(image_id, *qvec, *tvec, 1))
+            f.write(name.encode("utf-8") + b"\x00")
+            f.write(struct.pack("<Q", points2D_per_image))
+            f.write(points2D.tobytes())
+            images[image_id] = (qvec, tvec, name, points2D)
+    return images
+
+def reference_read_points3D_binary(path):
+    with open(path, "rb") as fid:
+        num_points = read_next_bytes(fid, 8, "Q")[0]
+        xyzs = np.empty((num_points, 3))
+        rgbs = np.empty((num_points, 3))
+        errors = np.empty((num_points, 1))
+        for p_id in range(num_points):
+            binary_point_line_properties = read_next_bytes(fid, num_bytes=43, format_char_sequence="QdddBBBd")
+            xyzs[p_id] = np.array(binary_point_line_properties[1:4])
+            rgbs[p_id] = np.array(binary_point_line_properties[4:7])
+            errors[p_id] = np.array(binary_point_line_properties[7])
+            track_length = read_next_bytes(fid, num_bytes=8, format_char_sequence="Q")[0]
+            read_next_bytes(fid, num_bytes=8 * track_length, format_char_sequence="ii" * track_length)
+    return xyzs, rgbs, errors
+
+def reference_read_extrinsics_binary(path):
+    images = {}
+    with open(path, "rb") as fid:
+        num_reg_images = read_next_bytes(fid, 8, "Q")[0]
+        for _ in range(num_reg_images):
+            binary_image_properties = read_next_bytes(fid, num_bytes=64, format_char_sequence="idddddddi")
+            image_id = binary_image_properties[0]
+            image_name = ""
+            current_char = read_next_bytes(fid, 1, "c")[0]
+            while current_char != b"\x00":
+                image_name += current_char.decode("utf-8")
+                current_char = read_next_bytes(fid, 1, "c")[0]
+            num_points2D = read_next_bytes(fid, num_bytes=8, format_char_sequence="Q")[0]
+            x_y_id_s = read_next_bytes(fid, num_bytes=24 * num_points2D, format_char_sequence="ddq" * num_points2D)
+            xys = np.column_stack([tuple(map(float, x_y_id_s[0::3])), tuple(map(float, x_y_id_s[1::3]))])
+            point3D_ids = np.array(tuple(map(int, x_y_id_s[2::3])))
+            images[image_id] = (image_name, xys, point3D_ids)
+    return images
+
+def timed(fn, *args, **kwargs):
+    start = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+if __name__ == "__main__":
+    parser = ArgumentParser(description="COLMAP binary parsing benchmark")
+    parser.add_argument("--num_points", type=int, default=5_000_000)
+    parser.add_argument("--num_images", type=int, default=1000)
+    parser.add_argument("--points2D_per_image", type=int, default=5000)
+    parser.add_argument("--skip_reference", action="store_true", help="do not time the per-record readers")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    with tempfile.TemporaryDirectory() as root:
+        points_path = os.path.join(root, "points3D.bin")
+        images_path = os.path.join(root, "images.bin")
+        points, tracks = make_points3D(args.num_points, rng)
+        print("Writing {} points and {} images...".format(args.num_points, args.num_images))
+        write_points3D(points_path, points, tracks)
+        images = write_images(images_path, args.num_images, args.points2D_per_image, rng)
+        print("points3D.bin {:.0f} MB, images.bin {:.0f} MB".format(
+            os.path.getsize(points_path) / 2**20, os.path.getsize(images_path) / 2**20))
+
+        (xyz, rgb, error), elapsed = timed(read_points3D_binary, points_path)
+        assert np.array_equal(xyz, points["xyz"]) and np.array_equal(rgb, points["rgb"]) \
+            and np.array_equal(error[:, 0], points["error"])
+        print("read_points3D_binary           {:7.2f}s".format(elapsed))
+        arrays, elapsed = timed(read_points3D_binary_arrays, points_path)
+        assert np.array_equal(arrays.ids, points["id"]) and np.array_equal(arrays.xyz, points["xyz"])
+        assert np.array_equal(np.diff(arrays.track_offsets), points["track_length"])
+        assert np.array_equal(arrays.track_image_ids, tracks["image_id"]) \
+            and np.array_equal(arrays.track_point2D_idxs, tracks["point2D_idx"])
+        print("read_points3D_binary_arrays    {:7.2f}s (with CSR tracks)".format(elapsed))
+        del arrays
+        if not args.skip_reference:
+            (ref_xyz, ref_rgb, ref_error), elapsed = timed(reference_read_points3D_binary, points_path)
+            assert np.array_equal(ref_xyz, xyz) and np.array_equal(ref_rgb, rgb) and np.array_equal(ref_error, error)
+            print("  per-record reference         {:7.2f}s".format(elapsed))
+
+        extrinsics, elapsed = timed(read_extrinsics_binary, images_path)
+        for image_id, (qvec, tvec, name, points2D) in images.items():
+            image = extrinsics[image_id]
+            assert image.name == name and np.array_equal(image.qvec, qvec) and np.array_equal(image.tvec, tvec)
+            assert np.array_equal(image.xys, points2D["xy"]) and np.array_equal(image.point3D_ids, points2D["point3D_id"])
+        print("read_extrinsics_binary         {:7.2f}s".format(elapsed))
+        if not args.skip_reference:
+            reference, elapsed = timed(reference_read_extrinsics_binary, images_path)
+            assert all(reference[i][0] == extrinsics[i].name and np.array_equal(reference[i][1], extrinsics[i].xys)
+                       and np.array_equal(reference[i][2], extrinsics[i].point3D_ids) for i in images)
+            print("  per-record reference         {:7.2f}s".format(elapsed))
+    print("OK")
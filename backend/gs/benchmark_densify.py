@@ -0,0 +1,190 @@
+#
+# Time and peak memory of densify_and_prune.
+#
+# Runs rounds of densification (a quarter of the Gaussians over the gradient threshold)
+# and pruning (--prune_fraction of them below the opacity threshold) on random Gaussians
+# with three implementations of the optimizer row updates:
+#   - the previous one (kept here as the reference): a new nn.Parameter and new Adam
+#     moments per group on every call, built with torch.cat and boolean-mask indexing;
+#   - the capacity-based RowBuffers with a masked copy of all kept rows on compaction;
+#   - the RowBuffers with their chunked in-place compaction.
+# All three must leave identical parameters and moments.
+#
+# Peak memory is the high-water mark above the memory in use before each call:
+# torch.cuda.max_memory_allocated on CUDA, the process's peak RSS (VmHWM) on Linux CPUs.
+# "Held" is the storage behind the parameters and moments after the last round,
+# including the spare capacity of the RowBuffers.
+#
+
+import time
+import torch
+from torch import nn
+from argparse import ArgumentParser
+from scene.gaussian_model import GaussianModel
+from scene.param_store import RowBuffer
+from arguments import OptimizationParams
+from utils.graphics_utils import BasicPointCloud
+
+def masked_compact(self, keep_mask):
+    kept = self.live[keep_mask]
+    self.storage[:kept.shape[0]] = kept
+    self.count = kept.shape[0]
+
+def reference_prune_optimizer(self, mask):
+    optimizable_tensors = {}
+    for group in self.optimizer.param_groups:
+        stored_state = self.optimizer.state.get(group['params'][0], None)
+        if stored_state is not None:
+            stored_state["exp_avg"] = stored_state["exp_avg"][mask]
+            stored_state["exp_avg_sq"] = stored_state["exp_avg_sq"][mask]
+
+            del self.optimizer.state[group['params'][0]]
+            group["params"][0] = nn.Parameter((group["params"][0][mask].requires_grad_(True)))
+            self.optimizer.state[group['params'][0]] = stored_state
+
+            optimizable_tensors[group["name"]] = group["params"][0]
+        else:
+            group["params"][0] = nn.Parameter(group["params"][0][mask].requires_grad_(True))
+            optimizable_tensors[group["name"]] = group["params"][0]
+    return optimizable_tensors
+
+def reference_cat_tensors_to_optimizer(self, tensors_dict):
+    optimizable_tensors = {}
+    for group in self.optimizer.param_groups:
+        assert len(group["params"]) == 1
+        extension_tensor = tensors_dict[group["name"]]
+        stored_state = self.optimizer.state.get(group['params'][0], None)
+        if stored_state is not None:
+
+            stored_state["exp_avg"] = torch.cat((stored_state["exp_avg"], torch.zeros_like(extension_tensor)), dim=0)
+            stored_state["exp_avg_sq"] = torch.cat((stored_state["exp_avg_sq"], torch.zeros_like(extension_tensor)), dim=0)
+
+            del self.optimizer.state[group['params'][0]]
+            group["params"][0] = nn.Parameter(torch.cat((group["params"][0], extension_tensor), dim=0).requires_grad_(True))
+            self.optimizer.state[group['params'][0]] = stored_state
+
+            optimizable_tensors[group["name"]] = group["params"][0]
+        else:
+            group["params"][0] = nn.Parameter(torch.cat((group["params"][0], extension_tensor), dim=0).requires_grad_(True))
+            optimizable_tensors[group["name"]] = group["params"][0]
+
+    return optimizable_tensors
+
+def _rss_kb(field):
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith(field + ":"):
+                return int(line.split()[1])
+
+def reset_peak(device):
+    if device.type == "cuda":
+        torch.cuda.synchronize()
+        torch.cuda.reset_peak_memory_stats()
+        return torch.cuda.memory_allocated()
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")  # resets VmHWM to the current RSS
+        return _rss_kb("VmRSS") * 1024
+    except OSError:
+        return None
+
+def peak_above(device, base):
+    if base is None:
+        return float("nan")
+    if device.type == "cuda":
+        torch.cuda.synchronize()
+        return torch.cuda.max_memory_allocated() - base
+    return _rss_kb("VmHWM") * 1024 - base
+
+def build_model(num_points, device):
+    gaussians = GaussianModel(3, device=device)
+    torch.manual_seed(0)
+    points = torch.rand((num_points, 3)).numpy()
+    colors = torch.rand((num_points, 3)).numpy()
+    gaussians.create_from_pcd(BasicPointCloud(points=points, colors=colors, normals=None), [], 1.0)
+    parser = ArgumentParser()
+    op = OptimizationParams(parser)
+    gaussians.training_setup(op.extract(parser.parse_args([])))
+    # populate the Adam moments so that they are compacted as well
+    for group in gaussians.optimizer.param_groups:
+        group["params"][0].grad = torch.randn_like(group["params"][0])
+    gaussians.optimizer.step()
+    gaussians.optimizer.zero_grad(set_to_none=True)
+    return gaussians
+
+def run(args, device):
+    gaussians = build_model(args.num_points, device)
+    elapsed, peak = [], []
+    for round in range(args.rounds):
+        with torch.no_grad():
+            n = gaussians.get_xyz.shape[0]
+            generator = torch.Generator(device=device).manual_seed(round)
+            gaussians.xyz_gradient_accum = torch.rand((n, 1), device=device, generator=generator) * 4e-4
+            gaussians.denom = torch.ones((n, 1), device=device)
+            gaussians._opacity[torch.rand(n, device=device, generator=generator) < args.prune_fraction] = -10.0
+            gaussians.invalidate_activations()
+        torch.manual_seed(round)
+        base = reset_peak(device)
+        start = time.perf_counter()
+        gaussians.densify_and_prune(3e-4, 0.005, 1.0, None, torch.zeros(n, device=device))
+        if device.type == "cuda":
+            torch.cuda.synchronize()
+        elapsed.append(time.perf_counter() - start)
+        peak.append(peak_above(device, base))
+    return gaussians, elapsed, peak
+
+def state_of(gaussians):
+    tensors = []
+    for group in gaussians.optimizer.param_groups:
+        param = group["params"][0]
+        state = gaussians.optimizer.state[param]
+        tensors += [param.detach().clone(), state["exp_avg"].clone(), state["exp_avg_sq"].clone()]
+    return tensors
+
+def held_bytes(gaussians):
+    storages = {}
+    for group in gaussians.optimizer.param_groups:
+        param = group["params"][0]
+        state = gaussians.optimizer.state[param]
+        for tensor in (param, state["exp_avg"], state["exp_avg_sq"]):
+            storage = tensor.untyped_storage()
+            storages[storage.data_ptr()] = storage.nbytes()
+    return sum(storages.values())
+
+if __name__ == "__main__":
+    parser = ArgumentParser(description="densify_and_prune time and peak memory")
+    parser.add_argument("--num_points", type=int, default=1_000_000 if torch.cuda.is_available() else 100_000)
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--prune_fraction", type=float, default=0.2)
+    parser.add_argument("--device", type=str, default="cuda" if torch.cuda.is_available() else "cpu")
+    args = parser.parse_args()
+    device = torch.device(args.device)
+
+    variants = {
+        "torch.cat/mask (previous)": {GaussianModel: {"_prune_optimizer": reference_prune_optimizer,
+                                                      "cat_tensors_to_optimizer": reference_cat_tensors_to_optimizer}},
+        "RowBuffer, masked copy": {RowBuffer: {"compact": masked_compact}},
+        "RowBuffer, chunked": {},
+    }
+    results = {}
+    for name, patches in variants.items():
+        originals = [(cls, attr, getattr(cls, attr)) for cls, methods in patches.items() for attr in methods]
+        for cls, methods in patches.items():
+            for attr, method in methods.items():
+                setattr(cls, attr, method)
+        try:
+            gaussians, elapsed, peak = run(args, device)
+        finally:
+            for cls, attr, method in originals:
+                setattr(cls, attr, method)
+        results[name] = state_of(gaussians)
+        print("{:<26} {:>8} Gaussians after {} rounds: {:6.1f} ms/call, peak +{:6.1f} MB (max +{:6.1f} MB), "
+              "held {:6.1f} MB".format(name, gaussians.get_xyz.shape[0], args.rounds, 1000 * sum(elapsed) / len(elapsed),
+                                       sum(peak) / len(peak) / 2**20, max(peak) / 2**20, held_bytes(gaussians) / 2**20))
+        del gaussians
+
+    reference = results.pop("torch.cat/mask (previous)")
+    for name, state in results.items():
+        assert len(reference) == len(state) and all(torch.equal(a, b) for a, b in zip(reference, state)), \
+            "{} changed the parameters".format(name)
+    print("Parameters and moments identical")
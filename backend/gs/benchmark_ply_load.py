@@ -0,0 +1,110 @@
+#
+# PLY loading parity check and CPU benchmark.
+#
+# Writes random Gaussians as a binary float32 PLY (the layout save_ply produces) and as an
+# ASCII PLY, loads them with GaussianModel.load_ply and with the previous plyfile loader
+# (kept here as the reference), and checks that every parameter is identical: the binary
+# file goes through the memory-mapped path, the ASCII one through the plyfile fallback.
+# Load times are the best of --repeats runs with the file in the page cache.
+#
+
+import os
+import time
+import tempfile
+import numpy as np
+import torch
+from argparse import ArgumentParser
+from plyfile import PlyData, PlyElement
+from scene.gaussian_model import GaussianModel
+from utils.ply_utils import write_float_vertex_ply
+from benchmark_ply_write import gaussian_names
+
+def reference_load_ply(path, max_sh_degree):
+    plydata = PlyData.read(path)
+
+    xyz = np.stack((np.asarray(plydata.elements[0]["x"]),
+                    np.asarray(plydata.elements[0]["y"]),
+                    np.asarray(plydata.elements[0]["z"])),  axis=1)
+    opacities = np.asarray(plydata.elements[0]["opacity"])[..., np.newaxis]
+
+    features_dc = np.zeros((xyz.shape[0], 3, 1))
+    features_dc[:, 0, 0] = np.asarray(plydata.elements[0]["f_dc_0"])
+    features_dc[:, 1, 0] = np.asarray(plydata.elements[0]["f_dc_1"])
+    features_dc[:, 2, 0] = np.asarray(plydata.elements[0]["f_dc_2"])
+
+    extra_f_names = [p.name for p in plydata.elements[0].properties if p.name.startswith("f_rest_")]
+    extra_f_names = sorted(extra_f_names, key = lambda x: int(x.split('_')[-1]))
+    features_extra = np.zeros((xyz.shape[0], len(extra_f_names)))
+    for idx, attr_name in enumerate(extra_f_names):
+        features_extra[:, idx] = np.asarray(plydata.elements[0][attr_name])
+    features_extra = features_extra.reshape((features_extra.shape[0], 3, (max_sh_degree + 1) ** 2 - 1))
+
+    scale_names = [p.name for p in plydata.elements[0].properties if p.name.startswith("scale_")]
+    scale_names = sorted(scale_names, key = lambda x: int(x.split('_')[-1]))
+    scales = np.zeros((xyz.shape[0], len(scale_names)))
+    for idx, attr_name in enumerate(scale_names):
+        scales[:, idx] = np.asarray(plydata.elements[0][attr_name])
+
+    rot_names = [p.name for p in plydata.elements[0].properties if p.name.startswith("rot")]
+    rot_names = sorted(rot_names, key = lambda x: int(x.split('_')[-1]))
+    rots = np.zeros((xyz.shape[0], len(rot_names)))
+    for idx, attr_name in enumerate(rot_names):
+        rots[:, idx] = np.asarray(plydata.elements[0][attr_name])
+
+    return {
+        "xyz": torch.tensor(xyz, dtype=torch.float),
+        "f_dc": torch.tensor(features_dc, dtype=torch.float).transpose(1, 2).contiguous(),
+        "f_rest": torch.tensor(features_extra, dtype=torch.float).transpose(1, 2).contiguous(),
+        "opacity": torch.tensor(opacities, dtype=torch.float),
+        "scaling": torch.tensor(scales, dtype=torch.float),
+        "rotation": torch.tensor(rots, dtype=torch.float),
+    }
+
+def load_ply(path, sh_degree):
+    gaussians = GaussianModel(sh_degree, device="cpu")
+    gaussians.load_ply(path)
+    return {"xyz": gaussians._xyz, "f_dc": gaussians._features_dc, "f_rest": gaussians._features_rest,
+            "opacity": gaussians._opacity, "scaling": gaussians._scaling, "rotation": gaussians._rotation}
+
+def best_of(repeats, fn, *args):
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = fn(*args)
+        times.append(time.perf_counter() - start)
+    return result, min(times)
+
+def check(loaded, reference, label):
+    for name, tensor in reference.items():
+        assert torch.equal(loaded[name].detach(), tensor), "{}: {} differs from the plyfile loader".format(label, name)
+
+if __name__ == "__main__":
+    parser = ArgumentParser(description="PLY loading parity check and benchmark")
+    parser.add_argument("--num_gaussians", type=int, default=1_000_000)
+    parser.add_argument("--num_ascii", type=int, default=10_000)
+    parser.add_argument("--sh_degree", type=int, default=3)
+    parser.add_argument("--repeats", type=int, default=3)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    names = gaussian_names(args.sh_degree)
+    with tempfile.TemporaryDirectory() as root:
+        path = os.path.join(root, "point_cloud.ply")
+        write_float_vertex_ply(path, rng.standard_normal((args.num_gaussians, len(names)), dtype=np.float32), names)
+        size_mb = os.path.getsize(path) / 2**20
+        reference, reference_time = best_of(args.repeats, reference_load_ply, path, args.sh_degree)
+        loaded, load_time = best_of(args.repeats, load_ply, path, args.sh_degree)
+        check(loaded, reference, "binary")
+        print("{} Gaussians, {:.0f} MB: plyfile loader {:.2f}s ({:.0f} MB/s), load_ply {:.2f}s ({:.0f} MB/s), identical".format(
+            args.num_gaussians, size_mb, reference_time, size_mb / reference_time, load_time, size_mb / load_time))
+        del reference, loaded
+
+        ascii_path = os.path.join(root, "ascii.ply")
+        attributes = rng.standard_normal((args.num_ascii, len(names)), dtype=np.float32)
+        vertices = np.empty(args.num_ascii, dtype=[(name, 'f4') for name in names])
+        for i, name in enumerate(names):
+            vertices[name] = attributes[:, i]
+        PlyData([PlyElement.describe(vertices, 'vertex')], text=True).write(ascii_path)
+        check(load_ply(ascii_path, args.sh_degree), reference_load_ply(ascii_path, args.sh_degree), "ascii")
+        print("ASCII fallback ({} Gaussians) identical".format(args.num_ascii))
+    print("OK")
@@ -0,0 +1,79 @@
+#
+# PLY writer round-trip check and benchmark.
+#
+# Writes random Gaussians and a random point cloud with the previous plyfile writers
+# (one Python tuple per vertex) and with save_ply / storePly, and checks that:
+#   - load_ply followed by save_ply, with and without the packed layout, reproduces the
+#     plyfile-written Gaussians byte for byte;
+#   - storePly writes the same bytes as plyfile, and fetchPly reads the points back.
+# Reports the write time of both writers.
+#
+
+import os
+import time
+import filecmp
+import tempfile
+import numpy as np
+from argparse import ArgumentParser
+from plyfile import PlyData, PlyElement
+from scene.gaussian_model import GaussianModel
+from scene.dataset_readers import storePly, fetchPly
+
+def plyfile_save_ply(path, attributes, names):
+    elements = np.empty(attributes.shape[0], dtype=[(name, 'f4') for name in names])
+    elements[:] = list(map(tuple, attributes))
+    PlyData([PlyElement.describe(elements, 'vertex')]).write(path)
+
+def plyfile_store_ply(path, xyz, rgb):
+    dtype = [('x', 'f4'), ('y', 'f4'), ('z', 'f4'),
+             ('nx', 'f4'), ('ny', 'f4'), ('nz', 'f4'),
+             ('red', 'u1'), ('green', 'u1'), ('blue', 'u1')]
+    elements = np.empty(xyz.shape[0], dtype=dtype)
+    elements[:] = list(map(tuple, np.concatenate((xyz, np.zeros_like(xyz), rgb), axis=1)))
+    PlyData([PlyElement.describe(elements, 'vertex')]).write(path)
+
+def gaussian_names(sh_degree):
+    names = ['x', 'y', 'z', 'nx', 'ny', 'nz'] + ['f_dc_{}'.format(i) for i in range(3)]
+    names += ['f_rest_{}'.format(i) for i in range(3 * (sh_degree + 1) ** 2 - 3)]
+    return names + ['opacity'] + ['scale_{}'.format(i) for i in range(3)] + ['rot_{}'.format(i) for i in range(4)]
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    fn(*args)
+    return time.perf_counter() - start
+
+if __name__ == "__main__":
+    parser = ArgumentParser(description="PLY writer round-trip check and benchmark")
+    parser.add_argument("--num_gaussians", type=int, default=500_000)
+    parser.add_argument("--num_points", type=int, default=1_000_000)
+    parser.add_argument("--sh_degree", type=int, default=3)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    names = gaussian_names(args.sh_degree)
+    attributes = rng.standard_normal((args.num_gaussians, len(names)), dtype=np.float32)
+    attributes[:, 3:6] = 0  # save_ply writes zero normals
+
+    with tempfile.TemporaryDirectory() as root:
+        reference = os.path.join(root, "reference.ply")
+        elapsed = timed(plyfile_save_ply, reference, attributes, names)
+        print("Gaussians ({}): plyfile {:.2f}s".format(args.num_gaussians, elapsed))
+        for packed in (False, True):
+            gaussians = GaussianModel(args.sh_degree, device="cpu", packed=packed)
+            gaussians.load_ply(reference)
+            path = os.path.join(root, "point_cloud.ply")
+            elapsed = timed(gaussians.save_ply, path)
+            assert filecmp.cmp(reference, path, shallow=False), "save_ply output differs from plyfile (packed={})".format(packed)
+            print("  save_ply{} {:.2f}s, byte-identical after load_ply".format(" (packed)" if packed else "", elapsed))
+
+        xyz = rng.standard_normal((args.num_points, 3), dtype=np.float32)
+        rgb = rng.integers(0, 256, (args.num_points, 3), dtype=np.uint8)
+        reference = os.path.join(root, "reference_points.ply")
+        path = os.path.join(root, "points3D.ply")
+        print("Points ({}): plyfile {:.2f}s".format(args.num_points, timed(plyfile_store_ply, reference, xyz, rgb)))
+        elapsed = timed(storePly, path, xyz, rgb)
+        assert filecmp.cmp(reference, path, shallow=False), "storePly output differs from plyfile"
+        pcd = fetchPly(path)
+        assert np.array_equal(pcd.points, xyz) and np.array_equal(np.round(pcd.colors * 255), rgb)
+        print("  storePly {:.2f}s, byte-identical, read back by fetchPly".format(elapsed))
+    print("OK")
@@ -0,0 +1,278 @@
+#
+# Rasterizer regression check, CUDA parity check and CPU benchmark.
+#
+# Renders seeded random scenes with the "torch" backend and checks:
+#   - a single isotropic Gaussian on the optical axis against the closed-form image
+#     (its color blended over the background at the center, exactly the background
+#     outside its tiles, the falloff of the low-pass filtered 2D Gaussian next to it);
+#   - a random scene against a per-pixel reference compositor written from the CUDA
+#     renderCUDA loop (one Gaussian at a time, in depth order, with the 1/255 alpha cutoff
+#     and the 1e-4 transmittance stop), fed the same preprocess output;
+#   - gradients: finite and non-zero for every input, and the opacity, color and
+#     screen-space mean gradients against central differences in float64.
+# When the diff_gaussian_rasterization extension is built and a GPU is present, the same
+# scene is also rendered with the "cuda" backend and the color, inverse depth, radii and
+# gradients of both are compared; otherwise that part is skipped.
+# Render times are the best of --repeats runs.
+#
+
+import math
+import time
+import numpy as np
+import torch
+from argparse import ArgumentParser
+from gaussian_renderer import RASTERIZER_BACKENDS
+from gaussian_renderer.torch_rasterizer import BLOCK_X, BLOCK_Y, preprocess, compute_colors, _compute_cov3D, \
+    _unpack_cov3D
+from utils.graphics_utils import getWorld2View2, getProjectionMatrix, fov2focal, focal2fov
+
+def make_settings(backend, width, height, fovx, bg, sh_degree, device, dtype=torch.float):
+    fovy = focal2fov(fov2focal(fovx, width), height)
+    world_view = torch.tensor(getWorld2View2(np.eye(3), np.zeros(3))).transpose(0, 1)
+    projection = getProjectionMatrix(znear=0.01, zfar=100.0, fovX=fovx, fovY=fovy).transpose(0, 1)
+    full_proj = world_view @ projection
+    RasterizationSettings, _ = RASTERIZER_BACKENDS[backend]
+    return RasterizationSettings(
+        image_height=height,
+        image_width=width,
+        tanfovx=math.tan(fovx * 0.5),
+        tanfovy=math.tan(fovy * 0.5),
+        bg=torch.tensor(bg, dtype=dtype, device=device),
+        scale_modifier=1.0,
+        viewmatrix=world_view.to(device=device, dtype=dtype),
+        projmatrix=full_proj.to(device=device, dtype=dtype),
+        sh_degree=sh_degree,
+        campos=torch.linalg.inv(world_view)[3, :3].to(device=device, dtype=dtype),
+        prefiltered=False,
+        debug=False,
+        antialiasing=False)
+
+def make_scene(num_gaussians, sh_degree, tanfovx, tanfovy, device, seed=0):
+    generator = torch.Generator().manual_seed(seed)
+    rand = lambda *shape: torch.rand(*shape, generator=generator)
+    randn = lambda *shape: torch.randn(*shape, generator=generator)
+    z = 2.0 + 6.0 * rand(num_gaussians)
+    xyz = torch.stack(((2 * rand(num_gaussians) - 1) * z * tanfovx,
+                       (2 * rand(num_gaussians) - 1) * z * tanfovy, z), dim=1)
+    shs = 0.3 * randn(num_gaussians, (sh_degree + 1) ** 2, 3)
+    shs[:, 0] += 0.5
+    scene = {
+        "means3D": xyz,
+        "opacities": torch.sigmoid(randn(num_gaussians, 1)),
+        "shs": shs,
+        "scales": torch.exp(math.log(0.01) + math.log(15.0) * rand(num_gaussians, 3)),
+        "rotations": torch.nn.functional.normalize(randn(num_gaussians, 4), dim=1),
+    }
+    return {name: tensor.to(device) for name, tensor in scene.items()}
+
+def rasterize(backend, settings, scene):
+    _, Rasterizer = RASTERIZER_BACKENDS[backend]
+    means2D = torch.zeros_like(scene["means3D"], requires_grad=True)
+    color, radii, invdepth = Rasterizer(raster_settings=settings)(means2D=means2D, **scene)
+    return color, radii, invdepth, means2D
+
+def reference_composite(settings, point_image, depths, conics, opacities, colors, radii, rect):
+    """Per-pixel compositing, one Gaussian at a time in depth order, as in renderCUDA."""
+    H, W = settings.image_height, settings.image_width
+    ys, xs = torch.meshgrid(torch.arange(H, dtype=colors.dtype), torch.arange(W, dtype=colors.dtype), indexing="ij")
+    pixels = torch.stack((xs.reshape(-1), ys.reshape(-1)), dim=-1)
+    tile_x, tile_y = pixels[:, 0].long() // BLOCK_X, pixels[:, 1].long() // BLOCK_Y
+
+    T = torch.ones(H * W, dtype=colors.dtype)
+    C = torch.zeros((H * W, 3), dtype=colors.dtype)
+    D = torch.zeros(H * W, dtype=colors.dtype)
+    done = torch.zeros(H * W, dtype=torch.bool)
+    visible = torch.nonzero(radii > 0).squeeze(1)
+    for g in visible[torch.argsort(depths[visible], stable=True)].tolist():
+        in_rect = (tile_x >= rect[0][g]) & (tile_x < rect[2][g]) & (tile_y >= rect[1][g]) & (tile_y < rect[3][g])
+        d = point_image[g] - pixels
+        con = conics[g]
+        power = -0.5 * (con[0] * d[:, 0] * d[:, 0] + con[2] * d[:, 1] * d[:, 1]) - con[1] * d[:, 0] * d[:, 1]
+        alpha = torch.clamp_max(opacities[g] * torch.exp(power), 0.99)
+        active = in_rect & (power <= 0.0) & (alpha >= 1.0 / 255.0) & ~done
+        test_T = T * (1 - alpha)
+        stop = active & (test_T < 0.0001)
+        done = done | stop
+        take = active & ~stop
+        weight = torch.where(take, alpha * T, torch.zeros_like(alpha))
+        C = C + weight[:, None] * colors[g]
+        D = D + weight / depths[g]
+        T = torch.where(take, test_T, T)
+    bg = settings.bg.to(colors.dtype)
+    return (C + T[:, None] * bg).T.reshape(3, H, W), D.reshape(1, H, W)
+
+def check_single_gaussian(width=65, height=49):
+    # odd sizes put the optical axis on the center of a pixel
+    bg = (0.1, 0.2, 0.3)
+    settings = make_settings("torch", width, height, math.radians(60), bg, 0, "cpu")
+    z, sigma, opacity = 4.0, 0.05, 0.7
+    color = torch.tensor([[0.9, 0.4, 0.1]])
+    image, radii, invdepth, _ = rasterize("torch", settings, {
+        "means3D": torch.tensor([[0.0, 0.0, z]]),
+        "opacities": torch.tensor([[opacity]]),
+        "colors_precomp": color,
+        "scales": torch.full((1, 3), sigma),
+        "rotations": torch.tensor([[1.0, 0.0, 0.0, 0.0]]),
+    })
+    focal = width / (2 * settings.tanfovx)
+    var2D = (focal * sigma / z) ** 2 + 0.3
+    cx, cy = (width - 1) // 2, (height - 1) // 2
+    expected_center = opacity * color[0] + (1 - opacity) * torch.tensor(bg)
+    # both eigenvalues are var2D; the radius bound adds the sqrt(0.1) floor of the discriminant
+    assert radii.tolist() == [math.ceil(3 * math.sqrt(var2D + math.sqrt(0.1)))], radii
+    assert torch.allclose(image[:, cy, cx], expected_center, atol=1e-5), image[:, cy, cx]
+    assert torch.allclose(invdepth[0, cy, cx], torch.tensor(opacity / z), atol=1e-6)
+    alpha = opacity * math.exp(-0.5 / var2D)
+    expected_next = alpha * color[0] + (1 - alpha) * torch.tensor(bg)
+    assert torch.allclose(image[:, cy, cx + 1], expected_next, atol=1e-5)
+    assert torch.allclose(image[:, cy + 1, cx], expected_next, atol=1e-5)
+
+    # pixels in tiles the Gaussian does not touch keep the exact background
+    r = radii.item()
+    outside = torch.ones((height, width), dtype=torch.bool)
+    outside[(cy - r) // BLOCK_Y * BLOCK_Y:((cy + r) // BLOCK_Y + 1) * BLOCK_Y,
+            (cx - r) // BLOCK_X * BLOCK_X:((cx + r) // BLOCK_X + 1) * BLOCK_X] = False
+    assert outside.any()
+    assert torch.equal(image[:, outside], torch.tensor(bg)[:, None].expand(3, int(outside.sum())))
+    assert torch.equal(invdepth[:, outside], torch.zeros((1, int(outside.sum()))))
+
+def check_reference(settings, scene):
+    color, radii, invdepth, _ = rasterize("torch", settings, scene)
+    with torch.no_grad():
+        cov3D = _compute_cov3D(scene["scales"], scene["rotations"], settings.scale_modifier)
+        point_image, depths, conics, opacity_scale, ref_radii, rect = preprocess(scene["means3D"], cov3D, settings)
+        colors = compute_colors(scene["means3D"], scene["shs"], settings)
+        opacities = scene["opacities"].squeeze(-1) * opacity_scale
+        ref_color, ref_invdepth = reference_composite(settings, point_image, depths, conics, opacities, colors,
+                                                      ref_radii, rect)
+    assert torch.equal(radii, ref_radii.int())
+    color_diff = (color - ref_color).abs().max().item()
+    invdepth_diff = (invdepth - ref_invdepth).abs().max().item()
+    assert color_diff < 1e-4 and invdepth_diff < 1e-4, (color_diff, invdepth_diff)
+    return color_diff, invdepth_diff
+
+def check_gradients(settings, scene):
+    scene = {name: tensor.clone().requires_grad_(True) for name, tensor in scene.items()}
+    color, _, invdepth, means2D = rasterize("torch", settings, scene)
+    weights = torch.rand(color.shape, generator=torch.Generator().manual_seed(1))
+    ((color * weights).sum() + invdepth.sum()).backward()
+    for name, tensor in list(scene.items()) + [("means2D", means2D)]:
+        assert torch.isfinite(tensor.grad).all() and tensor.grad.abs().sum() > 0, name
+
+def check_finite_differences(width=48, height=32, num_gaussians=40, eps=1e-6):
+    # float64 end to end: precomputed covariances and colors skip the float32-only helpers
+    settings = make_settings("torch", width, height, math.radians(60), (0.1, 0.2, 0.3), 0, "cpu", torch.double)
+    scene = make_scene(num_gaussians, 0, settings.tanfovx, settings.tanfovy, "cpu", seed=2)
+    cov3D = _compute_cov3D(scene["scales"], scene["rotations"], 1.0).double()
+    inputs = {
+        "means3D": scene["means3D"].double(),
+        "opacities": scene["opacities"].double().clamp(0.05, 0.6).requires_grad_(True),
+        "colors_precomp": torch.rand((num_gaussians, 3), dtype=torch.double,
+                                     generator=torch.Generator().manual_seed(3)).requires_grad_(True),
+        "cov3D_precomp": cov3D[:, [0, 0, 0, 1, 1, 2], [0, 1, 2, 1, 2, 2]].contiguous(),
+    }
+    assert torch.equal(_unpack_cov3D(inputs["cov3D_precomp"]), cov3D)
+    weights = torch.rand((3, height, width), dtype=torch.double, generator=torch.Generator().manual_seed(4))
+    _, Rasterizer = RASTERIZER_BACKENDS["torch"]
+    rasterizer = Rasterizer(raster_settings=settings)
+
+    def loss(means2D):
+        color, _, _ = rasterizer(means2D=means2D, **inputs)
+        return (color * weights).sum()
+
+    means2D = torch.zeros_like(inputs["means3D"], requires_grad=True)
+    loss(means2D).backward()
+    worst = 0.0
+    with torch.no_grad():
+        for name, tensor in (("opacities", inputs["opacities"]), ("colors_precomp", inputs["colors_precomp"]),
+                             ("means2D", means2D)):
+            flat, grad = tensor.view(-1), tensor.grad.view(-1)
+            # every 7th Gaussian; the third screen-space coordinate is unused
+            indices = [i for i in range(flat.numel()) if (i // tensor.shape[1]) % 7 == 0
+                       and not (name == "means2D" and i % 3 == 2)]
+            for index in indices:
+                original = flat[index].item()
+                flat[index] = original + eps
+                plus = loss(means2D).item()
+                flat[index] = original - eps
+                minus = loss(means2D).item()
+                flat[index] = original
+                numeric = (plus - minus) / (2 * eps)
+                error = abs(numeric - grad[index].item()) / max(1.0, abs(numeric))
+                assert error < 1e-4, (name, index, numeric, grad[index].item())
+                worst = max(worst, error)
+    return worst
+
+def compare_cuda(args, scene_cpu):
+    device = torch.device("cuda")
+    outputs, grads = {}, {}
+    for backend in ("torch", "cuda"):
+        settings = make_settings(backend, args.width, args.height, math.radians(args.fovx), (0.0, 0.0, 0.0),
+                                 args.sh_degree, device)
+        scene = {name: tensor.to(device).requires_grad_(True) for name, tensor in scene_cpu.items()}
+        color, radii, invdepth, means2D = rasterize(backend, settings, scene)
+        weights = torch.rand(color.shape, generator=torch.Generator().manual_seed(1)).to(device)
+        ((color * weights).sum() + invdepth.sum()).backward()
+        outputs[backend] = (color.detach().cpu(), radii.cpu(), invdepth.detach().cpu())
+        grads[backend] = {name: tensor.grad.cpu() for name, tensor in list(scene.items()) + [("means2D", means2D)]}
+
+    (color, radii, invdepth), (cuda_color, cuda_radii, cuda_invdepth) = outputs["torch"], outputs["cuda"]
+    mse = ((color - cuda_color) ** 2).mean().item()
+    psnr = 10 * math.log10(1.0 / mse) if mse > 0 else float("inf")
+    radii_mismatch = (radii != cuda_radii).float().mean().item()
+    print("torch vs cuda: color max abs diff {:.2e}, PSNR {:.1f} dB, inverse depth max abs diff {:.2e}, "
+          "radii mismatch {:.3%}".format((color - cuda_color).abs().max().item(), psnr,
+                                         (invdepth - cuda_invdepth).abs().max().item(), radii_mismatch))
+    assert psnr > 50 and radii_mismatch < 0.001
+    for name, grad in grads["torch"].items():
+        cuda_grad = grads["cuda"][name]
+        if name == "means2D":
+            grad, cuda_grad = grad[:, :2], cuda_grad[:, :2]
+        cosine = torch.nn.functional.cosine_similarity(grad.flatten(), cuda_grad.flatten(), dim=0).item()
+        ratio = (grad.norm() / cuda_grad.norm()).item()
+        print("  {:<10} gradient cosine {:.5f}, norm ratio {:.4f}".format(name, cosine, ratio))
+        assert cosine > 0.99 and abs(ratio - 1) < 0.02, name
+
+def best_of(repeats, fn, *args):
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = fn(*args)
+        times.append(time.perf_counter() - start)
+    return result, min(times)
+
+if __name__ == "__main__":
+    parser = ArgumentParser(description="Rasterizer regression check, CUDA parity check and benchmark")
+    parser.add_argument("--num_gaussians", type=int, default=20_000)
+    parser.add_argument("--width", type=int, default=320)
+    parser.add_argument("--height", type=int, default=240)
+    parser.add_argument("--fovx", type=float, default=60.0, help="horizontal field of view in degrees")
+    parser.add_argument("--sh_degree", type=int, default=3)
+    parser.add_argument("--repeats", type=int, default=3)
+    args = parser.parse_args()
+
+    check_single_gaussian()
+    print("single Gaussian matches the closed form")
+    small = make_settings("torch", 96, 80, math.radians(args.fovx), (0.1, 0.2, 0.3), args.sh_degree, "cpu")
+    small_scene = make_scene(300, args.sh_degree, small.tanfovx, small.tanfovy, "cpu")
+    color_diff, invdepth_diff = check_reference(small, small_scene)
+    print("tiled compositing matches the per-pixel reference (max abs diff color {:.1e}, inverse depth {:.1e})".format(
+        color_diff, invdepth_diff))
+    check_gradients(small, small_scene)
+    print("gradients finite and non-zero for every input, central differences agree (max rel. error {:.1e})".format(
+        check_finite_differences()))
+
+    settings = make_settings("torch", args.width, args.height, math.radians(args.fovx), (0.0, 0.0, 0.0),
+                             args.sh_degree, "cpu")
+    scene = make_scene(args.num_gaussians, args.sh_degree, settings.tanfovx, settings.tanfovy, "cpu")
+    with torch.no_grad():
+        (_, radii, _, _), elapsed = best_of(args.repeats, rasterize, "torch", settings, scene)
+    print("torch backend, CPU: {} Gaussians ({} visible) at {}x{}: {:.0f} ms per render".format(
+        args.num_gaussians, int((radii > 0).sum()), args.width, args.height, elapsed * 1000))
+
+    if "cuda" in RASTERIZER_BACKENDS and torch.cuda.is_available():
+        compare_cuda(args, scene)
+    else:
+        print("CUDA parity skipped: {}".format("no GPU" if "cuda" in RASTERIZER_BACKENDS
+                                               else "diff_gaussian_rasterization is not built"))
+    print("OK")
@@ -0,0 +1,248 @@
+#
+# CPU checks for GaussianModel.
+#
+# Initializes a model on the CPU from a synthetic SfM-like point cloud (--num_points
+# points on a few noisy planes plus sparse outliers, 1M by default) and checks the
+# initial scales, and knn_mean_dist2 with k=1, against a brute-force search for a random
+# sample of points. Reports the time and the peak memory of create_from_pcd.
+#
+# Then, on a --num_model_points model with Adam moments, in the plain and the packed
+# parameter layout, checks every model operation on the CPU:
+#   - export/load: save_ply and load_ply round-trip every parameter exactly, the
+#     compressed export loads back with the same count and bounds;
+#   - edit: reset_opacity caps the opacities and clears only their moments,
+#     oneupSHdegree, replace_tensor_to_optimizer;
+#   - prune: prune_points keeps exactly the unmasked rows of parameters, moments and ids;
+#   - densify: densify_and_prune clones small and splits large Gaussians over the gradient
+#     threshold, prunes transparent ones, and training continues with an optimizer step;
+#   - render: one view of the loaded model through render() with the torch rasterizer.
+# Every tensor must stay on the CPU.
+#
+
+import os
+import math
+import time
+import tempfile
+import numpy as np
+import torch
+from argparse import ArgumentParser, Namespace
+from scene.gaussian_model import GaussianModel
+from scene.cameras import MiniCam
+from arguments import OptimizationParams
+from gaussian_renderer import render
+from utils.general_utils import knn_mean_dist2
+from utils.graphics_utils import BasicPointCloud, getWorld2View2, getProjectionMatrix
+
+def _rss_kb(field):
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith(field + ":"):
+                return int(line.split()[1])
+
+def make_point_cloud(num_points, rng):
+    # floor, two walls and a table top, with a percent of outliers spread through the room
+    planes = rng.integers(0, 4, num_points)
+    uv = rng.random((num_points, 2)) * [[10.0, 8.0]]
+    points = np.empty((num_points, 3))
+    points[planes == 0] = np.column_stack((uv[planes == 0], np.zeros((planes == 0).sum())))
+    points[planes == 1] = np.column_stack((uv[planes == 1, 0], np.zeros((planes == 1).sum()), uv[planes == 1, 1] / 3))
+    points[planes == 2] = np.column_stack((np.zeros((planes == 2).sum()), uv[planes == 2, 1], uv[planes == 2, 0] / 4))
+    points[planes == 3] = np.column_stack((3 + uv[planes == 3] / 5, np.full((planes == 3).sum(), 0.8)))
+    points += rng.normal(scale=0.005, size=points.shape)
+    outliers = rng.random(num_points) < 0.01
+    points[outliers] = rng.random((outliers.sum(), 3)) * [10.0, 8.0, 3.0]
+    colors = rng.random((num_points, 3))
+    return BasicPointCloud(points=points, colors=colors, normals=np.zeros_like(points))
+
+def brute_force_mean_dist2(points, queries, k=3, chunk=16):
+    points = points.double()
+    result = []
+    for start in range(0, queries.numel(), chunk):
+        index = queries[start:start + chunk]
+        dist2 = sum((points[index, axis, None] - points[None, :, axis]).square_() for axis in range(3))
+        dist2[torch.arange(index.numel()), index] = float("inf")
+        result.append(dist2.topk(k, dim=1, largest=False).values.mean(dim=1))
+    return torch.cat(result)
+
+def check_knn(points, dist2, k, queries):
+    expected = brute_force_mean_dist2(points, queries, k=k)
+    assert torch.allclose(dist2[queries].double(), expected, rtol=1e-4, atol=1e-10), \
+        "k={}: knn_mean_dist2 differs from brute force".format(k)
+
+def training_model(pcd, packed):
+    gaussians = GaussianModel(3, device="cpu", packed=packed)
+    gaussians.create_from_pcd(pcd, [], spatial_lr_scale=1.0)
+    parser = ArgumentParser()
+    op = OptimizationParams(parser)
+    gaussians.training_setup(op.extract(parser.parse_args([])))
+    optimizer_step(gaussians, seed=0)
+    return gaussians
+
+def optimizer_step(gaussians, seed):
+    generator = torch.Generator().manual_seed(seed)
+    for group in gaussians.optimizer.param_groups:
+        param = group["params"][0]
+        param.grad = torch.randn(param.shape, generator=generator)
+    gaussians.optimizer.step()
+    gaussians.optimizer.zero_grad(set_to_none=True)
+    gaussians.invalidate_activations()
+
+def snapshot(gaussians):
+    """name -> (parameter, exp_avg, exp_avg_sq) copies, plus the row ids."""
+    state = {}
+    for group in gaussians.optimizer.param_groups:
+        param = group["params"][0]
+        moments = gaussians.optimizer.state[param]
+        state[group["name"]] = (param.detach().clone(), moments["exp_avg"].clone(), moments["exp_avg_sq"].clone())
+    state["row_ids"] = (gaussians.row_ids.clone(),)
+    return state
+
+def check_on_cpu(gaussians):
+    tensors = [gaussians._xyz, gaussians._features_dc, gaussians._features_rest, gaussians._opacity,
+               gaussians._scaling, gaussians._rotation, gaussians.row_ids, gaussians.xyz_gradient_accum,
+               gaussians.denom, gaussians.max_radii2D]
+    tensors += [t for state in gaussians.optimizer.state.values() for t in state.values() if torch.is_tensor(t)]
+    assert all(t.device.type == "cpu" for t in tensors), "tensor left the CPU"
+
+def check_export_load(gaussians, root, label):
+    path = os.path.join(root, label, "point_cloud.ply")
+    gaussians.save_ply(path)
+    loaded = GaussianModel(3, device="cpu")
+    loaded.load_ply(path)
+    for name, param in gaussians._parameter_dict().items():
+        assert torch.equal(loaded._parameter_dict()[name].detach(), param.detach()), "{}: {} changed by save/load".format(label, name)
+
+    compressed_path = os.path.join(root, label, "point_cloud.compressed.ply")
+    gaussians.save_compressed_ply(compressed_path)
+    decoded = GaussianModel(3, device="cpu")
+    decoded.load_ply(compressed_path)
+    xyz, decoded_xyz = gaussians.get_xyz.detach(), decoded.get_xyz.detach()
+    assert decoded_xyz.shape == xyz.shape and torch.isfinite(decoded_xyz).all()
+    tolerance = 0.01 * (xyz.max(dim=0).values - xyz.min(dim=0).values)
+    assert ((decoded_xyz.min(dim=0).values - xyz.min(dim=0).values).abs() <= tolerance).all()
+    assert ((decoded_xyz.max(dim=0).values - xyz.max(dim=0).values).abs() <= tolerance).all()
+    return loaded
+
+def check_edit(gaussians):
+    before = snapshot(gaussians)
+    gaussians.reset_opacity()
+    opacity = gaussians.get_opacity.detach()
+    assert torch.allclose(opacity, torch.sigmoid(before["opacity"][0]).clamp_max(0.01), atol=1e-6)
+    _, exp_avg, exp_avg_sq = snapshot(gaussians)["opacity"]
+    assert not exp_avg.any() and not exp_avg_sq.any(), "reset_opacity kept the opacity moments"
+    for name in ("xyz", "f_dc", "f_rest", "scaling", "rotation"):
+        assert all(torch.equal(a, b) for a, b in zip(before[name], snapshot(gaussians)[name])), name
+
+    moved = gaussians._xyz.detach() + torch.tensor([0.5, -0.25, 1.0])
+    gaussians._xyz = gaussians.replace_tensor_to_optimizer(moved, "xyz")["xyz"]
+    gaussians.invalidate_activations()
+    assert torch.equal(gaussians.get_xyz.detach(), moved)
+
+    degree = gaussians.active_sh_degree
+    gaussians.oneupSHdegree()
+    assert gaussians.active_sh_degree == min(degree + 1, gaussians.max_sh_degree)
+
+def check_prune(gaussians, generator):
+    before = snapshot(gaussians)
+    mask = torch.rand(gaussians.get_xyz.shape[0], generator=generator) < 0.3
+    gaussians.prune_points(mask)
+    after = snapshot(gaussians)
+    for name, tensors in before.items():
+        for old, new in zip(tensors, after[name]):
+            assert torch.equal(new, old[~mask]), "prune_points: {} rows differ".format(name)
+    assert gaussians.xyz_gradient_accum.shape[0] == gaussians.get_xyz.shape[0]
+
+def check_densify(gaussians, generator):
+    n = gaussians.get_xyz.shape[0]
+    extent = 1.0
+    # about half of the selected Gaussians are cloned, half split
+    max_scale = gaussians.get_scaling.detach().max(dim=1).values
+    gaussians.percent_dense = max_scale.median().item() / extent
+    large = max_scale > gaussians.percent_dense * extent
+    selected = torch.rand(n, generator=generator) < 0.2
+    transparent = ~selected & (torch.rand(n, generator=generator) < 0.1)
+    with torch.no_grad():
+        gaussians._opacity[transparent] = -10.0
+        gaussians._opacity[~transparent] = 0.0
+        gaussians.invalidate_activations()
+    gaussians.xyz_gradient_accum = torch.where(selected, 1.0, 0.0)[:, None]
+    gaussians.denom = torch.ones((n, 1))
+    before = snapshot(gaussians)
+    num_clone, num_split = int((selected & ~large).sum()), int((selected & large).sum())
+
+    gaussians.densify_and_prune(0.5, 0.005, extent, None, torch.zeros(n))
+    after = snapshot(gaussians)
+    survivors = ~transparent & ~(selected & large)
+    assert gaussians.get_xyz.shape[0] == int(survivors.sum()) + num_clone + 2 * num_split
+
+    # originals keep their ids and values; clones follow them, then the split children
+    kept = int(survivors.sum())
+    assert torch.equal(after["row_ids"][0][:kept], before["row_ids"][0][survivors])
+    for name in ("xyz", "f_dc", "f_rest", "scaling", "rotation"):
+        assert torch.equal(after[name][0][:kept], before[name][0][survivors]), name
+        assert torch.equal(after[name][0][kept:kept + num_clone], before[name][0][selected & ~large]), name
+    children = after["scaling"][0][kept + num_clone:]
+    parents = before["scaling"][0][selected & large].repeat(2, 1)
+    assert torch.allclose(torch.exp(children), torch.exp(parents) / 1.6, rtol=1e-5)
+    assert not after["xyz"][1][kept:].any(), "new Gaussians must start with zero moments"
+
+    check_on_cpu(gaussians)
+    optimizer_step(gaussians, seed=1)
+    assert all(torch.isfinite(group["params"][0]).all() for group in gaussians.optimizer.param_groups)
+    return num_clone, num_split
+
+def check_render(gaussians, width=64, height=48):
+    fovx = math.radians(70)
+    fovy = 2 * math.atan(math.tan(fovx / 2) * height / width)
+    # camera in front of the table, looking along +y at the wall
+    world_view = torch.tensor(getWorld2View2(np.array([[1.0, 0, 0], [0, 0, -1], [0, 1, 0]]), np.array([-5.0, 1.0, 4.0]))).transpose(0, 1)
+    full_proj = world_view @ getProjectionMatrix(znear=0.01, zfar=100.0, fovX=fovx, fovY=fovy).transpose(0, 1)
+    camera = MiniCam(width, height, fovy, fovx, 0.01, 100.0, world_view, full_proj)
+    pipe = Namespace(rasterizer="auto", debug=False, antialiasing=False, compute_cov3D_python=False, convert_SHs_python=False)
+    out = render(camera, gaussians, pipe, torch.zeros(3))
+    assert out["render"].shape == (3, height, width) and out["render"].device.type == "cpu"
+    assert int((out["radii"] > 0).sum()) > 0, "nothing visible"
+
+if __name__ == "__main__":
+    parser = ArgumentParser(description="CPU checks for GaussianModel")
+    parser.add_argument("--num_points", type=int, default=1_000_000)
+    parser.add_argument("--num_queries", type=int, default=500, help="points checked against brute force")
+    parser.add_argument("--num_model_points", type=int, default=20_000)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    generator = torch.Generator().manual_seed(0)
+    pcd = make_point_cloud(args.num_points, rng)
+
+    with open("/proc/self/clear_refs", "w") as f:
+        f.write("5")
+    baseline = _rss_kb("VmRSS")
+    gaussians = GaussianModel(3, device="cpu")
+    start = time.perf_counter()
+    gaussians.create_from_pcd(pcd, [], spatial_lr_scale=1.0)
+    elapsed = time.perf_counter() - start
+    print("create_from_pcd, {} points: {:.1f}s, peak +{:.0f} MB".format(
+        args.num_points, elapsed, (_rss_kb("VmHWM") - baseline) / 1024))
+
+    points = gaussians.get_xyz.detach()
+    queries = torch.randint(points.shape[0], (args.num_queries,), generator=generator)
+    # create_from_pcd stores log(sqrt(mean 3-NN squared distance)) as every scale
+    check_knn(points, gaussians.get_scaling.detach()[:, 0].square(), 3, queries)
+    check_knn(points, knn_mean_dist2(points, k=1), 1, queries)
+    print("initial scales and 1-NN distances match brute force for {} sampled points".format(args.num_queries))
+    del gaussians, points
+
+    pcd = make_point_cloud(args.num_model_points, rng)
+    with tempfile.TemporaryDirectory() as root:
+        for packed in (False, True):
+            label = "packed" if packed else "plain"
+            gaussians = training_model(pcd, packed)
+            loaded = check_export_load(gaussians, root, label)
+            check_edit(gaussians)
+            check_prune(gaussians, generator)
+            num_clone, num_split = check_densify(gaussians, generator)
+            check_on_cpu(gaussians)
+            check_render(loaded)
+            print("{} layout: export/load, edit, prune, densify ({} cloned, {} split) and render OK on the CPU".format(
+                label, num_clone, num_split))
+    print("OK")
@@ -0,0 +1,83 @@
+#
+# Export a trained point_cloud.ply in the compressed PLY layout and report the size /
+# quality trade-off for each number of exported SH bands.
+#
+# Quality is measured on the decoded attributes:
+#   position  - PSNR against the scene's bounding box diagonal
+#   color     - PSNR of the base color (SH DC) in [0, 1]
+#   opacity   - PSNR of sigmoid(opacity) in [0, 1]
+#   scale     - PSNR of the log scales against their range
+#   rotation  - mean angle between original and decoded rotations, in degrees
+#   sh        - PSNR of the exported higher-order SH coefficients against SH_RANGE
+#
+
+import os
+import tempfile
+import numpy as np
+from argparse import ArgumentParser
+from plyfile import PlyData
+from utils.ply_utils import read_float_vertex_ply
+from utils.compressed_ply import write_compressed_ply, read_compressed_ply, truncate_sh, morton_order, SH_C0, SH_RANGE
+
+def psnr(reference, decoded, peak):
+    mse = np.mean((reference.astype(np.float64) - decoded) ** 2)
+    return float("inf") if mse == 0 else 10 * np.log10(peak ** 2 / mse)
+
+def block(attributes, names, prefix):
+    columns = sorted((i for i, name in enumerate(names) if name.startswith(prefix)), key=lambda i: int(names[i].split('_')[-1]))
+    return attributes[:, columns]
+
+def report(original, names, decoded, decoded_names):
+    # the encoder stores splats in Morton order
+    original = original[morton_order(original[:, [names.index(axis) for axis in "xyz"]])]
+    result = {}
+    position = original[:, [names.index(axis) for axis in "xyz"]]
+    decoded_position = decoded[:, [decoded_names.index(axis) for axis in "xyz"]]
+    result["position"] = psnr(position, decoded_position, np.linalg.norm(position.max(0) - position.min(0)))
+    result["color"] = psnr(block(original, names, "f_dc_") * SH_C0 + 0.5, block(decoded, decoded_names, "f_dc_") * SH_C0 + 0.5, 1.0)
+    sigmoid = lambda x: 1 / (1 + np.exp(-x))
+    result["opacity"] = psnr(sigmoid(original[:, names.index("opacity")]), sigmoid(decoded[:, decoded_names.index("opacity")]), 1.0)
+    scales = block(original, names, "scale_")
+    result["scale"] = psnr(scales, block(decoded, decoded_names, "scale_"), scales.max() - scales.min())
+    rot = block(original, names, "rot")
+    rot = rot / np.linalg.norm(rot, axis=1, keepdims=True)
+    decoded_rot = block(decoded, decoded_names, "rot")
+    dot = np.clip(np.abs((rot * decoded_rot).sum(axis=1)), 0, 1)
+    result["rotation_deg"] = float(np.degrees(2 * np.arccos(dot)).mean())
+    decoded_rest = block(decoded, decoded_names, "f_rest_")
+    if decoded_rest.shape[1] > 0:
+        reference, reference_names = truncate_sh(original, names, int(np.sqrt(decoded_rest.shape[1] // 3 + 1)) - 1)
+        result["sh"] = psnr(block(reference, reference_names, "f_rest_"), decoded_rest, SH_RANGE)
+    return result
+
+if __name__ == "__main__":
+    parser = ArgumentParser(description="Compressed PLY export with size/quality report")
+    parser.add_argument("input", type=str)
+    parser.add_argument("--output", type=str, default=None, help="defaults to <input>.compressed.ply")
+    parser.add_argument("--sh_degree", type=int, default=None, help="SH bands to export (default: all)")
+    args = parser.parse_args()
+
+    loaded = read_float_vertex_ply(args.input)
+    if loaded is None:
+        vertices = PlyData.read(args.input).elements[0]
+        names = [p.name for p in vertices.properties]
+        attributes = np.column_stack([np.asarray(vertices[name], dtype=np.float32) for name in names])
+    else:
+        attributes, names = np.asarray(loaded[0]), loaded[1]
+
+    original_size = os.path.getsize(args.input)
+    max_degree = int(np.sqrt(len([n for n in names if n.startswith("f_rest_")]) // 3 + 1)) - 1
+    print("{} splats, {:.2f} MB, SH degree {}".format(attributes.shape[0], original_size / 2**20, max_degree))
+    with tempfile.TemporaryDirectory() as tmp:
+        for degree in range(max_degree + 1):
+            path = os.path.join(tmp, "sh{}.ply".format(degree))
+            write_compressed_ply(path, attributes, names, degree)
+            decoded, decoded_names = read_compressed_ply(path)
+            size = os.path.getsize(path)
+            metrics = report(attributes, names, decoded, decoded_names)
+            print("  SH degree {}: {:.2f} MB ({:.1f}x) ".format(degree, size / 2**20, original_size / size) +
+                  " ".join("{}={:.2f}".format(key, value) for key, value in metrics.items()))
+
+    output = args.output or os.path.splitext(args.input)[0] + ".compressed.ply"
+    write_compressed_ply(output, attributes, names, args.sh_degree)
+    print("Wrote {} ({:.2f} MB)".format(output, os.path.getsize(output) / 2**20))
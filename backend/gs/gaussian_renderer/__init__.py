@@ -1,19 +1,43 @@
 import torch
 import math
-from diff_gaussian_rasterization import GaussianRasterizationSettings, GaussianRasterizer
 from scene.gaussian_model import GaussianModel
 from utils.sh_utils import eval_sh
+from gaussian_renderer.torch_rasterizer import TorchRasterizationSettings, TorchGaussianRasterizer
+
+# Rasterizer backends: name -> (settings class, rasterizer class).
+# "cuda" is the diff_gaussian_rasterization extension, "torch" the pure-PyTorch reference
+# implementation that also runs on CPU.
+RASTERIZER_BACKENDS = {
+    "torch": (TorchRasterizationSettings, TorchGaussianRasterizer),
+}
+try:
+    from diff_gaussian_rasterization import GaussianRasterizationSettings, GaussianRasterizer
+    RASTERIZER_BACKENDS["cuda"] = (GaussianRasterizationSettings, GaussianRasterizer)
+except ImportError:
+    pass
+
+def get_rasterizer_backend(name, device):
+    """Resolve a backend name; "auto" picks CUDA when the extension is built and the model is on GPU."""
+    if name == "auto":
+        name = "cuda" if device.type == "cuda" and "cuda" in RASTERIZER_BACKENDS else "torch"
+    if name not in RASTERIZER_BACKENDS:
+        raise ValueError("Unknown or unavailable rasterizer backend: {}".format(name))
+    return RASTERIZER_BACKENDS[name]
 
 def render(viewpoint_camera, pc : GaussianModel, pipe, bg_color : torch.Tensor, scaling_modifier = 1.0, 
     separate_sh = False, override_color = None, use_trained_exp=False):
     """
     Render the scene. 
     
-    Background tensor (bg_color) must be on GPU!
+    Background tensor (bg_color) must be on the same device as the model!
+    The rasterizer backend is chosen by pipe.rasterizer (auto / cuda / torch).
     """
  
+    device = pc.get_xyz.device
+    RasterizationSettings, Rasterizer = get_rasterizer_backend(getattr(pipe, "rasterizer", "auto"), device)
+
     # Create zero tensor. We will use it to make pytorch return gradients of the 2D (screen-space) means
-    screenspace_points = torch.zeros_like(pc.get_xyz, dtype=pc.get_xyz.dtype, requires_grad=True, device="cuda") + 0
+    screenspace_points = torch.zeros_like(pc.get_xyz, dtype=pc.get_xyz.dtype, requires_grad=True, device=device) + 0
     try:
         screenspace_points.retain_grad()
     except:
@@ -23,23 +47,23 @@ def render(viewpoint_camera, pc : GaussianModel, pipe, bg_color : torch.Tensor,
     tanfovx = math.tan(viewpoint_camera.FoVx * 0.5)
     tanfovy = math.tan(viewpoint_camera.FoVy * 0.5)
 
-    raster_settings = GaussianRasterizationSettings(
+    raster_settings = RasterizationSettings(
         image_height=int(viewpoint_camera.image_height),
         image_width=int(viewpoint_camera.image_width),
         tanfovx=tanfovx,
         tanfovy=tanfovy,
         bg=bg_color,
         scale_modifier=scaling_modifier,
-        viewmatrix=viewpoint_camera.world_view_transform,
-        projmatrix=viewpoint_camera.full_proj_transform,
+        viewmatrix=viewpoint_camera.world_view_transform.to(device),
+        projmatrix=viewpoint_camera.full_proj_transform.to(device),
         sh_degree=pc.active_sh_degree,
-        campos=viewpoint_camera.camera_center,
+        campos=viewpoint_camera.camera_center.to(device),
         prefiltered=False,
         debug=pipe.debug,
         antialiasing=pipe.antialiasing
     )
 
-    rasterizer = GaussianRasterizer(raster_settings=raster_settings)
+    rasterizer = Rasterizer(raster_settings=raster_settings)
 
     means3D = pc.get_xyz
     means2D = screenspace_points
@@ -60,7 +84,7 @@ def render(viewpoint_camera, pc : GaussianModel, pipe, bg_color : torch.Tensor,
     if override_color is None:
         if pipe.convert_SHs_python:
             shs_view = pc.get_features.transpose(1, 2).view(-1, 3, (pc.max_sh_degree+1)**2)
-            dir_pp = (pc.get_xyz - viewpoint_camera.camera_center.repeat(pc.get_features.shape[0], 1))
+            dir_pp = (pc.get_xyz - viewpoint_camera.camera_center.to(device).repeat(pc.get_features.shape[0], 1))
             dir_pp_normalized = dir_pp/dir_pp.norm(dim=1, keepdim=True)
             sh2rgb = eval_sh(pc.active_sh_degree, shs_view, dir_pp_normalized)
             colors_precomp = torch.clamp_min(sh2rgb + 0.5, 0.0)
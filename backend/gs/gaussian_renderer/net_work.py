@@ -55,7 +55,7 @@ class Network:
         self.conn.sendall(len(training_stats).to_bytes(4, 'little'))
         self.conn.sendall(training_stats.encode())
 
-    def receive(self):
+    def receive(self, device):
         message = self.read()
         width = message["resolution_x"]
         height = message["resolution_y"]
@@ -71,10 +71,10 @@ class Network:
                 self.do_rot_scale_python = bool(message["rot_scale_python"])
                 self.keep_alive = bool(message["keep_alive"])
                 self.scaling_modifer = message["scaling_modifier"]
-                world_view_transform = torch.reshape(torch.tensor(message["view_matrix"]), (4, 4)).cuda()
+                world_view_transform = torch.reshape(torch.tensor(message["view_matrix"]), (4, 4)).to(device)
                 world_view_transform[:, 1] = -world_view_transform[:, 1]
                 world_view_transform[:, 2] = -world_view_transform[:, 2]
-                full_proj_transform = torch.reshape(torch.tensor(message["view_projection_matrix"]), (4, 4)).cuda()
+                full_proj_transform = torch.reshape(torch.tensor(message["view_projection_matrix"]), (4, 4)).to(device)
                 full_proj_transform[:, 1] = -full_proj_transform[:, 1]
                 self.custom_cam = MiniCam(width, height, fovy, fovx, znear, zfar, world_view_transform, full_proj_transform)
                 self.edit_text = message["edit_text"]
@@ -92,7 +92,7 @@ class Network:
             edit_error = ""
             try:
                 net_image_bytes = None
-                self.receive()
+                self.receive(gaussians.device)
                 pipe.convert_SHs_python = self.do_shs_python
                 pipe.compute_cov3D_python = self.do_rot_scale_python
                 if len(self.edit_text) > 0:
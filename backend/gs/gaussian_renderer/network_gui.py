@@ -184,9 +184,10 @@ def try_connect():
     # Connection is handled by WebSocket server
     pass
 
-def receive():
+def receive(device="cpu"):
     """
     Receive camera parameters and training control from frontend
+    device: where the camera matrices go, the device of the model being rendered
     Returns: (custom_cam, do_training, convert_SHs_python, compute_cov3D_python, keep_alive, scaling_modifier)
     """
     global current_message, training_paused, single_step, stop_at_value
@@ -212,12 +213,12 @@ def receive():
             world_view_transform = torch.tensor(
                 np.array(view_matrix).reshape(4, 4), 
                 dtype=torch.float32
-            ).cuda()
+            ).to(device)
             
             full_proj_transform = torch.tensor(
                 np.array(view_proj_matrix).reshape(4, 4),
                 dtype=torch.float32
-            ).cuda()
+            ).to(device)
             
             # Create custom camera
             custom_cam = CustomCam(
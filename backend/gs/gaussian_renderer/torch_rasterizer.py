@@ -0,0 +1,252 @@
+#
+# Pure-PyTorch reference implementation of the forward pass of
+# diff_gaussian_rasterization, for rendering without a GPU.
+#
+# It follows the CUDA kernels step by step: preprocess (projection, 2D
+# covariance, SH colors, screen-space extent), duplication of Gaussians into
+# 16x16 tiles sorted by depth, and front-to-back alpha compositing per tile.
+# Each tile is composited as one (pixels x Gaussians) tensor expression, in
+# chunks along the Gaussian axis with the transmittance carried across chunks.
+#
+
+from typing import NamedTuple
+import torch
+from torch import nn
+from utils.sh_utils import eval_sh
+from utils.general_utils import build_scaling_rotation
+
+BLOCK_X = 16
+BLOCK_Y = 16
+# Gaussians composited per step inside a tile, bounds the (pixels x Gaussians) work tensors
+GAUSSIAN_CHUNK = 1024
+
+class TorchRasterizationSettings(NamedTuple):
+    """Same fields as diff_gaussian_rasterization.GaussianRasterizationSettings."""
+    image_height: int
+    image_width: int
+    tanfovx: float
+    tanfovy: float
+    bg: torch.Tensor
+    scale_modifier: float
+    viewmatrix: torch.Tensor
+    projmatrix: torch.Tensor
+    sh_degree: int
+    campos: torch.Tensor
+    prefiltered: bool
+    debug: bool
+    antialiasing: bool
+
+def _unpack_cov3D(cov3D_precomp):
+    # upper triangle (xx, xy, xz, yy, yz, zz) -> full symmetric 3x3
+    xx, xy, xz, yy, yz, zz = cov3D_precomp.unbind(-1)
+    return torch.stack((xx, xy, xz, xy, yy, yz, xz, yz, zz), dim=-1).view(-1, 3, 3)
+
+def _compute_cov3D(scales, rotations, scale_modifier):
+    L = build_scaling_rotation(scale_modifier * scales, rotations)
+    return L @ L.transpose(1, 2)
+
+def _get_rect(point_image, radii, grid_x, grid_y):
+    # (int) casts in the CUDA getRect truncate toward zero before clamping
+    r = radii.to(point_image.dtype)
+    x, y = point_image[:, 0], point_image[:, 1]
+    rect_min_x = torch.trunc((x - r) / BLOCK_X).clamp(0, grid_x).long()
+    rect_min_y = torch.trunc((y - r) / BLOCK_Y).clamp(0, grid_y).long()
+    rect_max_x = torch.trunc((x + r + BLOCK_X - 1) / BLOCK_X).clamp(0, grid_x).long()
+    rect_max_y = torch.trunc((y + r + BLOCK_Y - 1) / BLOCK_Y).clamp(0, grid_y).long()
+    return rect_min_x, rect_min_y, rect_max_x, rect_max_y
+
+def preprocess(means3D, cov3D, settings):
+    """
+    Project Gaussians to screen space.
+
+    Returns (point_image, depths, conics, opacity_scale, radii, rect) where radii is 0 for
+    culled Gaussians and rect is the covered tile range (min_x, min_y, max_x, max_y).
+    """
+    N = means3D.shape[0]
+    H, W = settings.image_height, settings.image_width
+    hom = torch.cat((means3D, means3D.new_ones(N, 1)), dim=1)
+    p_view = hom @ settings.viewmatrix
+    p_hom = hom @ settings.projmatrix
+    p_proj = p_hom[:, :3] / (p_hom[:, 3:4] + 0.0000001)
+
+    tz = p_view[:, 2]
+    in_frustum = tz > 0.2
+    tz = torch.where(in_frustum, tz, torch.ones_like(tz))
+
+    # EWA splatting: 2D covariance from the Jacobian of the perspective projection
+    focal_x = W / (2.0 * settings.tanfovx)
+    focal_y = H / (2.0 * settings.tanfovy)
+    limx = 1.3 * settings.tanfovx
+    limy = 1.3 * settings.tanfovy
+    tx = (p_view[:, 0] / tz).clamp(-limx, limx) * tz
+    ty = (p_view[:, 1] / tz).clamp(-limy, limy) * tz
+    zeros = torch.zeros_like(tz)
+    J = torch.stack((focal_x / tz, zeros, -(focal_x * tx) / (tz * tz),
+                     zeros, focal_y / tz, -(focal_y * ty) / (tz * tz)), dim=-1).view(N, 2, 3)
+    T = J @ settings.viewmatrix[:3, :3].T
+    cov2D = T @ cov3D @ T.transpose(1, 2)
+
+    a, b, c = cov2D[:, 0, 0], cov2D[:, 0, 1], cov2D[:, 1, 1]
+    det_cov = a * c - b * b
+    # low-pass filter: every Gaussian covers at least one pixel
+    a = a + 0.3
+    c = c + 0.3
+    det = a * c - b * b
+    if settings.antialiasing:
+        opacity_scale = torch.sqrt(torch.clamp_min(det_cov / det, 0.000025))
+    else:
+        opacity_scale = torch.ones_like(det)
+
+    valid = in_frustum & (det != 0)
+    det_inv = 1.0 / torch.where(valid, det, torch.ones_like(det))
+    conics = torch.stack((c * det_inv, -b * det_inv, a * det_inv), dim=-1)
+
+    mid = 0.5 * (a + c)
+    disc = torch.sqrt(torch.clamp_min(mid * mid - det, 0.1))
+    lambda_max = torch.maximum(mid + disc, mid - disc)
+    radii = torch.ceil(3.0 * torch.sqrt(lambda_max.detach().clamp_min(0))).long()
+
+    point_image = torch.stack((((p_proj[:, 0] + 1.0) * W - 1.0) * 0.5,
+                               ((p_proj[:, 1] + 1.0) * H - 1.0) * 0.5), dim=-1)
+
+    grid_x = (W + BLOCK_X - 1) // BLOCK_X
+    grid_y = (H + BLOCK_Y - 1) // BLOCK_Y
+    rect = _get_rect(point_image.detach(), radii, grid_x, grid_y)
+    touched = (rect[2] - rect[0]) * (rect[3] - rect[1]) > 0
+    radii = torch.where(valid & touched, radii, torch.zeros_like(radii))
+    return point_image, p_view[:, 2], conics, opacity_scale, radii, rect
+
+def compute_colors(means3D, shs, settings):
+    dirs = means3D - settings.campos
+    dirs = dirs / dirs.norm(dim=1, keepdim=True)
+    colors = eval_sh(settings.sh_degree, shs.transpose(1, 2), dirs)
+    return torch.clamp_min(colors + 0.5, 0.0)
+
+def _duplicate_to_tiles(depths, radii, rect, grid_x):
+    """
+    One (tile, Gaussian) entry per touched tile, sorted by tile and then by depth,
+    like the 64-bit keys sorted in the CUDA binning pass.
+    Returns (gaussian ids, tile ids).
+    """
+    visible = torch.nonzero(radii > 0).squeeze(1)
+    visible = visible[torch.argsort(depths[visible].detach(), stable=True)]
+    min_x, min_y, max_x, max_y = (r[visible] for r in rect)
+    span_x = max_x - min_x
+    counts = span_x * (max_y - min_y)
+
+    gaussian_ids = torch.repeat_interleave(visible, counts)
+    starts = torch.cumsum(counts, 0) - counts
+    local = torch.arange(gaussian_ids.shape[0], device=radii.device) - torch.repeat_interleave(starts, counts)
+    span_x = torch.repeat_interleave(span_x, counts)
+    tile_x = torch.repeat_interleave(min_x, counts) + local % span_x
+    tile_y = torch.repeat_interleave(min_y, counts) + local // span_x
+    tile_ids = tile_y * grid_x + tile_x
+
+    order = torch.argsort(tile_ids, stable=True)
+    return gaussian_ids[order], tile_ids[order]
+
+def composite(settings, point_image, depths, conics, opacities, colors, radii, rect):
+    """Front-to-back alpha compositing of the depth-sorted Gaussians of every tile."""
+    H, W = settings.image_height, settings.image_width
+    device = point_image.device
+    grid_x = (W + BLOCK_X - 1) // BLOCK_X
+    grid_y = (H + BLOCK_Y - 1) // BLOCK_Y
+    bg = settings.bg.to(device=device, dtype=colors.dtype)
+
+    out_color = bg[:, None, None].repeat(1, H, W)
+    out_invdepth = torch.zeros((1, H, W), dtype=colors.dtype, device=device)
+
+    gaussian_ids, tile_ids = _duplicate_to_tiles(depths, radii, rect, grid_x)
+    if gaussian_ids.numel() == 0:
+        return out_color, out_invdepth
+    tile_counts = torch.bincount(tile_ids, minlength=grid_x * grid_y)
+    tile_starts = torch.cumsum(tile_counts, 0) - tile_counts
+    invdepths = 1.0 / depths
+
+    for tile in torch.nonzero(tile_counts).squeeze(1).tolist():
+        x0 = (tile % grid_x) * BLOCK_X
+        y0 = (tile // grid_x) * BLOCK_Y
+        x1 = min(x0 + BLOCK_X, W)
+        y1 = min(y0 + BLOCK_Y, H)
+        ys, xs = torch.meshgrid(torch.arange(y0, y1, device=device, dtype=colors.dtype),
+                                torch.arange(x0, x1, device=device, dtype=colors.dtype), indexing="ij")
+        pixels = torch.stack((xs.reshape(-1), ys.reshape(-1)), dim=-1)
+
+        T = torch.ones(pixels.shape[0], dtype=colors.dtype, device=device)
+        C = torch.zeros((pixels.shape[0], 3), dtype=colors.dtype, device=device)
+        D = torch.zeros(pixels.shape[0], dtype=colors.dtype, device=device)
+        done = torch.zeros(pixels.shape[0], dtype=torch.bool, device=device)
+
+        start = tile_starts[tile].item()
+        end = start + tile_counts[tile].item()
+        for chunk_start in range(start, end, GAUSSIAN_CHUNK):
+            ids = gaussian_ids[chunk_start:min(chunk_start + GAUSSIAN_CHUNK, end)]
+            d = point_image[ids][None, :, :] - pixels[:, None, :]
+            con = conics[ids]
+            power = -0.5 * (con[:, 0] * d[..., 0] * d[..., 0] + con[:, 2] * d[..., 1] * d[..., 1]) \
+                - con[:, 1] * d[..., 0] * d[..., 1]
+            alpha = torch.clamp_max(opacities[ids] * torch.exp(power.clamp_max(0.0)), 0.99)
+            alpha = torch.where((power <= 0.0) & (alpha >= 1.0 / 255.0), alpha, torch.zeros_like(alpha))
+
+            # transmittance after each Gaussian; a pixel stops before the Gaussian that
+            # would push it below 1e-4, and never resumes
+            one_minus_alpha = 1.0 - alpha
+            T_after = T[:, None] * torch.cumprod(one_minus_alpha, dim=1)
+            T_before = torch.cat((T[:, None], T_after[:, :-1]), dim=1)
+            contributes = (T_after >= 0.0001) & ~done[:, None]
+            weights = torch.where(contributes, alpha * T_before, torch.zeros_like(alpha))
+
+            C = C + weights @ colors[ids]
+            D = D + weights @ invdepths[ids]
+            T = T * torch.where(contributes, one_minus_alpha, torch.ones_like(alpha)).prod(dim=1)
+            done = done | (T_after[:, -1] < 0.0001)
+            if bool(done.all()):
+                break
+
+        h, w = y1 - y0, x1 - x0
+        out_color[:, y0:y1, x0:x1] = (C + T[:, None] * bg[None, :]).T.reshape(3, h, w)
+        out_invdepth[0, y0:y1, x0:x1] = D.reshape(h, w)
+
+    return out_color, out_invdepth
+
+class TorchGaussianRasterizer(nn.Module):
+    """
+    Drop-in CPU replacement for diff_gaussian_rasterization.GaussianRasterizer (forward only,
+    gradients flow through autograd). Returns (color, radii, invdepth).
+    """
+
+    def __init__(self, raster_settings):
+        super().__init__()
+        self.raster_settings = raster_settings
+
+    def forward(self, means3D, means2D, opacities, shs=None, colors_precomp=None, scales=None,
+                rotations=None, cov3D_precomp=None, dc=None):
+        settings = self.raster_settings
+        if (shs is None and colors_precomp is None) or (shs is not None and colors_precomp is not None):
+            raise Exception('Please provide exactly one of either SHs or precomputed colors!')
+        if ((scales is None or rotations is None) and cov3D_precomp is None) or \
+                ((scales is not None or rotations is not None) and cov3D_precomp is not None):
+            raise Exception('Please provide exactly one of either scale/rotation pair or precomputed 3D covariance!')
+
+        if cov3D_precomp is not None:
+            cov3D = _unpack_cov3D(cov3D_precomp)
+        else:
+            cov3D = _compute_cov3D(scales, rotations, settings.scale_modifier)
+
+        point_image, depths, conics, opacity_scale, radii, rect = preprocess(means3D, cov3D, settings)
+        # means2D is a zero tensor; adding it routes screen-space gradients to it as in the CUDA backward,
+        # which reports them per NDC unit (one NDC unit is half the image size in pixels), the scale the
+        # densification threshold is tuned for
+        ndc_to_pixels = means2D.new_tensor((0.5 * settings.image_width, 0.5 * settings.image_height))
+        point_image = point_image + means2D[:, :2] * ndc_to_pixels
+
+        if colors_precomp is None:
+            if dc is not None:
+                shs = torch.cat((dc, shs), dim=1)
+            colors = compute_colors(means3D, shs, settings)
+        else:
+            colors = colors_precomp
+
+        opacities = opacities.squeeze(-1) * opacity_scale
+        color, invdepth = composite(settings, point_image, depths, conics, opacities, colors, radii, rect)
+        return color, radii.int(), invdepth
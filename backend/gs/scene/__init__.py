@@ -1,9 +1,11 @@
 import os
 import random
 import json
+from tqdm import tqdm
 from utils.system_utils import searchForMaxIteration
 from scene.dataset_readers import sceneLoadTypeCallbacks
 from scene.gaussian_model import GaussianModel
+from scene.image_residency import ImageResidency
 from arguments import ModelParams
 from utils.camera_utils import cameraList_from_camInfos, camera_to_JSON
 
@@ -54,11 +56,20 @@ class Scene:
 
         self.cameras_extent = scene_info.nerf_normalization["radius"]
 
+        # A non-negative --image_budget_gb keeps only that much decoded ground truth resident
+        self.residency = None
+        if args.image_budget_gb >= 0:
+            self.residency = ImageResidency(int(args.image_budget_gb * 2**30), pin_memory=args.pin_images)
+
         for resolution_scale in resolution_scales:
             print("Loading Training Cameras")
-            self.train_cameras[resolution_scale] = cameraList_from_camInfos(scene_info.train_cameras, resolution_scale, args, scene_info.is_nerf_synthetic, False)
+            with tqdm(total=len(scene_info.train_cameras), leave=False) as bar:
+                self.train_cameras[resolution_scale] = cameraList_from_camInfos(scene_info.train_cameras, resolution_scale, args, scene_info.is_nerf_synthetic, False, self.residency,
+                                                                                progress=lambda done, total: bar.update(done - bar.n))
             print("Loading Test Cameras")
-            self.test_cameras[resolution_scale] = cameraList_from_camInfos(scene_info.test_cameras, resolution_scale, args, scene_info.is_nerf_synthetic, True)
+            with tqdm(total=len(scene_info.test_cameras), leave=False) as bar:
+                self.test_cameras[resolution_scale] = cameraList_from_camInfos(scene_info.test_cameras, resolution_scale, args, scene_info.is_nerf_synthetic, True, self.residency,
+                                                                               progress=lambda done, total: bar.update(done - bar.n))
 
         if self.loaded_iter:
             self.gaussians.load_ply(os.path.join(self.model_path,
@@ -68,8 +79,13 @@ class Scene:
         else:
             self.gaussians.create_from_pcd(scene_info.point_cloud, scene_info.train_cameras, self.cameras_extent)
 
-    def save(self, iteration):
+    def save(self, iteration, writer=None):
         point_cloud_path = os.path.join(self.model_path, "point_cloud/iteration_{}".format(iteration))
+        if writer is not None:
+            # serialized on the writer's thread; training continues meanwhile
+            writer.submit_ply(self.gaussians, os.path.join(point_cloud_path, "point_cloud.ply"),
+                              os.path.join(self.model_path, "exposure.json"))
+            return
         self.gaussians.save_ply(os.path.join(point_cloud_path, "point_cloud.ply"))
         exposure_dict = {
             image_name: self.gaussians.get_exposure_from_name(image_name).detach().cpu().numpy().tolist()
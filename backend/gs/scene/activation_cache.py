@@ -0,0 +1,46 @@
+import torch
+
+class ActivationCache:
+    """
+    Caches activated parameters (exp(scaling), sigmoid(opacity), ...) between parameter updates.
+
+    Every entry is stamped with the version of its source tensors (storage pointer, shape and
+    autograd version counter, which in-place optimizer updates and row compaction bump).
+    A stale stamp recomputes the entry; invalidate() drops everything explicitly, e.g. after
+    an optimizer step or densification.
+
+    Only results computed with autograd disabled are cached: a result that is part of a
+    graph cannot be reused after backward, so training forward passes always recompute.
+    """
+
+    def __init__(self, enabled=True):
+        self.enabled = enabled
+        self._entries = {}
+        # number of activations actually computed / served from the cache
+        self.computed = 0
+        self.hits = 0
+
+    @staticmethod
+    def _stamp(sources):
+        return tuple((t.data_ptr(), tuple(t.shape), t._version) for t in sources)
+
+    def get(self, name, sources, compute):
+        if not self.enabled or torch.is_grad_enabled():
+            self.computed += 1
+            return compute()
+        stamp = self._stamp(sources)
+        entry = self._entries.get(name)
+        if entry is not None and entry[0] == stamp:
+            self.hits += 1
+            return entry[1]
+        value = compute()
+        self.computed += 1
+        self._entries[name] = (stamp, value)
+        return value
+
+    def invalidate(self):
+        self._entries.clear()
+
+    def reset_stats(self):
+        self.computed = 0
+        self.hits = 0
@@ -2,7 +2,7 @@ import torch
 from torch import nn
 import numpy as np
 from utils.graphics_utils import getWorld2View2, getProjectionMatrix
-from utils.general_utils import PILtoTorch
+from utils.general_utils import PILtoTorch, ArrayToTorch
 import cv2
 
 class Camera(nn.Module):
@@ -15,7 +15,10 @@ class Camera(nn.Module):
                 data_device = "cuda",
                 train_test_exp = False, 
                 is_test_dataset = False, 
-                is_test_view = False
+                is_test_view = False,
+                image_loader = None,
+                residency = None,
+                has_depth = False
                  ):
         super(Camera, self).__init__()
 
@@ -34,55 +37,110 @@ class Camera(nn.Module):
             print(f"[Warning] Custom device {data_device} failed, fallback to default cuda device" )
             self.data_device = torch.device("cuda")
 
-        resized_image_rgb = PILtoTorch(image, resolution)
+        self.resolution = resolution
+        self.image_width, self.image_height = resolution
+        self.depth_params = depth_params
+        self.train_test_exp = train_test_exp
+        self.is_test_dataset = is_test_dataset
+        self.is_test_view = is_test_view
+
+        self.depth_reliable = invdepthmap is not None or (image_loader is not None and has_depth)
+        if self.depth_reliable and depth_params is not None:
+            if depth_params["scale"] < 0.2 * depth_params["med_scale"] or depth_params["scale"] > 5 * depth_params["med_scale"]:
+                self.depth_reliable = False
+
+        # With a residency manager only the loader is kept; images are decoded on first use
+        self._image_loader = image_loader
+        self._residency = residency
+        self._images = None
+        if residency is None:
+            if image is None:
+                image, invdepthmap = image_loader()
+            self._images = self.decode_images(self.data_device, image, invdepthmap)
+
+        self.zfar = 100.0
+        self.znear = 0.01
+
+        self.trans = trans
+        self.scale = scale
+
+        # Transforms stay on the GPU when there is one; the renderer moves them to the model's device
+        transform_device = "cuda" if torch.cuda.is_available() else self.data_device
+        self.world_view_transform = torch.tensor(getWorld2View2(R, T, trans, scale)).transpose(0, 1).to(transform_device)
+        self.projection_matrix = getProjectionMatrix(znear=self.znear, zfar=self.zfar, fovX=self.FoVx, fovY=self.FoVy).transpose(0,1).to(transform_device)
+        self.full_proj_transform = (self.world_view_transform.unsqueeze(0).bmm(self.projection_matrix.unsqueeze(0))).squeeze(0)
+        self.camera_center = self.world_view_transform.inverse()[3, :3]
+        
+    def decode_images(self, device, image=None, invdepthmap=None):
+        """Decode, resize and mask the ground truth of this camera; returns name -> tensor on device."""
+        if image is None:
+            image, invdepthmap = self._image_loader()
+        if isinstance(image, np.ndarray):
+            # already resized (decoded-image cache)
+            resized_image_rgb = ArrayToTorch(image)
+        else:
+            resized_image_rgb = PILtoTorch(image, self.resolution)
         gt_image = resized_image_rgb[:3, ...]
-        self.alpha_mask = None
         if resized_image_rgb.shape[0] == 4:
-            self.alpha_mask = resized_image_rgb[3:4, ...].to(self.data_device)
+            alpha_mask = resized_image_rgb[3:4, ...].to(device)
         else: 
-            self.alpha_mask = torch.ones_like(resized_image_rgb[0:1, ...].to(self.data_device))
+            alpha_mask = torch.ones_like(resized_image_rgb[0:1, ...].to(device))
 
-        if train_test_exp and is_test_view:
-            if is_test_dataset:
-                self.alpha_mask[..., :self.alpha_mask.shape[-1] // 2] = 0
+        if self.train_test_exp and self.is_test_view:
+            if self.is_test_dataset:
+                alpha_mask[..., :alpha_mask.shape[-1] // 2] = 0
             else:
-                self.alpha_mask[..., self.alpha_mask.shape[-1] // 2:] = 0
+                alpha_mask[..., alpha_mask.shape[-1] // 2:] = 0
 
-        self.original_image = gt_image.clamp(0.0, 1.0).to(self.data_device)
-        self.image_width = self.original_image.shape[2]
-        self.image_height = self.original_image.shape[1]
+        images = {"original_image": gt_image.clamp(0.0, 1.0).to(device), "alpha_mask": alpha_mask,
+                  "invdepthmap": None, "depth_mask": None}
 
-        self.invdepthmap = None
-        self.depth_reliable = False
         if invdepthmap is not None:
-            self.depth_mask = torch.ones_like(self.alpha_mask)
-            self.invdepthmap = cv2.resize(invdepthmap, resolution)
-            self.invdepthmap[self.invdepthmap < 0] = 0
-            self.depth_reliable = True
+            depth_mask = torch.ones_like(alpha_mask)
+            invdepthmap = cv2.resize(invdepthmap, self.resolution)
+            invdepthmap[invdepthmap < 0] = 0
 
+            depth_params = self.depth_params
             if depth_params is not None:
                 if depth_params["scale"] < 0.2 * depth_params["med_scale"] or depth_params["scale"] > 5 * depth_params["med_scale"]:
-                    self.depth_reliable = False
-                    self.depth_mask *= 0
+                    depth_mask *= 0
                 
                 if depth_params["scale"] > 0:
-                    self.invdepthmap = self.invdepthmap * depth_params["scale"] + depth_params["offset"]
+                    invdepthmap = invdepthmap * depth_params["scale"] + depth_params["offset"]
 
-            if self.invdepthmap.ndim != 2:
-                self.invdepthmap = self.invdepthmap[..., 0]
-            self.invdepthmap = torch.from_numpy(self.invdepthmap[None]).to(self.data_device)
+            if invdepthmap.ndim != 2:
+                invdepthmap = invdepthmap[..., 0]
+            images["invdepthmap"] = torch.from_numpy(invdepthmap[None]).to(device)
+            images["depth_mask"] = depth_mask
+        return images
 
-        self.zfar = 100.0
-        self.znear = 0.01
+    def resident_images(self):
+        """name -> tensor of the ground truth (original_image, alpha_mask, invdepthmap, depth_mask)"""
+        if self._residency is None:
+            return self._images
+        return self._residency.get(self)
 
-        self.trans = trans
-        self.scale = scale
+    def _resident_image(self, name):
+        if self._residency is None:
+            return self._images[name]
+        return self._residency.get(self, name)
+
+    @property
+    def original_image(self):
+        return self._resident_image("original_image")
+
+    @property
+    def alpha_mask(self):
+        return self._resident_image("alpha_mask")
+
+    @property
+    def invdepthmap(self):
+        return self._resident_image("invdepthmap")
+
+    @property
+    def depth_mask(self):
+        return self._resident_image("depth_mask")
 
-        self.world_view_transform = torch.tensor(getWorld2View2(R, T, trans, scale)).transpose(0, 1).cuda()
-        self.projection_matrix = getProjectionMatrix(znear=self.znear, zfar=self.zfar, fovX=self.FoVx, fovY=self.FoVy).transpose(0,1).cuda()
-        self.full_proj_transform = (self.world_view_transform.unsqueeze(0).bmm(self.projection_matrix.unsqueeze(0))).squeeze(0)
-        self.camera_center = self.world_view_transform.inverse()[3, :3]
-        
 class MiniCam:
     def __init__(self, width, height, fovy, fovx, znear, zfar, world_view_transform, full_proj_transform):
         self.image_width = width
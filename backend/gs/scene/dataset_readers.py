@@ -8,7 +8,8 @@ from utils.graphics_utils import getWorld2View2, focal2fov, fov2focal
 import numpy as np
 import json
 from pathlib import Path
-from plyfile import PlyData, PlyElement
+from plyfile import PlyData
+from utils.ply_utils import pack_vertices, write_vertex_ply
 from utils.sh_utils import SH2RGB
 from scene.gaussian_model import BasicPointCloud
 
@@ -59,11 +60,14 @@ def getNerfppNorm(cam_info):
 
 def readColmapCameras(cam_extrinsics, cam_intrinsics, depths_params, images_folder, depths_folder, test_cam_names_list):
     cam_infos = []
+    # counting up in place only makes sense on a terminal; logs get the final count on one line
+    interactive = sys.stdout.isatty()
     for idx, key in enumerate(cam_extrinsics):
-        sys.stdout.write('\r')
-        # the exact output you're looking for:
-        sys.stdout.write("Reading camera {}/{}".format(idx+1, len(cam_extrinsics)))
-        sys.stdout.flush()
+        if interactive:
+            sys.stdout.write('\r')
+            # the exact output you're looking for:
+            sys.stdout.write("Reading camera {}/{}".format(idx+1, len(cam_extrinsics)))
+            sys.stdout.flush()
 
         extr = cam_extrinsics[key]
         intr = cam_intrinsics[extr.camera_id]
@@ -103,7 +107,10 @@ def readColmapCameras(cam_extrinsics, cam_intrinsics, depths_params, images_fold
                               width=width, height=height, is_test=image_name in test_cam_names_list)
         cam_infos.append(cam_info)
 
-    sys.stdout.write('\n')
+    if interactive:
+        sys.stdout.write('\n')
+    else:
+        print("Read {} cameras".format(len(cam_infos)))
     return cam_infos
 
 def fetchPly(path):
@@ -116,20 +123,15 @@ def fetchPly(path):
 
 def storePly(path, xyz, rgb):
     # Define the dtype for the structured array
-    dtype = [('x', 'f4'), ('y', 'f4'), ('z', 'f4'),
-            ('nx', 'f4'), ('ny', 'f4'), ('nz', 'f4'),
+    dtype = [('x', '<f4'), ('y', '<f4'), ('z', '<f4'),
+            ('nx', '<f4'), ('ny', '<f4'), ('nz', '<f4'),
             ('red', 'u1'), ('green', 'u1'), ('blue', 'u1')]
     
     normals = np.zeros_like(xyz)
 
-    elements = np.empty(xyz.shape[0], dtype=dtype)
-    attributes = np.concatenate((xyz, normals, rgb), axis=1)
-    elements[:] = list(map(tuple, attributes))
-
-    # Create the PlyData object and write to file
-    vertex_element = PlyElement.describe(elements, 'vertex')
-    ply_data = PlyData([vertex_element])
-    ply_data.write(path)
+    # Fill the structured array column by column (no per-point tuples) and write it in one call
+    elements = pack_vertices(dtype, [xyz, normals, rgb])
+    write_vertex_ply(path, elements)
 
 def readColmapSceneInfo(path, images, depths, eval, train_test_exp, llffhold=8):
     try:
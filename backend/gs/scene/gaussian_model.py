@@ -1,14 +1,21 @@
 import torch
 import numpy as np
-from utils.general_utils import inverse_sigmoid, get_expon_lr_func, build_rotation
+from utils.general_utils import inverse_sigmoid, get_expon_lr_func, build_rotation, knn_mean_dist2
 from torch import nn
 import os
 import json
 from utils.system_utils import mkdir_p
-from plyfile import PlyData, PlyElement
+from plyfile import PlyData
+from utils.ply_utils import write_float_vertex_ply, read_float_vertex_ply, column_block
+from utils.compressed_ply import write_compressed_ply, read_compressed_ply
 from utils.sh_utils import RGB2SH
-from simple_knn._C import distCUDA2
+try:
+    from simple_knn._C import distCUDA2
+except ImportError:
+    distCUDA2 = None
 from utils.graphics_utils import BasicPointCloud
+from scene.param_store import OptimizerRowStore, PackedLayout, PackedParameters
+from scene.activation_cache import ActivationCache
 from utils.general_utils import strip_symmetric, build_scaling_rotation
 
 try:
@@ -36,7 +43,17 @@ class GaussianModel:
         self.rotation_activation = torch.nn.functional.normalize
 
 
-    def __init__(self, sh_degree, optimizer_type="default"):
+    def __init__(self, sh_degree, optimizer_type="default", device="cuda", packed=False, cache_activations=True):
+        # All model tensors live on this device; "cpu" allows loading, editing,
+        # densification and export without a GPU
+        self.device = torch.device(device)
+        if packed and optimizer_type == "sparse_adam":
+            raise ValueError("The packed parameter layout is not supported with sparse_adam")
+        # Packed layout: the six per-Gaussian parameters are views into one (N, 59) row buffer
+        self.packed = packed
+        self._packed = None
+        # Activated parameters are reused while autograd is off (densification, rendering, export)
+        self.activation_cache = ActivationCache(enabled=cache_activations)
         self.active_sh_degree = 0
         self.optimizer_type = optimizer_type
         self.max_sh_degree = sh_degree  
@@ -49,12 +66,21 @@ class GaussianModel:
         self.max_radii2D = torch.empty(0)
         self.xyz_gradient_accum = torch.empty(0)
         self.denom = torch.empty(0)
+        # screen-space radii of the current densification step, None outside densify_and_prune
+        self.tmp_radii = None
         self.optimizer = None
+        self._row_store = None
+        # Stable per-Gaussian ids across prune/densify, used by delta checkpoints
+        self._row_ids = torch.empty(0, dtype=torch.long)
+        self._next_row_id = 0
         self.percent_dense = 0
         self.spatial_lr_scale = 0
         self.setup_functions()
 
     def capture(self):
+        # Parameters and moments are live views into row buffers with spare capacity, and
+        # torch.save writes whole storages: snapshot the result with host_copy, which
+        # clones only the live rows and leaves the training buffers untouched
         return (
             self.active_sh_degree,
             self._xyz,
@@ -87,14 +113,18 @@ class GaussianModel:
         self.xyz_gradient_accum = xyz_gradient_accum
         self.denom = denom
         self.optimizer.load_state_dict(opt_dict)
+        self.invalidate_activations()
+
+    def invalidate_activations(self):
+        self.activation_cache.invalidate()
 
     @property
     def get_scaling(self):
-        return self.scaling_activation(self._scaling)
+        return self.activation_cache.get("scaling", (self._scaling,), lambda: self.scaling_activation(self._scaling))
     
     @property
     def get_rotation(self):
-        return self.rotation_activation(self._rotation)
+        return self.activation_cache.get("rotation", (self._rotation,), lambda: self.rotation_activation(self._rotation))
     
     @property
     def get_xyz(self):
@@ -102,9 +132,13 @@ class GaussianModel:
     
     @property
     def get_features(self):
+        if self._packed is not None and not torch.is_grad_enabled():
+            # f_dc and f_rest are adjacent in the packed rows; no concatenation needed
+            return self._packed.layout.span(self._packed.rows, "f_dc", "f_rest", ((self.max_sh_degree + 1) ** 2, 3))
         features_dc = self._features_dc
         features_rest = self._features_rest
-        return torch.cat((features_dc, features_rest), dim=1)
+        return self.activation_cache.get("features", (features_dc, features_rest),
+                                         lambda: torch.cat((features_dc, features_rest), dim=1))
     
     @property
     def get_features_dc(self):
@@ -116,7 +150,7 @@ class GaussianModel:
     
     @property
     def get_opacity(self):
-        return self.opacity_activation(self._opacity)
+        return self.activation_cache.get("opacity", (self._opacity,), lambda: self.opacity_activation(self._opacity))
     
     @property
     def get_exposure(self):
@@ -131,26 +165,54 @@ class GaussianModel:
     def get_covariance(self, scaling_modifier = 1):
         return self.covariance_activation(self.get_scaling, scaling_modifier, self._rotation)
 
+    def _parameter_dict(self):
+        return {"xyz": self._xyz, "f_dc": self._features_dc, "f_rest": self._features_rest,
+                "opacity": self._opacity, "scaling": self._scaling, "rotation": self._rotation}
+
+    def _pack_parameters(self):
+        if not self.packed:
+            return
+        layout = PackedLayout([("xyz", (3,)),
+                               ("f_dc", (1, 3)),
+                               ("f_rest", ((self.max_sh_degree + 1) ** 2 - 1, 3)),
+                               ("opacity", (1,)),
+                               ("scaling", (3,)),
+                               ("rotation", (4,))])
+        self._packed = PackedParameters(layout, self._parameter_dict())
+
+    def reset_row_ids(self):
+        """Number the current Gaussians 0..N-1; ids of later densified Gaussians continue from N."""
+        self._row_ids = torch.arange(self._xyz.shape[0], dtype=torch.long, device=self.device)
+        self._next_row_id = self._xyz.shape[0]
+
+    @property
+    def row_ids(self):
+        return self._row_ids
+
     def oneupSHdegree(self):
         if self.active_sh_degree < self.max_sh_degree:
             self.active_sh_degree += 1
 
     def create_from_pcd(self, pcd : BasicPointCloud, cam_infos : int, spatial_lr_scale : float):
         self.spatial_lr_scale = spatial_lr_scale
-        fused_point_cloud = torch.tensor(np.asarray(pcd.points)).float().cuda()
-        fused_color = RGB2SH(torch.tensor(np.asarray(pcd.colors)).float().cuda())
-        features = torch.zeros((fused_color.shape[0], 3, (self.max_sh_degree + 1) ** 2)).float().cuda()
+        fused_point_cloud = torch.tensor(np.asarray(pcd.points)).float().to(self.device)
+        fused_color = RGB2SH(torch.tensor(np.asarray(pcd.colors)).float().to(self.device))
+        features = torch.zeros((fused_color.shape[0], 3, (self.max_sh_degree + 1) ** 2)).float().to(self.device)
         features[:, :3, 0 ] = fused_color
         features[:, 3:, 1:] = 0.0
 
         print("Number of points at initialisation : ", fused_point_cloud.shape[0])
 
-        dist2 = torch.clamp_min(distCUDA2(torch.from_numpy(np.asarray(pcd.points)).float().cuda()), 0.0000001)
+        if self.device.type == "cuda" and distCUDA2 is not None:
+            dist2 = distCUDA2(fused_point_cloud)
+        else:
+            dist2 = knn_mean_dist2(fused_point_cloud)
+        dist2 = torch.clamp_min(dist2, 0.0000001)
         scales = torch.log(torch.sqrt(dist2))[...,None].repeat(1, 3)
-        rots = torch.zeros((fused_point_cloud.shape[0], 4), device="cuda")
+        rots = torch.zeros((fused_point_cloud.shape[0], 4), device=self.device)
         rots[:, 0] = 1
 
-        opacities = self.inverse_opacity_activation(0.1 * torch.ones((fused_point_cloud.shape[0], 1), dtype=torch.float, device="cuda"))
+        opacities = self.inverse_opacity_activation(0.1 * torch.ones((fused_point_cloud.shape[0], 1), dtype=torch.float, device=self.device))
 
         self._xyz = nn.Parameter(fused_point_cloud.requires_grad_(True))
         self._features_dc = nn.Parameter(features[:,:,0:1].transpose(1, 2).contiguous().requires_grad_(True))
@@ -158,16 +220,21 @@ class GaussianModel:
         self._scaling = nn.Parameter(scales.requires_grad_(True))
         self._rotation = nn.Parameter(rots.requires_grad_(True))
         self._opacity = nn.Parameter(opacities.requires_grad_(True))
-        self.max_radii2D = torch.zeros((self.get_xyz.shape[0]), device="cuda")
+        self._pack_parameters()
+        self.reset_row_ids()
+        self.max_radii2D = torch.zeros((self.get_xyz.shape[0]), device=self.device)
         self.exposure_mapping = {cam_info.image_name: idx for idx, cam_info in enumerate(cam_infos)}
         self.pretrained_exposures = None
-        exposure = torch.eye(3, 4, device="cuda")[None].repeat(len(cam_infos), 1, 1)
+        exposure = torch.eye(3, 4, device=self.device)[None].repeat(len(cam_infos), 1, 1)
         self._exposure = nn.Parameter(exposure.requires_grad_(True))
 
     def training_setup(self, training_args):
         self.percent_dense = training_args.percent_dense
-        self.xyz_gradient_accum = torch.zeros((self.get_xyz.shape[0], 1), device="cuda")
-        self.denom = torch.zeros((self.get_xyz.shape[0], 1), device="cuda")
+        # (re)pack here as well, restore() assigns freshly loaded parameters
+        self._pack_parameters()
+        self.reset_row_ids()
+        self.xyz_gradient_accum = torch.zeros((self.get_xyz.shape[0], 1), device=self.device)
+        self.denom = torch.zeros((self.get_xyz.shape[0], 1), device=self.device)
 
         l = [
             {'params': [self._xyz], 'lr': training_args.position_lr_init * self.spatial_lr_scale, "name": "xyz"},
@@ -187,6 +254,9 @@ class GaussianModel:
                 # A special version of the rasterizer is required to enable sparse adam
                 self.optimizer = torch.optim.Adam(l, lr=0.0, eps=1e-15)
 
+        # Densification appends to / compacts preallocated buffers instead of reallocating
+        self._row_store = OptimizerRowStore(self.optimizer, packed=self._packed)
+
         self.exposure_optimizer = torch.optim.Adam([self._exposure])
 
         self.xyz_scheduler_args = get_expon_lr_func(lr_init=training_args.position_lr_init*self.spatial_lr_scale,
@@ -225,115 +295,115 @@ class GaussianModel:
             l.append('rot_{}'.format(i))
         return l
 
-    def save_ply(self, path):
-        mkdir_p(os.path.dirname(path))
-
-        xyz = self._xyz.detach().cpu().numpy()
+    def ply_layout(self):
+        return self._packed.layout if self._packed is not None else None
+
+    def ply_sources(self):
+        """The device tensors save_ply reads: the packed rows, or the six parameters."""
+        if self._packed is not None:
+            return [self._packed.rows.detach()]
+        return [self._xyz.detach(), self._features_dc.detach(), self._features_rest.detach(),
+                self._opacity.detach(), self._scaling.detach(), self._rotation.detach()]
+
+    @staticmethod
+    def ply_attributes(sources, layout=None):
+        """Assemble the (N, K) PLY attribute matrix on the host from ply_sources() copies."""
+        if layout is not None:
+            # packed rows, reordered into PLY columns
+            rows = sources[0].numpy()
+            columns = layout.columns
+            rest_start = columns["f_rest"][0]
+            n_rest = layout.shapes["f_rest"][0]
+            # f_rest is stored coefficient-major (SH, RGB); PLY expects channel-major
+            rest = [rest_start + k * 3 + c for c in range(3) for k in range(n_rest)]
+            order = list(range(*columns["f_dc"])) + rest + list(range(columns["opacity"][0], columns["rotation"][1]))
+            return np.concatenate((rows[:, 0:3], np.zeros((rows.shape[0], 3), dtype=rows.dtype), rows[:, order]), axis=1)
+
+        xyz, features_dc, features_rest, opacities, scale, rotation = [t.numpy() for t in sources]
         normals = np.zeros_like(xyz)
-        f_dc = self._features_dc.detach().transpose(1, 2).flatten(start_dim=1).contiguous().cpu().numpy()
-        f_rest = self._features_rest.detach().transpose(1, 2).flatten(start_dim=1).contiguous().cpu().numpy()
-        opacities = self._opacity.detach().cpu().numpy()
-        scale = self._scaling.detach().cpu().numpy()
-        rotation = self._rotation.detach().cpu().numpy()
+        f_dc = features_dc.transpose(0, 2, 1).reshape(xyz.shape[0], -1)
+        f_rest = features_rest.transpose(0, 2, 1).reshape(xyz.shape[0], -1)
+        return np.concatenate((xyz, normals, f_dc, f_rest, opacities, scale, rotation), axis=1)
 
-        dtype_full = [(attribute, 'f4') for attribute in self.construct_list_of_attributes()]
+    def save_ply(self, path):
+        mkdir_p(os.path.dirname(path))
+        attributes = self.ply_attributes([t.cpu() for t in self.ply_sources()], self.ply_layout())
+        write_float_vertex_ply(path, attributes, self.construct_list_of_attributes())
 
-        elements = np.empty(xyz.shape[0], dtype=dtype_full)
-        attributes = np.concatenate((xyz, normals, f_dc, f_rest, opacities, scale, rotation), axis=1)
-        elements[:] = list(map(tuple, attributes))
-        el = PlyElement.describe(elements, 'vertex')
-        PlyData([el]).write(path)
+    def save_compressed_ply(self, path, sh_degree=None):
+        """Quantized, Morton-sorted export in the SplatEditor's compressed PLY layout (see utils/compressed_ply.py)."""
+        mkdir_p(os.path.dirname(path))
+        attributes = self.ply_attributes([t.cpu() for t in self.ply_sources()], self.ply_layout())
+        write_compressed_ply(path, attributes, self.construct_list_of_attributes(), sh_degree)
 
     def reset_opacity(self):
         opacities_new = self.inverse_opacity_activation(torch.min(self.get_opacity, torch.ones_like(self.get_opacity)*0.01))
         optimizable_tensors = self.replace_tensor_to_optimizer(opacities_new, "opacity")
         self._opacity = optimizable_tensors["opacity"]
+        self.invalidate_activations()
 
     def load_ply(self, path, use_train_test_exp = False):
-        plydata = PlyData.read(path)
         if use_train_test_exp:
             exposure_file = os.path.join(os.path.dirname(path), os.pardir, os.pardir, "exposure.json")
             if os.path.exists(exposure_file):
                 with open(exposure_file, "r") as f:
                     exposures = json.load(f)
-                self.pretrained_exposures = {image_name: torch.FloatTensor(exposures[image_name]).requires_grad_(False).cuda() for image_name in exposures}
+                self.pretrained_exposures = {image_name: torch.FloatTensor(exposures[image_name]).requires_grad_(False).to(self.device) for image_name in exposures}
                 print(f"Pretrained exposures loaded.")
             else:
                 print(f"No exposure to be loaded at {exposure_file}")
                 self.pretrained_exposures = None
 
-        xyz = np.stack((np.asarray(plydata.elements[0]["x"]),
-                        np.asarray(plydata.elements[0]["y"]),
-                        np.asarray(plydata.elements[0]["z"])),  axis=1)
-        opacities = np.asarray(plydata.elements[0]["opacity"])[..., np.newaxis]
+        # Binary float32 files are memory-mapped as one (N, K) matrix and sliced into attribute
+        # groups; compressed files are decoded to the same matrix; other layouts go through plyfile.
+        loaded = read_compressed_ply(path) or read_float_vertex_ply(path)
+        if loaded is not None:
+            data, names = loaded
+        else:
+            vertices = PlyData.read(path).elements[0]
+            names = [p.name for p in vertices.properties]
+            data = np.column_stack([np.asarray(vertices[name], dtype=np.float32) for name in names])
+        column = {name: idx for idx, name in enumerate(names)}
+
+        def attribute_group(prefix):
+            group = sorted((name for name in names if name.startswith(prefix)), key=lambda x: int(x.split('_')[-1]))
+            return group, column_block(data, [column[name] for name in group])
 
-        features_dc = np.zeros((xyz.shape[0], 3, 1))
-        features_dc[:, 0, 0] = np.asarray(plydata.elements[0]["f_dc_0"])
-        features_dc[:, 1, 0] = np.asarray(plydata.elements[0]["f_dc_1"])
-        features_dc[:, 2, 0] = np.asarray(plydata.elements[0]["f_dc_2"])
+        xyz = column_block(data, [column["x"], column["y"], column["z"]])
+        opacities = column_block(data, [column["opacity"]])
 
-        extra_f_names = [p.name for p in plydata.elements[0].properties if p.name.startswith("f_rest_")]
-        extra_f_names = sorted(extra_f_names, key = lambda x: int(x.split('_')[-1]))
+        _, features_dc = attribute_group("f_dc_")
+        features_dc = features_dc.reshape((xyz.shape[0], 3, 1))
+
+        extra_f_names, features_extra = attribute_group("f_rest_")
         assert len(extra_f_names)==3*(self.max_sh_degree + 1) ** 2 - 3
-        features_extra = np.zeros((xyz.shape[0], len(extra_f_names)))
-        for idx, attr_name in enumerate(extra_f_names):
-            features_extra[:, idx] = np.asarray(plydata.elements[0][attr_name])
         # Reshape (P,F*SH_coeffs) to (P, F, SH_coeffs except DC)
         features_extra = features_extra.reshape((features_extra.shape[0], 3, (self.max_sh_degree + 1) ** 2 - 1))
 
-        scale_names = [p.name for p in plydata.elements[0].properties if p.name.startswith("scale_")]
-        scale_names = sorted(scale_names, key = lambda x: int(x.split('_')[-1]))
-        scales = np.zeros((xyz.shape[0], len(scale_names)))
-        for idx, attr_name in enumerate(scale_names):
-            scales[:, idx] = np.asarray(plydata.elements[0][attr_name])
-
-        rot_names = [p.name for p in plydata.elements[0].properties if p.name.startswith("rot")]
-        rot_names = sorted(rot_names, key = lambda x: int(x.split('_')[-1]))
-        rots = np.zeros((xyz.shape[0], len(rot_names)))
-        for idx, attr_name in enumerate(rot_names):
-            rots[:, idx] = np.asarray(plydata.elements[0][attr_name])
-
-        self._xyz = nn.Parameter(torch.tensor(xyz, dtype=torch.float, device="cuda").requires_grad_(True))
-        self._features_dc = nn.Parameter(torch.tensor(features_dc, dtype=torch.float, device="cuda").transpose(1, 2).contiguous().requires_grad_(True))
-        self._features_rest = nn.Parameter(torch.tensor(features_extra, dtype=torch.float, device="cuda").transpose(1, 2).contiguous().requires_grad_(True))
-        self._opacity = nn.Parameter(torch.tensor(opacities, dtype=torch.float, device="cuda").requires_grad_(True))
-        self._scaling = nn.Parameter(torch.tensor(scales, dtype=torch.float, device="cuda").requires_grad_(True))
-        self._rotation = nn.Parameter(torch.tensor(rots, dtype=torch.float, device="cuda").requires_grad_(True))
+        _, scales = attribute_group("scale_")
+        _, rots = attribute_group("rot")
 
-        self.active_sh_degree = self.max_sh_degree
+        def to_tensor(block):
+            # single copy out of the mapped file, then straight to the device
+            return torch.from_numpy(np.array(block, dtype=np.float32)).to(device=self.device)
 
-    def replace_tensor_to_optimizer(self, tensor, name):
-        optimizable_tensors = {}
-        for group in self.optimizer.param_groups:
-            if group["name"] == name:
-                stored_state = self.optimizer.state.get(group['params'][0], None)
-                stored_state["exp_avg"] = torch.zeros_like(tensor)
-                stored_state["exp_avg_sq"] = torch.zeros_like(tensor)
+        self._xyz = nn.Parameter(to_tensor(xyz).requires_grad_(True))
+        self._features_dc = nn.Parameter(to_tensor(features_dc).transpose(1, 2).contiguous().requires_grad_(True))
+        self._features_rest = nn.Parameter(to_tensor(features_extra).transpose(1, 2).contiguous().requires_grad_(True))
+        self._opacity = nn.Parameter(to_tensor(opacities).requires_grad_(True))
+        self._scaling = nn.Parameter(to_tensor(scales).requires_grad_(True))
+        self._rotation = nn.Parameter(to_tensor(rots).requires_grad_(True))
+        self._pack_parameters()
+        self.reset_row_ids()
+        self.invalidate_activations()
 
-                del self.optimizer.state[group['params'][0]]
-                group["params"][0] = nn.Parameter(tensor.requires_grad_(True))
-                self.optimizer.state[group['params'][0]] = stored_state
+        self.active_sh_degree = self.max_sh_degree
 
-                optimizable_tensors[group["name"]] = group["params"][0]
-        return optimizable_tensors
+    def replace_tensor_to_optimizer(self, tensor, name):
+        return self._row_store.replace(name, tensor)
 
     def _prune_optimizer(self, mask):
-        optimizable_tensors = {}
-        for group in self.optimizer.param_groups:
-            stored_state = self.optimizer.state.get(group['params'][0], None)
-            if stored_state is not None:
-                stored_state["exp_avg"] = stored_state["exp_avg"][mask]
-                stored_state["exp_avg_sq"] = stored_state["exp_avg_sq"][mask]
-
-                del self.optimizer.state[group['params'][0]]
-                group["params"][0] = nn.Parameter((group["params"][0][mask].requires_grad_(True)))
-                self.optimizer.state[group['params'][0]] = stored_state
-
-                optimizable_tensors[group["name"]] = group["params"][0]
-            else:
-                group["params"][0] = nn.Parameter(group["params"][0][mask].requires_grad_(True))
-                optimizable_tensors[group["name"]] = group["params"][0]
-        return optimizable_tensors
+        return self._row_store.compact(mask)
 
     def prune_points(self, mask):
         valid_points_mask = ~mask
@@ -345,34 +415,18 @@ class GaussianModel:
         self._opacity = optimizable_tensors["opacity"]
         self._scaling = optimizable_tensors["scaling"]
         self._rotation = optimizable_tensors["rotation"]
+        self.invalidate_activations()
+        self._row_ids = self._row_ids[valid_points_mask]
 
         self.xyz_gradient_accum = self.xyz_gradient_accum[valid_points_mask]
 
         self.denom = self.denom[valid_points_mask]
         self.max_radii2D = self.max_radii2D[valid_points_mask]
-        self.tmp_radii = self.tmp_radii[valid_points_mask]
+        if self.tmp_radii is not None:
+            self.tmp_radii = self.tmp_radii[valid_points_mask]
 
     def cat_tensors_to_optimizer(self, tensors_dict):
-        optimizable_tensors = {}
-        for group in self.optimizer.param_groups:
-            assert len(group["params"]) == 1
-            extension_tensor = tensors_dict[group["name"]]
-            stored_state = self.optimizer.state.get(group['params'][0], None)
-            if stored_state is not None:
-
-                stored_state["exp_avg"] = torch.cat((stored_state["exp_avg"], torch.zeros_like(extension_tensor)), dim=0)
-                stored_state["exp_avg_sq"] = torch.cat((stored_state["exp_avg_sq"], torch.zeros_like(extension_tensor)), dim=0)
-
-                del self.optimizer.state[group['params'][0]]
-                group["params"][0] = nn.Parameter(torch.cat((group["params"][0], extension_tensor), dim=0).requires_grad_(True))
-                self.optimizer.state[group['params'][0]] = stored_state
-
-                optimizable_tensors[group["name"]] = group["params"][0]
-            else:
-                group["params"][0] = nn.Parameter(torch.cat((group["params"][0], extension_tensor), dim=0).requires_grad_(True))
-                optimizable_tensors[group["name"]] = group["params"][0]
-
-        return optimizable_tensors
+        return self._row_store.append(tensors_dict)
 
     def densification_postfix(self, new_xyz, new_features_dc, new_features_rest, new_opacities, new_scaling, new_rotation, new_tmp_radii):
         d = {"xyz": new_xyz,
@@ -389,23 +443,27 @@ class GaussianModel:
         self._opacity = optimizable_tensors["opacity"]
         self._scaling = optimizable_tensors["scaling"]
         self._rotation = optimizable_tensors["rotation"]
+        self.invalidate_activations()
+        new_ids = torch.arange(self._next_row_id, self._next_row_id + new_xyz.shape[0], dtype=torch.long, device=self.device)
+        self._row_ids = torch.cat((self._row_ids, new_ids))
+        self._next_row_id += new_xyz.shape[0]
 
         self.tmp_radii = torch.cat((self.tmp_radii, new_tmp_radii))
-        self.xyz_gradient_accum = torch.zeros((self.get_xyz.shape[0], 1), device="cuda")
-        self.denom = torch.zeros((self.get_xyz.shape[0], 1), device="cuda")
-        self.max_radii2D = torch.zeros((self.get_xyz.shape[0]), device="cuda")
+        self.xyz_gradient_accum = torch.zeros((self.get_xyz.shape[0], 1), device=self.device)
+        self.denom = torch.zeros((self.get_xyz.shape[0], 1), device=self.device)
+        self.max_radii2D = torch.zeros((self.get_xyz.shape[0]), device=self.device)
 
     def densify_and_split(self, grads, grad_threshold, scene_extent, N=2):
         n_init_points = self.get_xyz.shape[0]
         # Extract points that satisfy the gradient condition
-        padded_grad = torch.zeros((n_init_points), device="cuda")
+        padded_grad = torch.zeros((n_init_points), device=self.device)
         padded_grad[:grads.shape[0]] = grads.squeeze()
         selected_pts_mask = torch.where(padded_grad >= grad_threshold, True, False)
         selected_pts_mask = torch.logical_and(selected_pts_mask,
                                               torch.max(self.get_scaling, dim=1).values > self.percent_dense*scene_extent)
 
         stds = self.get_scaling[selected_pts_mask].repeat(N,1)
-        means =torch.zeros((stds.size(0), 3),device="cuda")
+        means =torch.zeros((stds.size(0), 3),device=self.device)
         samples = torch.normal(mean=means, std=stds)
         rots = build_rotation(self._rotation[selected_pts_mask]).repeat(N,1,1)
         new_xyz = torch.bmm(rots, samples.unsqueeze(-1)).squeeze(-1) + self.get_xyz[selected_pts_mask].repeat(N, 1)
@@ -418,7 +476,7 @@ class GaussianModel:
 
         self.densification_postfix(new_xyz, new_features_dc, new_features_rest, new_opacity, new_scaling, new_rotation, new_tmp_radii)
 
-        prune_filter = torch.cat((selected_pts_mask, torch.zeros(N * selected_pts_mask.sum(), device="cuda", dtype=bool)))
+        prune_filter = torch.cat((selected_pts_mask, torch.zeros(N * selected_pts_mask.sum(), device=self.device, dtype=bool)))
         self.prune_points(prune_filter)
 
     def densify_and_clone(self, grads, grad_threshold, scene_extent):
@@ -455,7 +513,8 @@ class GaussianModel:
         tmp_radii = self.tmp_radii
         self.tmp_radii = None
 
-        torch.cuda.empty_cache()
+        if self.device.type == "cuda":
+            torch.cuda.empty_cache()
 
     def add_densification_stats(self, viewspace_point_tensor, update_filter):
         self.xyz_gradient_accum[update_filter] += torch.norm(viewspace_point_tensor.grad[update_filter,:2], dim=-1, keepdim=True)
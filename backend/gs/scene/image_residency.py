@@ -0,0 +1,95 @@
+import threading
+from collections import OrderedDict
+import torch
+
+class ImageResidency:
+    """
+    Byte-budgeted LRU of decoded training images, shared by the cameras of a scene.
+
+    Cameras registered with a residency only keep metadata; their ground-truth image,
+    alpha mask and depth are decoded on first use and evicted least-recently-used once
+    the decoded tensors exceed budget_bytes, so memory scales with the budget rather
+    than with the dataset. With pin_memory the tensors are held in pinned host memory
+    and copied to the camera's data_device asynchronously on access; the device copies
+    of the camera last accessed on each stream are kept, so reading several attributes
+    of the same camera (or the same one twice) copies each tensor once.
+    """
+
+    def __init__(self, budget_bytes, pin_memory=False):
+        self.budget_bytes = budget_bytes
+        self.pin_memory = pin_memory and torch.cuda.is_available()
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        # (device, stream) -> (camera, name -> device copy)
+        self._device_copies = {}
+
+    @staticmethod
+    def _nbytes(tensors):
+        return sum(t.numel() * t.element_size() for t in tensors.values() if t is not None)
+
+    def _lookup(self, camera):
+        with self._lock:
+            entry = self._entries.get(camera)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(camera)
+            self.hits += 1
+            return entry
+
+    def _insert(self, camera, tensors):
+        nbytes = self._nbytes(tensors)
+        with self._lock:
+            if camera in self._entries:
+                return self._entries[camera]
+            self._entries[camera] = tensors
+            self._bytes += nbytes
+            # always keep the entry just inserted, even if it alone exceeds the budget
+            while self._bytes > self.budget_bytes and len(self._entries) > 1:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= self._nbytes(evicted)
+            return tensors
+
+    def _device_copy(self, camera, tensors, names):
+        # copies are made on the current stream and only reused on that stream
+        stream = torch.cuda.current_stream(camera.data_device)
+        key = (camera.data_device, stream.cuda_stream)
+        with self._lock:
+            cached = self._device_copies.get(key)
+            if cached is None or cached[0] is not camera:
+                cached = self._device_copies[key] = (camera, {})
+            copies = cached[1]
+            for name in names:
+                if name not in copies:
+                    t = tensors[name]
+                    copies[name] = t.to(camera.data_device, non_blocking=True) if t is not None else None
+            return {name: copies[name] for name in names}
+
+    def get(self, camera, name=None):
+        """
+        The camera's decoded tensors (name -> tensor, or only the tensor `name`) on its
+        data_device, decoding them if not resident.
+        """
+        tensors = self._lookup(camera)
+        if tensors is None:
+            if self.pin_memory:
+                tensors = {key: t.pin_memory() if t is not None else None
+                           for key, t in camera.decode_images(torch.device("cpu")).items()}
+            else:
+                tensors = camera.decode_images(camera.data_device)
+            tensors = self._insert(camera, tensors)
+        if self.pin_memory and camera.data_device.type == "cuda":
+            tensors = self._device_copy(camera, tensors, list(tensors) if name is None else [name])
+        return tensors if name is None else tensors[name]
+
+    def resident_bytes(self):
+        return self._bytes
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._device_copies.clear()
+            self._bytes = 0
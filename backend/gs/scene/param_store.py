@@ -0,0 +1,227 @@
+import math
+import torch
+
+class RowBuffer:
+    """
+    A tensor with spare row capacity. `live` is a view of the first `count` rows.
+    Appends write into the spare rows and grow the storage geometrically;
+    compaction moves the kept rows to the front of the same storage, COMPACT_CHUNK_ROWS
+    rows at a time, so it never holds a copy of all kept rows.
+    """
+
+    COMPACT_CHUNK_ROWS = 1 << 16
+
+    def __init__(self, tensor, growth=1.5):
+        self.storage = tensor
+        self.count = tensor.shape[0]
+        self.growth = growth
+
+    @property
+    def capacity(self):
+        return self.storage.shape[0]
+
+    @property
+    def live(self):
+        return self.storage[:self.count]
+
+    def holds(self, tensor):
+        """Whether tensor is still this buffer's live view (not replaced from outside)."""
+        return (tensor.data_ptr() == self.storage.data_ptr()
+                and tensor.shape[0] == self.count
+                and tensor.shape[1:] == self.storage.shape[1:])
+
+    def reserve(self, rows):
+        if rows <= self.capacity:
+            return
+        new_capacity = max(rows, math.ceil(self.capacity * self.growth), 1)
+        storage = torch.empty((new_capacity,) + tuple(self.storage.shape[1:]),
+                              dtype=self.storage.dtype, device=self.storage.device)
+        storage[:self.count] = self.live
+        self.storage = storage
+
+    def append(self, rows):
+        self.reserve(self.count + rows.shape[0])
+        self.storage[self.count:self.count + rows.shape[0]] = rows
+        self.count += rows.shape[0]
+
+    def append_zeros(self, n):
+        self.reserve(self.count + n)
+        self.storage[self.count:self.count + n].zero_()
+        self.count += n
+
+    def compact(self, keep_mask):
+        keep = keep_mask.nonzero().squeeze(1)
+        # keep is ascending, so keep[i] >= i: each chunk only reads rows at or after the
+        # positions it writes, and no later chunk reads a row an earlier one overwrote
+        for start in range(0, keep.shape[0], self.COMPACT_CHUNK_ROWS):
+            stop = min(start + self.COMPACT_CHUNK_ROWS, keep.shape[0])
+            self.storage[start:stop] = self.storage.index_select(0, keep[start:stop])
+        self.count = keep.shape[0]
+
+
+def param_name(optimizer, param):
+    for group in optimizer.param_groups:
+        if group["params"][0] is param:
+            return group["name"]
+    raise KeyError("parameter is not registered with the optimizer")
+
+
+class OptimizerRowStore:
+    """
+    Capacity-based storage for the per-Gaussian parameter groups of an optimizer and
+    their Adam moments.
+
+    Densification appends rows and pruning compacts rows in place; the nn.Parameter
+    objects registered with the optimizer are kept and only re-pointed at the live rows
+    of their buffers, so there is no per-step reallocation of every parameter and moment.
+    Buffers are (re)wrapped lazily whenever a parameter or moment has been replaced
+    from outside, e.g. by load_state_dict.
+
+    With packed parameters (PackedParameters) the values of all groups are appended
+    and compacted as one buffer; only the moments are kept per group.
+    """
+
+    MOMENT_KEYS = ("exp_avg", "exp_avg_sq")
+
+    def __init__(self, optimizer, growth=1.5, packed=None):
+        self.optimizer = optimizer
+        self.growth = growth
+        self.packed = packed
+        self._buffers = {}
+
+    def _buffers_for(self, group):
+        assert len(group["params"]) == 1
+        param = group["params"][0]
+        state = self.optimizer.state.get(param, None)
+        tensors = {} if self.packed is not None else {"param": param.data}
+        if state is not None:
+            for key in self.MOMENT_KEYS:
+                if key in state:
+                    tensors[key] = state[key]
+
+        buffers = self._buffers.get(group["name"])
+        if buffers is None or buffers.keys() != tensors.keys() or \
+                any(not buffers[key].holds(tensor) for key, tensor in tensors.items()):
+            buffers = {key: RowBuffer(tensor, self.growth) for key, tensor in tensors.items()}
+            self._buffers[group["name"]] = buffers
+        return param, state, buffers
+
+    def _publish(self, param, state, buffers, keep_grad=False):
+        if self.packed is not None:
+            param.data = self.packed.view(param_name(self.optimizer, param))
+        else:
+            param.data = buffers["param"].live
+        if not keep_grad:
+            # gradients of the old shape are meaningless after a resize
+            param.grad = None
+        for key in self.MOMENT_KEYS:
+            if key in buffers:
+                state[key] = buffers[key].live
+
+    @torch.no_grad()
+    def append(self, tensors_dict):
+        """Append rows to every group (new moments are zero); returns name -> parameter."""
+        optimizable_tensors = {}
+        if self.packed is not None:
+            self.packed.append(tensors_dict)
+        for group in self.optimizer.param_groups:
+            param, state, buffers = self._buffers_for(group)
+            extension = tensors_dict[group["name"]]
+            if "param" in buffers:
+                buffers["param"].append(extension)
+            for key in self.MOMENT_KEYS:
+                if key in buffers:
+                    buffers[key].append_zeros(extension.shape[0])
+            self._publish(param, state, buffers)
+            optimizable_tensors[group["name"]] = param
+        return optimizable_tensors
+
+    @torch.no_grad()
+    def compact(self, keep_mask):
+        """Keep only the rows selected by keep_mask in every group; returns name -> parameter."""
+        optimizable_tensors = {}
+        if self.packed is not None:
+            self.packed.compact(keep_mask)
+        for group in self.optimizer.param_groups:
+            param, state, buffers = self._buffers_for(group)
+            for buffer in buffers.values():
+                buffer.compact(keep_mask)
+            self._publish(param, state, buffers)
+            optimizable_tensors[group["name"]] = param
+        return optimizable_tensors
+
+    @torch.no_grad()
+    def replace(self, name, tensor):
+        """Overwrite a group's values in place and reset its moments; returns name -> parameter."""
+        optimizable_tensors = {}
+        for group in self.optimizer.param_groups:
+            if group["name"] == name:
+                param = group["params"][0]
+                param.data.copy_(tensor)
+                state = self.optimizer.state.get(param, None)
+                if state is not None:
+                    for key in self.MOMENT_KEYS:
+                        if key in state:
+                            state[key].zero_()
+                optimizable_tensors[name] = param
+        return optimizable_tensors
+
+
+class PackedLayout:
+    """Column layout of per-Gaussian attributes packed side by side into one (N, width) row buffer."""
+
+    def __init__(self, shapes):
+        # shapes: ordered list of (name, per-row shape)
+        self.shapes = dict(shapes)
+        self.columns = {}
+        start = 0
+        for name, shape in shapes:
+            width = math.prod(shape)
+            self.columns[name] = (start, start + width)
+            start += width
+        self.width = start
+
+    def view(self, rows, name, shape=None):
+        start, stop = self.columns[name]
+        return rows[:, start:stop].view((rows.shape[0],) + tuple(shape or self.shapes[name]))
+
+    def span(self, rows, first, last, shape):
+        """View over the adjacent attributes first..last as one block."""
+        return rows[:, self.columns[first][0]:self.columns[last][1]].view((rows.shape[0],) + tuple(shape))
+
+    def pack(self, tensors):
+        count = next(iter(tensors.values())).shape[0]
+        return torch.cat([tensors[name].reshape(count, -1) for name in self.columns], dim=1)
+
+
+class PackedParameters:
+    """
+    Per-Gaussian nn.Parameters whose data are named views into one packed RowBuffer.
+    Structural operations (append, compact) touch the single buffer;
+    the parameters are then re-pointed at their views of the live rows.
+    """
+
+    def __init__(self, layout, params, growth=1.5):
+        self.layout = layout
+        self.params = params
+        self.buffer = RowBuffer(layout.pack({name: param.data for name, param in params.items()}), growth)
+        self.publish(keep_grad=True)
+
+    @property
+    def rows(self):
+        return self.buffer.live
+
+    def view(self, name):
+        return self.layout.view(self.rows, name)
+
+    def publish(self, keep_grad=False):
+        for name, param in self.params.items():
+            param.data = self.view(name)
+            if not keep_grad:
+                param.grad = None
+
+    def append(self, tensors_dict):
+        self.buffer.append(self.layout.pack(tensors_dict))
+
+    def compact(self, keep_mask):
+        self.buffer.compact(keep_mask)
@@ -1,7 +1,6 @@
 
 import os
 import torch
-from random import randint
 from utils.loss_utils import l1_loss, ssim
 from gaussian_renderer import render, network_gui
 import sys
@@ -13,6 +12,10 @@ from utils.image_utils import psnr
 from argparse import ArgumentParser, Namespace
 from arguments import ModelParams, PipelineParams, OptimizationParams
 from splatviz_network import SplatvizNetwork
+from utils.snapshot_writer import SnapshotWriter
+from utils.delta_checkpoint import DeltaCheckpointer, DEFAULT_BASE_INTERVAL, load_checkpoint
+from utils.viewpoint_prefetcher import ViewpointPrefetcher
+from utils.training_profiler import TrainingProfiler
 
 try:
     from torch.utils.tensorboard import SummaryWriter
@@ -26,151 +29,185 @@ try:
 except:
     FUSED_SSIM_AVAILABLE = False
 
+try:
+    from diff_gaussian_rasterization import SparseGaussianAdam
+    SPARSE_ADAM_AVAILABLE = True
+except:
+    SPARSE_ADAM_AVAILABLE = False
 
-def training(dataset, opt, pipe, testing_iterations, saving_iterations, checkpoint_iterations, checkpoint, debug_from):
+
+def training(dataset, opt, pipe, testing_iterations, saving_iterations, checkpoint_iterations, checkpoint, debug_from, sync_save=False, checkpoint_base_interval=DEFAULT_BASE_INTERVAL, prefetch_depth=2, profile_interval=0):
 
 
     first_iter = 0
     tb_writer = prepare_output_and_logger(dataset)
-    gaussians = GaussianModel(dataset.sh_degree, opt.optimizer_type)
+    gaussians = GaussianModel(dataset.sh_degree, opt.optimizer_type, device=dataset.model_device, packed=dataset.packed_layout)
     scene = Scene(dataset, gaussians)
     gaussians.training_setup(opt)
     if checkpoint:
-        (model_params, first_iter) = torch.load(checkpoint)
+        (model_params, first_iter) = load_checkpoint(checkpoint, map_location=gaussians.device)
         gaussians.restore(model_params, opt)
 
     bg_color = [1, 1, 1] if dataset.white_background else [0, 0, 0]
-    background = torch.tensor(bg_color, dtype=torch.float32, device="cuda")
+    background = torch.tensor(bg_color, dtype=torch.float32, device=gaussians.device)
 
-    iter_start = torch.cuda.Event(enable_timing = True)
-    iter_end = torch.cuda.Event(enable_timing = True)
+    # per-phase CPU/GPU timings, exported as a Chrome trace and summary every profile_interval iterations
+    profiler = TrainingProfiler(os.path.join(scene.model_path, "profile"), profile_interval, enabled=profile_interval > 0)
 
     use_sparse_adam = opt.optimizer_type == "sparse_adam" and SPARSE_ADAM_AVAILABLE 
     depth_l1_weight = get_expon_lr_func(opt.depth_l1_weight_init, opt.depth_l1_weight_final, max_steps=opt.iterations)
 
-    viewpoint_stack = scene.getTrainCameras().copy()
-    viewpoint_indices = list(range(len(viewpoint_stack)))
+    # Shuffled epochs over the training cameras, with the next prefetch_depth cameras staged ahead
+    prefetcher = ViewpointPrefetcher(scene.getTrainCameras(), device=gaussians.device, depth=prefetch_depth)
     ema_loss_for_log = 0.0
     ema_Ll1depth_for_log = 0.0
 
+    # PLY and checkpoint snapshots are serialized in the background unless --sync_save
+    snapshot_writer = None if sync_save else SnapshotWriter()
+    # every checkpoint_base_interval-th checkpoint is full, the others are deltas against it
+    checkpointer = DeltaCheckpointer(checkpoint_base_interval, snapshot_writer)
+
     progress_bar = tqdm(range(first_iter, opt.iterations), desc="Training progress")
     first_iter += 1
     network = SplatvizNetwork()
-    for iteration in range(first_iter, opt.iterations + 1):
-        network.render(pipe, gaussians, ema_loss_for_log, render, background, iteration, opt)
-        # if network_gui.conn == None:
-        #     network_gui.try_connect()
-        # while network_gui.conn != None:
-        #     try:
-        #         net_image_bytes = None
-        #         custom_cam, do_training, pipe.convert_SHs_python, pipe.compute_cov3D_python, keep_alive, scaling_modifer = network_gui.receive()
-        #         if custom_cam != None:
-        #             net_image = render(custom_cam, gaussians, pipe, background, scaling_modifier=scaling_modifer, use_trained_exp=dataset.train_test_exp, separate_sh=SPARSE_ADAM_AVAILABLE)["render"]
-        #             net_image_bytes = memoryview((torch.clamp(net_image, min=0, max=1.0) * 255).byte().permute(1, 2, 0).contiguous().cpu().numpy())
-        #         network_gui.send(net_image_bytes, dataset.source_path)
-        #         if do_training and ((iteration < int(opt.iterations)) or not keep_alive):
-        #             break
-        #     except Exception as e:
-        #         network_gui.conn = None
-        iter_start.record()
-        gaussians.update_learning_rate(iteration)
-
-        if iteration % 1000 == 0:
-            gaussians.oneupSHdegree()
-
-        # Pick a random Camera
-        if not viewpoint_stack:
-            viewpoint_stack = scene.getTrainCameras().copy()
-            viewpoint_indices = list(range(len(viewpoint_stack)))
-        rand_idx = randint(0, len(viewpoint_indices) - 1)
-        viewpoint_cam = viewpoint_stack.pop(rand_idx)
-        vind = viewpoint_indices.pop(rand_idx)
-
-        # Render
-        if (iteration - 1) == debug_from:
-            pipe.debug = True
-
-        bg = torch.rand((3), device="cuda") if opt.random_background else background
-
-        render_pkg = render(viewpoint_cam, gaussians, pipe, bg, use_trained_exp=dataset.train_test_exp, separate_sh=SPARSE_ADAM_AVAILABLE)
-        image, viewspace_point_tensor, visibility_filter, radii = render_pkg["render"], render_pkg["viewspace_points"], render_pkg["visibility_filter"], render_pkg["radii"]
-
-        if viewpoint_cam.alpha_mask is not None:
-            alpha_mask = viewpoint_cam.alpha_mask.cuda()
-            image *= alpha_mask
-
-        # Loss
-        gt_image = viewpoint_cam.original_image.cuda()
-        Ll1 = l1_loss(image, gt_image)
-        if FUSED_SSIM_AVAILABLE:
-            ssim_value = fused_ssim(image.unsqueeze(0), gt_image.unsqueeze(0))
-        else:
-            ssim_value = ssim(image, gt_image)
-
-        loss = (1.0 - opt.lambda_dssim) * Ll1 + opt.lambda_dssim * (1.0 - ssim_value)
-
-        # Depth regularization
-        Ll1depth_pure = 0.0
-        if depth_l1_weight(iteration) > 0 and viewpoint_cam.depth_reliable:
-            invDepth = render_pkg["depth"]
-            mono_invdepth = viewpoint_cam.invdepthmap.cuda()
-            depth_mask = viewpoint_cam.depth_mask.cuda()
-
-            Ll1depth_pure = torch.abs((invDepth  - mono_invdepth) * depth_mask).mean()
-            Ll1depth = depth_l1_weight(iteration) * Ll1depth_pure 
-            loss += Ll1depth
-            Ll1depth = Ll1depth.item()
-        else:
-            Ll1depth = 0
-
-        loss.backward()
-
-        iter_end.record()
+    try:
+        for iteration in range(first_iter, opt.iterations + 1):
+            with profiler.phase("gui serve"):
+                network.render(pipe, gaussians, ema_loss_for_log, render, background, iteration, opt)
+            # if network_gui.conn == None:
+            #     network_gui.try_connect()
+            # while network_gui.conn != None:
+            #     try:
+            #         net_image_bytes = None
+            #         custom_cam, do_training, pipe.convert_SHs_python, pipe.compute_cov3D_python, keep_alive, scaling_modifer = network_gui.receive(gaussians.device)
+            #         if custom_cam != None:
+            #             net_image = render(custom_cam, gaussians, pipe, background, scaling_modifier=scaling_modifer, use_trained_exp=dataset.train_test_exp, separate_sh=SPARSE_ADAM_AVAILABLE)["render"]
+            #             net_image_bytes = memoryview((torch.clamp(net_image, min=0, max=1.0) * 255).byte().permute(1, 2, 0).contiguous().cpu().numpy())
+            #         network_gui.send(net_image_bytes, dataset.source_path)
+            #         if do_training and ((iteration < int(opt.iterations)) or not keep_alive):
+            #             break
+            #     except Exception as e:
+            #         network_gui.conn = None
+            gaussians.update_learning_rate(iteration)
+
+            if iteration % 1000 == 0:
+                gaussians.oneupSHdegree()
+
+            # Pick a random Camera; its ground truth was staged on the GPU in the background
+            with profiler.phase("camera fetch"):
+                viewpoint_cam, gt = prefetcher.next()
+
+            # Render
+            if (iteration - 1) == debug_from:
+                pipe.debug = True
+
+            bg = torch.rand((3), device=gaussians.device) if opt.random_background else background
+
+            with profiler.phase("render"):
+                render_pkg = render(viewpoint_cam, gaussians, pipe, bg, use_trained_exp=dataset.train_test_exp, separate_sh=SPARSE_ADAM_AVAILABLE)
+                image, viewspace_point_tensor, visibility_filter, radii = render_pkg["render"], render_pkg["viewspace_points"], render_pkg["visibility_filter"], render_pkg["radii"]
+
+                if gt["alpha_mask"] is not None:
+                    alpha_mask = gt["alpha_mask"]
+                    image *= alpha_mask
+
+            # Loss
+            with profiler.phase("loss"):
+                gt_image = gt["original_image"]
+                Ll1 = l1_loss(image, gt_image)
+                if FUSED_SSIM_AVAILABLE:
+                    ssim_value = fused_ssim(image.unsqueeze(0), gt_image.unsqueeze(0))
+                else:
+                    ssim_value = ssim(image, gt_image)
 
-        with torch.no_grad():
-            # Progress bar
-            ema_loss_for_log = 0.4 * loss.item() + 0.6 * ema_loss_for_log
-            ema_Ll1depth_for_log = 0.4 * Ll1depth + 0.6 * ema_Ll1depth_for_log
+                loss = (1.0 - opt.lambda_dssim) * Ll1 + opt.lambda_dssim * (1.0 - ssim_value)
 
-            if iteration % 10 == 0:
-                progress_bar.set_postfix({"Loss": f"{ema_loss_for_log:.{7}f}", "Depth Loss": f"{ema_Ll1depth_for_log:.{7}f}"})
-                progress_bar.update(10)
-            if iteration == opt.iterations:
-                progress_bar.close()
+                # Depth regularization
+                Ll1depth_pure = 0.0
+                if depth_l1_weight(iteration) > 0 and viewpoint_cam.depth_reliable:
+                    invDepth = render_pkg["depth"]
+                    mono_invdepth = gt["invdepthmap"]
+                    depth_mask = gt["depth_mask"]
 
-        
-            if (iteration in saving_iterations):
-                print("\n[ITER {}] Saving Gaussians".format(iteration))
-                scene.save(iteration)
-
-            # Densification
-            if iteration < opt.densify_until_iter:
-                # Keep track of max radii in image-space for pruning
-                gaussians.max_radii2D[visibility_filter] = torch.max(gaussians.max_radii2D[visibility_filter], radii[visibility_filter])
-                gaussians.add_densification_stats(viewspace_point_tensor, visibility_filter)
-
-                if iteration > opt.densify_from_iter and iteration % opt.densification_interval == 0:
-                    size_threshold = 20 if iteration > opt.opacity_reset_interval else None
-                    gaussians.densify_and_prune(opt.densify_grad_threshold, 0.005, scene.cameras_extent, size_threshold, radii)
-                
-                if iteration % opt.opacity_reset_interval == 0 or (dataset.white_background and iteration == opt.densify_from_iter):
-                    gaussians.reset_opacity()
-
-            # Optimizer step
-            if iteration < opt.iterations:
-                gaussians.exposure_optimizer.step()
-                gaussians.exposure_optimizer.zero_grad(set_to_none = True)
-                if use_sparse_adam:
-                    visible = radii > 0
-                    gaussians.optimizer.step(visible, radii.shape[0])
-                    gaussians.optimizer.zero_grad(set_to_none = True)
+                    Ll1depth_pure = torch.abs((invDepth  - mono_invdepth) * depth_mask).mean()
+                    Ll1depth = depth_l1_weight(iteration) * Ll1depth_pure 
+                    loss += Ll1depth
+                    Ll1depth = Ll1depth.item()
                 else:
-                    gaussians.optimizer.step()
-                    gaussians.optimizer.zero_grad(set_to_none = True)
-
-            if (iteration in checkpoint_iterations):
-                print("\n[ITER {}] Saving Checkpoint".format(iteration))
-                torch.save((gaussians.capture(), iteration), scene.model_path + "/chkpnt" + str(iteration) + ".pth")
+                    Ll1depth = 0
+
+            with profiler.phase("backward"):
+                loss.backward()
+
+            with torch.no_grad():
+                # Progress bar
+                with profiler.phase("progress"):
+                    ema_loss_for_log = 0.4 * loss.item() + 0.6 * ema_loss_for_log
+                    ema_Ll1depth_for_log = 0.4 * Ll1depth + 0.6 * ema_Ll1depth_for_log
+
+                    if iteration % 10 == 0:
+                        progress_bar.set_postfix({"Loss": f"{ema_loss_for_log:.{7}f}", "Depth Loss": f"{ema_Ll1depth_for_log:.{7}f}"})
+                        progress_bar.update(10)
+                    if iteration == opt.iterations:
+                        progress_bar.close()
+
+            
+                if (iteration in saving_iterations):
+                    print("\n[ITER {}] Saving Gaussians".format(iteration))
+                    with profiler.phase("snapshot"):
+                        scene.save(iteration, snapshot_writer)
+
+                # Densification
+                if iteration < opt.densify_until_iter:
+                    # Keep track of max radii in image-space for pruning
+                    with profiler.phase("densification stats"):
+                        gaussians.max_radii2D[visibility_filter] = torch.max(gaussians.max_radii2D[visibility_filter], radii[visibility_filter])
+                        gaussians.add_densification_stats(viewspace_point_tensor, visibility_filter)
+
+                    if iteration > opt.densify_from_iter and iteration % opt.densification_interval == 0:
+                        size_threshold = 20 if iteration > opt.opacity_reset_interval else None
+                        with profiler.phase("densify/prune"):
+                            gaussians.densify_and_prune(opt.densify_grad_threshold, 0.005, scene.cameras_extent, size_threshold, radii)
+                    
+                    if iteration % opt.opacity_reset_interval == 0 or (dataset.white_background and iteration == opt.densify_from_iter):
+                        with profiler.phase("opacity reset"):
+                            gaussians.reset_opacity()
+
+                # Optimizer step
+                if iteration < opt.iterations:
+                    with profiler.phase("optimizer step"):
+                        gaussians.exposure_optimizer.step()
+                        gaussians.exposure_optimizer.zero_grad(set_to_none = True)
+                        if use_sparse_adam:
+                            visible = radii > 0
+                            gaussians.optimizer.step(visible, radii.shape[0])
+                            gaussians.optimizer.zero_grad(set_to_none = True)
+                        else:
+                            gaussians.optimizer.step()
+                            gaussians.optimizer.zero_grad(set_to_none = True)
+                        gaussians.invalidate_activations()
+
+                if (iteration in checkpoint_iterations):
+                    print("\n[ITER {}] Saving Checkpoint".format(iteration))
+                    checkpoint_path = scene.model_path + "/chkpnt" + str(iteration) + ".pth"
+                    with profiler.phase("snapshot"):
+                        checkpointer.save(gaussians, iteration, checkpoint_path)
+
+            phase_means = profiler.step(iteration)
+            if phase_means is not None and tb_writer:
+                for name, ms in phase_means.items():
+                    tb_writer.add_scalar("profile/" + name.replace(" ", "_"), ms, iteration)
+
+        profile_summary = profiler.close(opt.iterations)
+        if profile_summary is not None:
+            print("\n[Profile] whole run, written to {}\n{}".format(profiler.output_dir, profile_summary))
+    finally:
+        # also on errors and Ctrl+C: stop the staging threads and get submitted snapshots onto disk
+        prefetcher.close()
+        if snapshot_writer is not None:
+            snapshot_writer.close()
+
+    print("\n[Prefetch] " + prefetcher.summary())
 
 def prepare_output_and_logger(args):    
     if not args.model_path:
@@ -210,10 +247,15 @@ if __name__ == "__main__":
     parser.add_argument("--quiet", action="store_true")
     parser.add_argument("--checkpoint_iterations", nargs="+", type=int, default=[])
     parser.add_argument("--start_checkpoint", type=str, default = None)
+    parser.add_argument("--sync_save", action="store_true", default=False)
+    # every Nth checkpoint is full and the ones in between are deltas against it; 1 writes only full checkpoints
+    parser.add_argument("--checkpoint_base_interval", type=int, default=DEFAULT_BASE_INTERVAL)
+    parser.add_argument("--prefetch_depth", type=int, default=2)
+    parser.add_argument("--profile_interval", type=int, default=0)
     args = parser.parse_args(sys.argv[1:])
     args.save_iterations.append(args.iterations)
     safe_state(args.quiet)
 
     torch.autograd.set_detect_anomaly(args.detect_anomaly)
-    training(lp.extract(args), op.extract(args), pp.extract(args), args.test_iterations, args.save_iterations, args.checkpoint_iterations, args.start_checkpoint, args.debug_from)
+    training(lp.extract(args), op.extract(args), pp.extract(args), args.test_iterations, args.save_iterations, args.checkpoint_iterations, args.start_checkpoint, args.debug_from, args.sync_save, args.checkpoint_base_interval, args.prefetch_depth, args.profile_interval)
 
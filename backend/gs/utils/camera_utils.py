@@ -9,7 +9,10 @@
 # For inquiries contact  george.drettakis@inria.fr
 #
 
+import os
+from concurrent.futures import ThreadPoolExecutor
 from scene.cameras import Camera
+from utils.image_cache import DecodedImageCache
 import numpy as np
 from utils.graphics_utils import fov2focal
 from PIL import Image
@@ -17,28 +20,29 @@ import cv2
 
 WARNED = False
 
-def loadCam(args, id, cam_info, resolution_scale, is_nerf_synthetic, is_test_dataset):
+def _read_invdepthmap(cam_info, is_nerf_synthetic):
+    if cam_info.depth_path == "":
+        return None
+    try:
+        if is_nerf_synthetic:
+            return cv2.imread(cam_info.depth_path, -1).astype(np.float32) / 512
+        else:
+            return cv2.imread(cam_info.depth_path, -1).astype(np.float32) / float(2**16)
+
+    except FileNotFoundError:
+        print(f"Error: The depth file at path '{cam_info.depth_path}' was not found.")
+        raise
+    except IOError:
+        print(f"Error: Unable to open the image file '{cam_info.depth_path}'. It may be corrupted or an unsupported format.")
+        raise
+    except Exception as e:
+        print(f"An unexpected error occurred when trying to read depth at {cam_info.depth_path}: {e}")
+        raise
+
+def loadCam(args, id, cam_info, resolution_scale, is_nerf_synthetic, is_test_dataset, residency=None, image_cache=None):
+    # Image.open only parses the header; pixels are decoded when the image is first resized
     image = Image.open(cam_info.image_path)
 
-    if cam_info.depth_path != "":
-        try:
-            if is_nerf_synthetic:
-                invdepthmap = cv2.imread(cam_info.depth_path, -1).astype(np.float32) / 512
-            else:
-                invdepthmap = cv2.imread(cam_info.depth_path, -1).astype(np.float32) / float(2**16)
-
-        except FileNotFoundError:
-            print(f"Error: The depth file at path '{cam_info.depth_path}' was not found.")
-            raise
-        except IOError:
-            print(f"Error: Unable to open the image file '{cam_info.depth_path}'. It may be corrupted or an unsupported format.")
-            raise
-        except Exception as e:
-            print(f"An unexpected error occurred when trying to read depth at {cam_info.depth_path}: {e}")
-            raise
-    else:
-        invdepthmap = None
-        
     orig_w, orig_h = image.size
     if args.resolution in [1, 2, 4, 8]:
         resolution = round(orig_w/(resolution_scale * args.resolution)), round(orig_h/(resolution_scale * args.resolution))
@@ -60,17 +64,65 @@ def loadCam(args, id, cam_info, resolution_scale, is_nerf_synthetic, is_test_dat
         scale = float(global_down) * float(resolution_scale)
         resolution = (int(orig_w / scale), int(orig_h / scale))
 
+    def load_image():
+        if image_cache is not None:
+            # resized uint8 pixels, memory-mapped from the decoded-image cache
+            return image_cache.get(cam_info.image_path, resolution)
+        return Image.open(cam_info.image_path)
+
+    def image_loader():
+        return load_image(), _read_invdepthmap(cam_info, is_nerf_synthetic)
+
+    if residency is not None:
+        # decoded lazily through the residency manager
+        image.close()
+        image, invdepthmap = None, None
+    else:
+        if image_cache is not None:
+            image.close()
+            image = load_image()
+        invdepthmap = _read_invdepthmap(cam_info, is_nerf_synthetic)
+
     return Camera(resolution, colmap_id=cam_info.uid, R=cam_info.R, T=cam_info.T, 
                   FoVx=cam_info.FovX, FoVy=cam_info.FovY, depth_params=cam_info.depth_params,
                   image=image, invdepthmap=invdepthmap,
                   image_name=cam_info.image_name, uid=id, data_device=args.data_device,
-                  train_test_exp=args.train_test_exp, is_test_dataset=is_test_dataset, is_test_view=cam_info.is_test)
+                  train_test_exp=args.train_test_exp, is_test_dataset=is_test_dataset, is_test_view=cam_info.is_test,
+                  image_loader=image_loader, residency=residency, has_depth=cam_info.depth_path != "")
 
-def cameraList_from_camInfos(cam_infos, resolution_scale, args, is_nerf_synthetic, is_test_dataset):
-    camera_list = []
+def cameraList_from_camInfos(cam_infos, resolution_scale, args, is_nerf_synthetic, is_test_dataset, residency=None,
+                             num_workers=None, progress=None):
+    """
+    Load the cameras of cam_infos, in order, on a thread pool of num_workers threads
+    (default: args.load_workers, 0 meaning one per CPU; 1 loads serially). Image decoding,
+    resizing and depth reading release the GIL, so threads scale with cores.
+    progress, if given, is called as progress(done, total) after every camera.
+    """
+    if num_workers is None:
+        num_workers = getattr(args, "load_workers", 1)
+    if num_workers <= 0:
+        num_workers = min(32, os.cpu_count() or 1)
 
-    for id, c in enumerate(cam_infos):
-        camera_list.append(loadCam(args, id, c, resolution_scale, is_nerf_synthetic, is_test_dataset))
+    image_cache = None
+    if getattr(args, "image_cache_dir", ""):
+        image_cache = DecodedImageCache(args.image_cache_dir)
+
+    def load(item):
+        id, c = item
+        return loadCam(args, id, c, resolution_scale, is_nerf_synthetic, is_test_dataset, residency, image_cache)
+
+    items = list(enumerate(cam_infos))
+    executor = ThreadPoolExecutor(max_workers=num_workers) if num_workers > 1 and len(items) > 1 else None
+    camera_list = []
+    try:
+        # executor.map yields in submission order regardless of completion order
+        for camera in (executor.map(load, items) if executor is not None else map(load, items)):
+            camera_list.append(camera)
+            if progress is not None:
+                progress(len(camera_list), len(items))
+    finally:
+        if executor is not None:
+            executor.shutdown()
 
     return camera_list
 
@@ -0,0 +1,195 @@
+import numpy as np
+from utils.ply_utils import write_ply_elements, read_ply_elements, read_ply_header
+
+# Compressed PLY layout read by the SplatEditor (the PlayCanvas/SuperSplat "compressed.ply"):
+#   element chunk  - per 256 splats: min/max of position, log scale and base color
+#   element vertex - per splat: four uint32 (position 11-10-11, rotation 2-10-10-10
+#                    smallest-three, log scale 11-10-11, RGBA 8-8-8-8)
+#   element sh     - per splat: one uint8 per higher-order SH coefficient
+# Splats are sorted along a Morton curve first, so that the chunks are spatially tight.
+
+CHUNK_SIZE = 256
+SH_C0 = 0.28209479177387814
+SH_RANGE = 8.0
+
+CHUNK_PROPERTIES = ["min_x", "min_y", "min_z", "max_x", "max_y", "max_z",
+                    "min_scale_x", "min_scale_y", "min_scale_z", "max_scale_x", "max_scale_y", "max_scale_z",
+                    "min_r", "min_g", "min_b", "max_r", "max_g", "max_b"]
+VERTEX_PROPERTIES = ["packed_position", "packed_rotation", "packed_scale", "packed_color"]
+
+def _part1by2(v):
+    """Spread the low 10 bits of v so that there are two zero bits between each."""
+    v = v.astype(np.uint32) & 0x3FF
+    v = (v | (v << 16)) & 0x030000FF
+    v = (v | (v << 8)) & 0x0300F00F
+    v = (v | (v << 4)) & 0x030C30C3
+    v = (v | (v << 2)) & 0x09249249
+    return v
+
+def morton_order(xyz):
+    """Permutation sorting points along a 30-bit 3D Morton (Z-order) curve of their bounding box."""
+    lo = xyz.min(axis=0)
+    extent = np.maximum(xyz.max(axis=0) - lo, 1e-12)
+    q = np.clip(((xyz - lo) / extent * 1023).astype(np.int64), 0, 1023)
+    codes = _part1by2(q[:, 0]) << 2 | _part1by2(q[:, 1]) << 1 | _part1by2(q[:, 2])
+    return np.argsort(codes, kind="stable")
+
+def _chunk_ranges(values):
+    """Per-chunk min and max of (N, C) values, N padded up to whole chunks with edge values."""
+    count = values.shape[0]
+    pad = -count % CHUNK_SIZE
+    padded = np.concatenate((values, np.repeat(values[-1:], pad, axis=0))) if pad else values
+    chunks = padded.reshape(-1, CHUNK_SIZE, values.shape[1])
+    return chunks.min(axis=1), chunks.max(axis=1)
+
+def _normalize(values, lo, hi):
+    """Normalize (N, C) values to [0, 1] by the min/max of their chunk."""
+    chunk = np.arange(values.shape[0]) // CHUNK_SIZE
+    span = hi[chunk] - lo[chunk]
+    return np.clip((values - lo[chunk]) / np.where(span > 0, span, 1), 0, 1)
+
+def _denormalize(unit, lo, hi):
+    chunk = np.arange(unit.shape[0]) // CHUNK_SIZE
+    return lo[chunk] + unit * (hi[chunk] - lo[chunk])
+
+def _pack_unorm(unit, bits):
+    return np.round(unit * ((1 << bits) - 1)).astype(np.uint32)
+
+def _unpack_unorm(packed, bits):
+    return (packed & ((1 << bits) - 1)).astype(np.float32) / ((1 << bits) - 1)
+
+def _pack_111011(unit):
+    return _pack_unorm(unit[:, 0], 11) << 21 | _pack_unorm(unit[:, 1], 10) << 11 | _pack_unorm(unit[:, 2], 11)
+
+def _unpack_111011(packed):
+    return np.stack((_unpack_unorm(packed >> 21, 11), _unpack_unorm(packed >> 11, 10), _unpack_unorm(packed, 11)), axis=1)
+
+def _pack_rotation(rot):
+    """Smallest-three quaternion encoding: index of the largest component, then the other three at 10 bits."""
+    rot = rot / np.linalg.norm(rot, axis=1, keepdims=True)
+    largest = np.abs(rot).argmax(axis=1)
+    rot = rot * np.where(rot[np.arange(rot.shape[0]), largest] < 0, -1, 1)[:, None]
+    others = np.array([[j for j in range(4) if j != i] for i in range(4)])[largest]
+    rest = np.take_along_axis(rot, others, axis=1) * (np.sqrt(2) * 0.5) + 0.5
+    packed = largest.astype(np.uint32)
+    for k in range(3):
+        packed = packed << 10 | _pack_unorm(np.clip(rest[:, k], 0, 1), 10)
+    return packed
+
+def _unpack_rotation(packed):
+    rest = np.stack([_unpack_unorm(packed >> shift, 10) for shift in (20, 10, 0)], axis=1)
+    rest = (rest - 0.5) / (np.sqrt(2) * 0.5)
+    largest = (packed >> 30).astype(np.int64)
+    m = np.sqrt(np.clip(1 - (rest ** 2).sum(axis=1), 0, None))
+    others = np.array([[j for j in range(4) if j != i] for i in range(4)])[largest]
+    rot = np.empty((packed.shape[0], 4), dtype=np.float32)
+    rot[np.arange(packed.shape[0]), largest] = m
+    np.put_along_axis(rot, others, rest.astype(np.float32), axis=1)
+    return rot
+
+def _columns(names, prefix):
+    return sorted((i for i, name in enumerate(names) if name.startswith(prefix)), key=lambda i: int(names[i].split('_')[-1]))
+
+def truncate_sh(attributes, names, sh_degree):
+    """Drop the f_rest coefficients above sh_degree (f_rest is channel-major: f_rest_{c * K + k})."""
+    rest_columns = _columns(names, "f_rest_")
+    per_channel = len(rest_columns) // 3
+    keep = (sh_degree + 1) ** 2 - 1
+    if keep >= per_channel:
+        return attributes, names
+    kept = [rest_columns[c * per_channel + k] for c in range(3) for k in range(keep)]
+    others = [i for i, name in enumerate(names) if not name.startswith("f_rest_")]
+    split = sum(1 for i in others if i < rest_columns[0])
+    order = others[:split] + kept + others[split:]
+    new_names = [names[i] for i in others[:split]] + ["f_rest_{}".format(i) for i in range(len(kept))] + \
+                [names[i] for i in others[split:]]
+    return attributes[:, order], new_names
+
+def encode_compressed(attributes, names, sh_degree=None):
+    """
+    Encode an (N, K) PLY attribute matrix (the layout of GaussianModel.save_ply) into
+    (chunk, vertex, sh) structured arrays, Morton-sorted. sh_degree limits the exported SH bands.
+    """
+    if sh_degree is not None:
+        attributes, names = truncate_sh(attributes, names, sh_degree)
+    column = {name: i for i, name in enumerate(names)}
+    attributes = attributes[morton_order(attributes[:, [column["x"], column["y"], column["z"]]])]
+
+    xyz = attributes[:, [column["x"], column["y"], column["z"]]]
+    scales = np.clip(attributes[:, _columns(names, "scale_")], -20, 20)
+    rots = attributes[:, _columns(names, "rot")]
+    color = attributes[:, _columns(names, "f_dc_")] * SH_C0 + 0.5
+    alpha = 1 / (1 + np.exp(-attributes[:, column["opacity"]]))
+
+    chunk = np.empty(-(-xyz.shape[0] // CHUNK_SIZE), dtype=[(name, '<f4') for name in CHUNK_PROPERTIES])
+    vertex = np.empty(xyz.shape[0], dtype=[(name, '<u4') for name in VERTEX_PROPERTIES])
+    ranges = {}
+    for key, values, props in (("position", xyz, CHUNK_PROPERTIES[0:6]),
+                               ("scale", scales, CHUNK_PROPERTIES[6:12]),
+                               ("color", color, CHUNK_PROPERTIES[12:18])):
+        lo, hi = _chunk_ranges(values)
+        for i in range(3):
+            chunk[props[i]] = lo[:, i]
+            chunk[props[3 + i]] = hi[:, i]
+        ranges[key] = _normalize(values, lo, hi)
+
+    vertex["packed_position"] = _pack_111011(ranges["position"])
+    vertex["packed_scale"] = _pack_111011(ranges["scale"])
+    vertex["packed_rotation"] = _pack_rotation(rots)
+    rgba = np.concatenate((ranges["color"], alpha[:, None]), axis=1)
+    vertex["packed_color"] = (_pack_unorm(rgba[:, 0], 8) << 24 | _pack_unorm(rgba[:, 1], 8) << 16 |
+                              _pack_unorm(rgba[:, 2], 8) << 8 | _pack_unorm(np.clip(rgba[:, 3], 0, 1), 8))
+
+    rest_columns = _columns(names, "f_rest_")
+    sh = None
+    if rest_columns:
+        sh = np.empty(xyz.shape[0], dtype=[(names[i], 'u1') for i in rest_columns])
+        quantized = np.clip(np.floor((attributes[:, rest_columns] / SH_RANGE + 0.5) * 256), 0, 255).astype(np.uint8)
+        sh[:] = np.ascontiguousarray(quantized).view(sh.dtype).reshape(-1)
+    return chunk, vertex, sh
+
+def decode_compressed(chunk, vertex, sh=None):
+    """Decode compressed arrays back to an (N, K) float32 PLY attribute matrix and its property names."""
+    bounds = lambda props: np.stack([chunk[p] for p in props], axis=1)
+    xyz = _denormalize(_unpack_111011(vertex["packed_position"]), bounds(CHUNK_PROPERTIES[0:3]), bounds(CHUNK_PROPERTIES[3:6]))
+    scales = _denormalize(_unpack_111011(vertex["packed_scale"]), bounds(CHUNK_PROPERTIES[6:9]), bounds(CHUNK_PROPERTIES[9:12]))
+    packed_color = vertex["packed_color"]
+    rgba = np.stack([_unpack_unorm(packed_color >> shift, 8) for shift in (24, 16, 8, 0)], axis=1)
+    if "min_r" in chunk.dtype.names:
+        color = _denormalize(rgba[:, :3], bounds(CHUNK_PROPERTIES[12:15]), bounds(CHUNK_PROPERTIES[15:18]))
+    else:
+        color = rgba[:, :3]
+    f_dc = (color - 0.5) / SH_C0
+    alpha = np.clip(rgba[:, 3], 1e-6, 1 - 1e-6)
+    opacity = np.log(alpha / (1 - alpha))
+    rots = _unpack_rotation(vertex["packed_rotation"])
+
+    names = ['x', 'y', 'z', 'nx', 'ny', 'nz', 'f_dc_0', 'f_dc_1', 'f_dc_2']
+    blocks = [xyz, np.zeros_like(xyz), f_dc]
+    if sh is not None:
+        rest = (sh.view(np.uint8).reshape(sh.shape[0], -1).astype(np.float32) + 0.5) / 256
+        blocks.append((rest - 0.5) * SH_RANGE)
+        names += list(sh.dtype.names)
+    blocks += [opacity[:, None], scales, rots]
+    names += ['opacity', 'scale_0', 'scale_1', 'scale_2', 'rot_0', 'rot_1', 'rot_2', 'rot_3']
+    return np.concatenate(blocks, axis=1).astype(np.float32), names
+
+def write_compressed_ply(path, attributes, names, sh_degree=None):
+    chunk, vertex, sh = encode_compressed(attributes, names, sh_degree)
+    elements = [("chunk", chunk), ("vertex", vertex)]
+    if sh is not None:
+        elements.append(("sh", sh))
+    write_ply_elements(path, elements)
+
+def read_compressed_ply(path):
+    """Returns (attributes, names) for a compressed PLY, None for any other file layout."""
+    with open(path, "rb") as f:
+        _, elements, _ = read_ply_header(f)
+    if not any(name == "chunk" for name, _, _ in elements):
+        return None
+    elements = read_ply_elements(path)
+    if elements is None or "chunk" not in elements or "vertex" not in elements:
+        return None
+    if "packed_position" not in elements["vertex"].dtype.names:
+        return None
+    return decode_compressed(elements["chunk"], elements["vertex"], elements.get("sh"))
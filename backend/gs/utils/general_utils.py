@@ -9,7 +9,11 @@ def inverse_sigmoid(x):
 
 def PILtoTorch(pil_image, resolution):
     resized_image_PIL = pil_image.resize(resolution)
-    resized_image = torch.from_numpy(np.array(resized_image_PIL)) / 255.0
+    return ArrayToTorch(np.array(resized_image_PIL))
+
+def ArrayToTorch(pixels):
+    """uint8 (H, W[, C]) pixels, e.g. from the decoded-image cache, to a (C, H, W) float tensor in [0, 1]"""
+    resized_image = torch.from_numpy(np.array(pixels)) / 255.0
     if len(resized_image.shape) == 3:
         return resized_image.permute(2, 0, 1)
     else:
@@ -34,7 +38,7 @@ def get_expon_lr_func(
     return helper
 
 def strip_lowerdiag(L):
-    uncertainty = torch.zeros((L.shape[0], 6), dtype=torch.float, device="cuda")
+    uncertainty = torch.zeros((L.shape[0], 6), dtype=torch.float, device=L.device)
 
     uncertainty[:, 0] = L[:, 0, 0]
     uncertainty[:, 1] = L[:, 0, 1]
@@ -52,7 +56,7 @@ def build_rotation(r):
 
     q = r / norm[:, None]
 
-    R = torch.zeros((q.size(0), 3, 3), device='cuda')
+    R = torch.zeros((q.size(0), 3, 3), device=q.device)
 
     r = q[:, 0]
     x = q[:, 1]
@@ -71,7 +75,7 @@ def build_rotation(r):
     return R
 
 def build_scaling_rotation(s, r):
-    L = torch.zeros((s.shape[0], 3, 3), dtype=torch.float, device="cuda")
+    L = torch.zeros((s.shape[0], 3, 3), dtype=torch.float, device=s.device)
     R = build_rotation(r)
 
     L[:,0,0] = s[:,0]
@@ -81,6 +85,103 @@ def build_scaling_rotation(s, r):
     L = R @ L
     return L
 
+# (x, y) neighbours of a voxel; the three z neighbours of each are adjacent keys
+_GRID_OFFSETS = torch.tensor([(x, y) for x in (-1, 0, 1) for y in (-1, 0, 1)])
+_KNN_SAMPLE = 1024
+
+def knn_mean_dist2(points, k=3, budget=1 << 21):
+    """
+    Mean squared distance of each point to its k nearest neighbours, the quantity
+    simple_knn's distCUDA2 computes for k=3. Plain PyTorch, usable on CPU.
+
+    Exact search over a uniform voxel grid: every point within the cell size h of a query
+    lies in the 3x3x3 cells around it, so a query whose k-th nearest candidate there is
+    closer than h is final. The grid starts finer than the mean point spacing and h doubles
+    for the queries left over, so dense and sparse regions both see few candidates.
+    Candidates are processed in batches of about `budget` (query, point) pairs.
+    """
+    N = points.shape[0]
+    device = points.device
+    result = torch.zeros(N, dtype=points.dtype, device=device)
+    k = min(k, N - 1)
+    if k <= 0:
+        return result
+    points = points.float()
+    lower = points.min(dim=0).values
+    extent = points.max(dim=0).values - lower
+    extent_max = extent.max().item()
+    if extent_max == 0:
+        return result
+    # spacing of N points spread through the bounding box (flat boxes clamped to 1e-3 of their size)
+    volume = extent.clamp_min(extent_max * 1e-3).prod().item()
+    h = (volume / N) ** (1.0 / 3.0) / 8
+    offsets = _GRID_OFFSETS.to(device)
+    pending = torch.arange(N, device=device)
+    generator = torch.Generator(device=device).manual_seed(0)
+    while pending.numel() > 0:
+        # every point is a candidate once h covers the whole box
+        complete = h >= extent_max
+        # one cell of margin on each side, so neighbour keys of boundary cells do not wrap
+        cells = torch.floor((points - lower) / h).long() + 1
+        dims = cells.max(dim=0).values + 2
+        keys = (cells[:, 0] * dims[1] + cells[:, 1]) * dims[2] + cells[:, 2]
+        sorted_keys, order = torch.sort(keys)
+        column_offsets = (offsets[:, 0] * dims[1] + offsets[:, 1]) * dims[2]
+
+        def neighbour_ranges(queries):
+            column_keys = keys[queries][:, None] + column_offsets
+            starts = torch.searchsorted(sorted_keys, column_keys - 1)
+            return starts, torch.searchsorted(sorted_keys, column_keys + 1, right=True) - starts
+
+        if not complete and pending.numel() > 4 * _KNN_SAMPLE:
+            # cheap look at a sample first: skip grids too fine to resolve a quarter of the queries
+            sample = pending[torch.randint(pending.numel(), (_KNN_SAMPLE,), device=device, generator=generator)]
+            if (neighbour_ranges(sample)[1].sum(dim=1) > k).float().mean() < 0.25:
+                h *= 2
+                continue
+        starts, counts = neighbour_ranges(pending)
+
+        totals = counts.sum(dim=1)
+        # queries with at most k candidates (themselves included) cannot be resolved at this h
+        searched = torch.nonzero(totals > k if not complete else totals >= 0).squeeze(1)
+        ends = torch.cumsum(totals[searched], 0)
+        resolved = torch.zeros(pending.numel(), dtype=torch.bool, device=device)
+        batch_start = 0
+        while batch_start < searched.numel():
+            done = ends[batch_start - 1].item() if batch_start > 0 else 0
+            batch_end = max(batch_start + 1, int(torch.searchsorted(ends, done + budget, right=True)))
+            batch = searched[batch_start:batch_end]
+            queries = pending[batch]
+            batch_totals = totals[batch]
+            seg_counts = counts[batch].reshape(-1)
+            seg_offsets = torch.cumsum(seg_counts, 0) - seg_counts
+            positions = torch.repeat_interleave(starts[batch].reshape(-1) - seg_offsets, seg_counts) + \
+                torch.arange(int(ends[batch_end - 1]) - done, device=device)
+            candidates = order[positions]
+            owner = torch.repeat_interleave(torch.arange(batch.numel(), device=device), batch_totals)
+            query_of = queries[owner]
+            dist2 = (points[candidates] - points[query_of]).square_().sum(dim=1)
+            # the query itself is not its own neighbour
+            dist2[candidates == query_of] = float("inf")
+            del positions, candidates, query_of
+
+            # k smallest per query by repeated segment minima; non-negative floats order like their
+            # bit patterns, and the low word makes every key unique so ties are taken one at a time
+            ranked = (dist2.view(torch.int32).long() << 32) | torch.arange(dist2.numel(), device=device)
+            nearest = torch.empty((batch.numel(), k), dtype=torch.float, device=device)
+            for j in range(k):
+                smallest = torch.full((batch.numel(),), torch.iinfo(torch.long).max, device=device)
+                smallest.scatter_reduce_(0, owner, ranked, "amin")
+                nearest[:, j] = (smallest >> 32).int().view(torch.float)
+                ranked[smallest & 0xFFFFFFFF] = torch.iinfo(torch.long).max
+            final = nearest[:, -1] <= h * h if not complete else torch.ones_like(batch, dtype=torch.bool)
+            result[queries[final]] = nearest[final].mean(dim=1).to(result.dtype)
+            resolved[batch[final]] = True
+            batch_start = batch_end
+        pending = pending[~resolved]
+        h *= 2
+    return result
+
 def safe_state(silent):
     old_f = sys.stdout
     class F:
@@ -97,9 +198,13 @@ def safe_state(silent):
         def flush(self):
             old_f.flush()
 
+        def isatty(self):
+            return old_f.isatty()
+
     sys.stdout = F(silent)
 
     random.seed(0)
     np.random.seed(0)
     torch.manual_seed(0)
-    torch.cuda.set_device(torch.device("cuda:0"))
+    if torch.cuda.is_available():
+        torch.cuda.set_device(torch.device("cuda:0"))
@@ -0,0 +1,66 @@
+import os
+import hashlib
+import tempfile
+import threading
+import numpy as np
+from PIL import Image
+
+class DecodedImageCache:
+    """
+    Persistent cache of decoded, resized training images.
+
+    Each entry is the uint8 pixel array of one source image at one target resolution,
+    stored as <root>/<content hash>_<W>x<H>.npy and read back memory-mapped, so repeated
+    runs on a dataset (and sweeps over other parameters) skip JPEG/PNG decoding and
+    resizing entirely. Keys hash the file contents, so edited images are never served stale;
+    the hash of each source file is memoized by (path, size, mtime) for the process lifetime.
+    """
+
+    def __init__(self, root):
+        self.root = root
+        os.makedirs(root, exist_ok=True)
+        self._hashes = {}
+        self._hashes_lock = threading.Lock()
+
+    @staticmethod
+    def file_hash(path):
+        digest = hashlib.blake2b(digest_size=16)
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                digest.update(block)
+        return digest.hexdigest()
+
+    def source_hash(self, image_path):
+        """file_hash of image_path, recomputed only when the file's size or mtime changed."""
+        st = os.stat(image_path)
+        key = (os.path.abspath(image_path), st.st_size, st.st_mtime_ns)
+        with self._hashes_lock:
+            digest = self._hashes.get(key)
+        if digest is None:
+            digest = self.file_hash(image_path)
+            with self._hashes_lock:
+                self._hashes[key] = digest
+        return digest
+
+    def entry_path(self, image_path, resolution):
+        return os.path.join(self.root, "{}_{}x{}.npy".format(self.source_hash(image_path), *resolution))
+
+    def get(self, image_path, resolution):
+        """The image resized to resolution (W, H) as a uint8 array, decoded and cached on a miss."""
+        path = self.entry_path(image_path, resolution)
+        if os.path.exists(path):
+            try:
+                return np.load(path, mmap_mode="r")
+            except (ValueError, OSError):
+                pass  # damaged entry, rebuild it
+        pixels = np.array(Image.open(image_path).resize(resolution))
+        # unique per process and thread, so concurrent writers of one entry never collide
+        fd, tmp_path = tempfile.mkstemp(dir=self.root, prefix=os.path.basename(path) + ".", suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                np.save(f, pixels)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.remove(tmp_path)
+            raise
+        return pixels
@@ -0,0 +1,139 @@
+import numpy as np
+
+# numpy dtype -> PLY property type
+PLY_PROPERTY_TYPES = {
+    np.dtype('i1'): 'char', np.dtype('u1'): 'uchar',
+    np.dtype('<i2'): 'short', np.dtype('<u2'): 'ushort',
+    np.dtype('<i4'): 'int', np.dtype('<u4'): 'uint',
+    np.dtype('<f4'): 'float', np.dtype('<f8'): 'double',
+}
+
+def _ply_header(elements):
+    lines = ["ply", "format binary_little_endian 1.0"]
+    for name, data in elements:
+        lines.append("element {} {}".format(name, data.shape[0]))
+        for prop in data.dtype.names:
+            lines.append("property {} {}".format(PLY_PROPERTY_TYPES[data.dtype.fields[prop][0]], prop))
+    lines.append("end_header")
+    return ("\n".join(lines) + "\n").encode("ascii")
+
+# PLY property type -> numpy dtype
+PLY_NUMPY_TYPES = {ptype: dtype for dtype, ptype in PLY_PROPERTY_TYPES.items()}
+PLY_NUMPY_TYPES.update({'int8': np.dtype('i1'), 'uint8': np.dtype('u1'), 'int16': np.dtype('<i2'),
+                        'uint16': np.dtype('<u2'), 'int32': np.dtype('<i4'), 'uint32': np.dtype('<u4'),
+                        'float32': np.dtype('<f4'), 'float64': np.dtype('<f8')})
+
+def write_vertex_ply(path, vertices):
+    """
+    Write a structured array as the vertex element of a binary little-endian PLY.
+    The body is the array's raw memory, written in one call.
+    """
+    write_ply_elements(path, [("vertex", vertices)])
+
+def write_ply_elements(path, elements):
+    """Write (name, structured array) elements, in order, as a binary little-endian PLY."""
+    elements = [(name, np.ascontiguousarray(data)) for name, data in elements]
+    with open(path, "wb") as f:
+        f.write(_ply_header(elements))
+        for _, data in elements:
+            data.tofile(f)
+
+def float_vertex_dtype(names):
+    return np.dtype([(name, '<f4') for name in names])
+
+def write_float_vertex_ply(path, attributes, names):
+    """
+    Write an (N, K) attribute matrix as K float properties without building
+    per-vertex tuples: the contiguous float32 rows are viewed as the structured dtype.
+    """
+    assert attributes.ndim == 2 and attributes.shape[1] == len(names)
+    attributes = np.ascontiguousarray(attributes, dtype='<f4')
+    vertices = attributes.view(float_vertex_dtype(names)).reshape(-1)
+    write_vertex_ply(path, vertices)
+
+def pack_vertices(dtype, columns):
+    """Fill a structured array column by column from 2D arrays, in dtype field order."""
+    dtype = np.dtype(dtype)
+    count = columns[0].shape[0]
+    vertices = np.empty(count, dtype=dtype)
+    names = iter(dtype.names)
+    for column in columns:
+        column = column.reshape(count, -1)
+        for i in range(column.shape[1]):
+            vertices[next(names)] = column[:, i]
+    return vertices
+
+def read_ply_header(f):
+    """
+    Parse a PLY header from a binary file object.
+    Returns (format, elements, header_size) where elements is a list of
+    (name, count, [(property type, property name), ...]); list properties are
+    reported with type 'list'.
+    """
+    if f.readline().strip() != b"ply":
+        raise ValueError("not a PLY file")
+    fmt = None
+    elements = []
+    while True:
+        line = f.readline()
+        if not line:
+            raise ValueError("unexpected end of PLY header")
+        tokens = line.decode("ascii").split()
+        if not tokens or tokens[0] in ("comment", "obj_info"):
+            continue
+        if tokens[0] == "end_header":
+            break
+        if tokens[0] == "format":
+            fmt = tokens[1]
+        elif tokens[0] == "element":
+            elements.append((tokens[1], int(tokens[2]), []))
+        elif tokens[0] == "property":
+            if tokens[1] == "list":
+                elements[-1][2].append(("list", tokens[-1]))
+            else:
+                elements[-1][2].append((tokens[1], tokens[2]))
+    return fmt, elements, f.tell()
+
+def read_float_vertex_ply(path):
+    """
+    Memory-map the vertex element of a binary little-endian PLY whose vertex
+    properties are all float32, as an (N, K) float32 matrix (read-only, no copy).
+
+    Returns (matrix, property names), or None when the file has another layout
+    (ASCII, big endian, mixed property types, or vertex not the first element).
+    """
+    with open(path, "rb") as f:
+        fmt, elements, header_size = read_ply_header(f)
+    if fmt != "binary_little_endian" or not elements or elements[0][0] != "vertex":
+        return None
+    _, count, properties = elements[0]
+    if not properties or any(ptype not in ("float", "float32") for ptype, _ in properties):
+        return None
+    names = [name for _, name in properties]
+    if count == 0:
+        return np.empty((0, len(names)), dtype=np.float32), names
+    matrix = np.memmap(path, dtype='<f4', mode='r', offset=header_size, shape=(count, len(names)))
+    return matrix, names
+
+def column_block(matrix, indices):
+    """Columns of a 2D array; a view when the indices are a contiguous ascending run."""
+    if len(indices) > 0 and list(indices) == list(range(indices[0], indices[0] + len(indices))):
+        return matrix[:, indices[0]:indices[0] + len(indices)]
+    return matrix[:, indices]
+
+def read_ply_elements(path):
+    """
+    Read every element of a binary little-endian PLY without list properties as a
+    structured array (name -> array). Returns None for other layouts.
+    """
+    with open(path, "rb") as f:
+        fmt, elements, header_size = read_ply_header(f)
+        if fmt != "binary_little_endian":
+            return None
+        result = {}
+        for name, count, properties in elements:
+            if any(ptype not in PLY_NUMPY_TYPES for ptype, _ in properties):
+                return None
+            dtype = np.dtype([(prop, PLY_NUMPY_TYPES[ptype]) for ptype, prop in properties])
+            result[name] = np.fromfile(f, dtype=dtype, count=count)
+    return result
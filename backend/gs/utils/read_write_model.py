@@ -32,6 +32,7 @@ import os
 import collections
 import numpy as np
 import struct
+import array
 import argparse
 
 
@@ -47,6 +48,20 @@ BaseImage = collections.namedtuple(
 Point3D = collections.namedtuple(
     "Point3D", ["id", "xyz", "rgb", "error", "image_ids", "point2D_idxs"]
 )
+# Columnar points3D: fixed-size fields as (N, ...) arrays, tracks in CSR form
+# (track i is track_image_ids[track_offsets[i]:track_offsets[i + 1]]).
+Points3DArrays = collections.namedtuple(
+    "Points3DArrays",
+    [
+        "ids",
+        "xyz",
+        "rgb",
+        "error",
+        "track_offsets",
+        "track_image_ids",
+        "track_point2D_idxs",
+    ],
+)
 
 
 class Image(BaseImage):
@@ -87,6 +102,55 @@ def read_next_bytes(fid, num_bytes, format_char_sequence, endian_character="<"):
     return struct.unpack(endian_character + format_char_sequence, data)
 
 
+# On-disk layouts of the binary records (packed, little endian)
+POINT3D_RECORD_DTYPE = np.dtype(
+    [
+        ("id", "<u8"),
+        ("xyz", "<f8", (3,)),
+        ("rgb", "u1", (3,)),
+        ("error", "<f8"),
+        ("track_length", "<u8"),
+    ]
+)
+TRACK_ELEM_DTYPE = np.dtype([("image_id", "<i4"), ("point2D_idx", "<i4")])
+POINT2D_DTYPE = np.dtype([("xy", "<f8", (2,)), ("point3D_id", "<i8")])
+IMAGE_HEADER = struct.Struct("<idddddddi")
+UINT64 = struct.Struct("<Q")
+
+# Records gathered per batch, bounds the temporary index arrays
+GATHER_BATCH = 1 << 16
+
+
+def _gather_records(buf, positions, dtype):
+    """Reinterpret dtype.itemsize bytes at each position of a uint8 buffer
+    as one record."""
+    out = np.empty(len(positions), dtype=dtype)
+    columns = np.arange(dtype.itemsize)
+    for start in range(0, len(positions), GATHER_BATCH):
+        idx = positions[start : start + GATHER_BATCH, None] + columns
+        out[start : start + GATHER_BATCH] = buf[idx].view(dtype).ravel()
+    return out
+
+
+def _scan_points3D_offsets(buf, num_points):
+    """Byte offset of every point record. Record size depends on the track
+    length, so this is the only sequential pass; it reads one uint64 per point.
+    """
+    starts = array.array("q")
+    append = starts.append
+    unpack_from = UINT64.unpack_from
+    track_length_pos = POINT3D_RECORD_DTYPE.fields["track_length"][1]
+    header_size = POINT3D_RECORD_DTYPE.itemsize
+    offset = 8
+    for _ in range(num_points):
+        append(offset)
+        track_length = unpack_from(buf, offset + track_length_pos)[0]
+        offset += header_size + TRACK_ELEM_DTYPE.itemsize * track_length
+    if not num_points:
+        return np.empty(0, dtype=np.int64)
+    return np.frombuffer(starts, dtype=np.int64)
+
+
 def write_next_bytes(fid, data, format_char_sequence, endian_character="<"):
     """pack and write to a binary file.
     :param fid:
@@ -252,44 +316,36 @@ def read_images_binary(path_to_model_file):
     """
     images = {}
     with open(path_to_model_file, "rb") as fid:
-        num_reg_images = read_next_bytes(fid, 8, "Q")[0]
-        for _ in range(num_reg_images):
-            binary_image_properties = read_next_bytes(
-                fid, num_bytes=64, format_char_sequence="idddddddi"
-            )
-            image_id = binary_image_properties[0]
-            qvec = np.array(binary_image_properties[1:5])
-            tvec = np.array(binary_image_properties[5:8])
-            camera_id = binary_image_properties[8]
-            image_name = ""
-            current_char = read_next_bytes(fid, 1, "c")[0]
-            while current_char != b"\x00":  # look for the ASCII 0 entry
-                image_name += current_char.decode("utf-8")
-                current_char = read_next_bytes(fid, 1, "c")[0]
-            num_points2D = read_next_bytes(
-                fid, num_bytes=8, format_char_sequence="Q"
-            )[0]
-            x_y_id_s = read_next_bytes(
-                fid,
-                num_bytes=24 * num_points2D,
-                format_char_sequence="ddq" * num_points2D,
-            )
-            xys = np.column_stack(
-                [
-                    tuple(map(float, x_y_id_s[0::3])),
-                    tuple(map(float, x_y_id_s[1::3])),
-                ]
-            )
-            point3D_ids = np.array(tuple(map(int, x_y_id_s[2::3])))
-            images[image_id] = Image(
-                id=image_id,
-                qvec=qvec,
-                tvec=tvec,
-                camera_id=camera_id,
-                name=image_name,
-                xys=xys,
-                point3D_ids=point3D_ids,
-            )
+        data = fid.read()
+    num_reg_images = UINT64.unpack_from(data, 0)[0]
+    offset = 8
+    for _ in range(num_reg_images):
+        binary_image_properties = IMAGE_HEADER.unpack_from(data, offset)
+        offset += IMAGE_HEADER.size
+        image_id = binary_image_properties[0]
+        qvec = np.array(binary_image_properties[1:5])
+        tvec = np.array(binary_image_properties[5:8])
+        camera_id = binary_image_properties[8]
+        name_end = data.index(b"\x00", offset)  # look for the ASCII 0 entry
+        image_name = data[offset:name_end].decode("utf-8")
+        offset = name_end + 1
+        num_points2D = UINT64.unpack_from(data, offset)[0]
+        offset += 8
+        points2D = np.frombuffer(
+            data, dtype=POINT2D_DTYPE, count=num_points2D, offset=offset
+        )
+        offset += POINT2D_DTYPE.itemsize * num_points2D
+        xys = np.array(points2D["xy"], dtype=np.float64).reshape(-1, 2)
+        point3D_ids = points2D["point3D_id"].astype(np.int64)
+        images[image_id] = Image(
+            id=image_id,
+            qvec=qvec,
+            tvec=tvec,
+            camera_id=camera_id,
+            name=image_name,
+            xys=xys,
+            point3D_ids=point3D_ids,
+        )
     return images
 
 
@@ -386,41 +442,81 @@ def read_points3D_text(path):
     return points3D
 
 
+def read_points3D_binary_arrays(path_to_model_file, with_tracks=True):
+    """
+    Bulk reader for points3D.bin returning a Points3DArrays.
+
+    The file is memory-mapped; headers are parsed as one structured array and
+    tracks are gathered into flat arrays with CSR offsets, no per-point
+    objects. With with_tracks=False the track arrays are None.
+    """
+    buf = np.memmap(path_to_model_file, dtype=np.uint8, mode="r")
+    num_points = UINT64.unpack_from(buf, 0)[0]
+    starts = _scan_points3D_offsets(buf, num_points)
+    records = _gather_records(buf, starts, POINT3D_RECORD_DTYPE)
+
+    lengths = records["track_length"].astype(np.int64)
+    offsets = np.zeros(num_points + 1, dtype=np.int64)
+    np.cumsum(lengths, out=offsets[1:])
+
+    track_image_ids = track_point2D_idxs = None
+    if with_tracks:
+        elem_size = TRACK_ELEM_DTYPE.itemsize
+        tracks = np.empty(offsets[-1], dtype=TRACK_ELEM_DTYPE)
+        columns = np.arange(elem_size)
+        # track element k of point p: starts[p] + header + 8 * (k - offsets[p])
+        bases = (
+            starts + POINT3D_RECORD_DTYPE.itemsize - elem_size * offsets[:-1]
+        )
+        for start in range(0, num_points, GATHER_BATCH):
+            stop = min(start + GATHER_BATCH, num_points)
+            first, last = offsets[start], offsets[stop]
+            if first == last:
+                continue
+            positions = np.repeat(
+                bases[start:stop], lengths[start:stop]
+            ) + elem_size * np.arange(first, last)
+            elems = buf[positions[:, None] + columns]
+            tracks[first:last] = elems.view(TRACK_ELEM_DTYPE).ravel()
+        track_image_ids = tracks["image_id"]
+        track_point2D_idxs = tracks["point2D_idx"]
+
+    return Points3DArrays(
+        ids=records["id"],
+        xyz=records["xyz"],
+        rgb=records["rgb"],
+        error=records["error"],
+        track_offsets=offsets,
+        track_image_ids=track_image_ids,
+        track_point2D_idxs=track_point2D_idxs,
+    )
+
+
 def read_points3D_binary(path_to_model_file):
     """
     see: src/colmap/scene/reconstruction.cc
         void Reconstruction::ReadPoints3DBinary(const std::string& path)
         void Reconstruction::WritePoints3DBinary(const std::string& path)
     """
+    points = read_points3D_binary_arrays(path_to_model_file)
+    ids = points.ids.astype(np.int64)
+    xyzs = points.xyz.astype(np.float64)
+    rgbs = points.rgb.astype(np.int64)
+    errors = points.error.astype(np.float64)
+    offsets = points.track_offsets
+    image_ids = points.track_image_ids.astype(np.int64)
+    point2D_idxs = points.track_point2D_idxs.astype(np.int64)
     points3D = {}
-    with open(path_to_model_file, "rb") as fid:
-        num_points = read_next_bytes(fid, 8, "Q")[0]
-        for _ in range(num_points):
-            binary_point_line_properties = read_next_bytes(
-                fid, num_bytes=43, format_char_sequence="QdddBBBd"
-            )
-            point3D_id = binary_point_line_properties[0]
-            xyz = np.array(binary_point_line_properties[1:4])
-            rgb = np.array(binary_point_line_properties[4:7])
-            error = np.array(binary_point_line_properties[7])
-            track_length = read_next_bytes(
-                fid, num_bytes=8, format_char_sequence="Q"
-            )[0]
-            track_elems = read_next_bytes(
-                fid,
-                num_bytes=8 * track_length,
-                format_char_sequence="ii" * track_length,
-            )
-            image_ids = np.array(tuple(map(int, track_elems[0::2])))
-            point2D_idxs = np.array(tuple(map(int, track_elems[1::2])))
-            points3D[point3D_id] = Point3D(
-                id=point3D_id,
-                xyz=xyz,
-                rgb=rgb,
-                error=error,
-                image_ids=image_ids,
-                point2D_idxs=point2D_idxs,
-            )
+    for i, point3D_id in enumerate(ids.tolist()):
+        first, last = offsets[i], offsets[i + 1]
+        points3D[point3D_id] = Point3D(
+            id=point3D_id,
+            xyz=xyzs[i],
+            rgb=rgbs[i],
+            error=errors[i],
+            image_ids=image_ids[first:last],
+            point2D_idxs=point2D_idxs[first:last],
+        )
     return points3D
 
 
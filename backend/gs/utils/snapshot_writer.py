@@ -0,0 +1,131 @@
+import os
+import json
+import queue
+import threading
+import torch
+from utils.system_utils import mkdir_p
+from utils.ply_utils import write_float_vertex_ply
+
+def host_copy(obj):
+    """
+    Recursively copy every tensor in obj (tuples, lists, dicts) to host memory.
+    CUDA tensors go to pinned buffers with non-blocking copies; CPU tensors are cloned
+    so later in-place updates by the optimizer do not leak into the snapshot.
+    """
+    if isinstance(obj, torch.Tensor):
+        tensor = obj.detach()
+        if tensor.is_cuda:
+            host = torch.empty(tensor.shape, dtype=tensor.dtype, pin_memory=True)
+            host.copy_(tensor, non_blocking=True)
+        else:
+            host = tensor.clone()
+        if isinstance(obj, torch.nn.Parameter):
+            # restore() hands checkpointed parameters straight to the optimizer
+            return torch.nn.Parameter(host, requires_grad=obj.requires_grad)
+        return host
+    if isinstance(obj, tuple):
+        return tuple(host_copy(item) for item in obj)
+    if isinstance(obj, list):
+        return [host_copy(item) for item in obj]
+    if isinstance(obj, dict):
+        return {key: host_copy(value) for key, value in obj.items()}
+    return obj
+
+def _atomic_path(path):
+    return path + ".tmp"
+
+class SnapshotWriter:
+    """
+    Writes PLY snapshots, exposure.json and checkpoints on a background thread.
+
+    submit_* calls run on the training thread: they only enqueue device-to-host copies
+    into pinned buffers and record a CUDA event. The worker waits for that event and
+    serializes, writing to a temporary file that is renamed into place, so a reader
+    never sees a partially written file. At most max_pending snapshots are in flight;
+    further submissions block (back-pressure bounds the host memory held by snapshots).
+    Errors on the worker are raised on the next submit or on close().
+    """
+
+    def __init__(self, max_pending=2):
+        self._queue = queue.Queue(maxsize=max_pending)
+        self._error = None
+        self._thread = threading.Thread(target=self._run, name="snapshot-writer", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while True:
+            job = self._queue.get()
+            try:
+                if job is None:
+                    return
+                event, write = job
+                if event is not None:
+                    event.synchronize()
+                if self._error is None:
+                    write()
+            except Exception as e:
+                self._error = e
+            finally:
+                self._queue.task_done()
+
+    def _raise_pending_error(self):
+        if self._error is not None:
+            error, self._error = self._error, None
+            raise RuntimeError("Snapshot writer failed") from error
+
+    def _submit(self, host_data, write):
+        self._raise_pending_error()
+        event = None
+        if torch.cuda.is_available():
+            event = torch.cuda.Event()
+            event.record()
+        self._queue.put((event, lambda: write(host_data)))
+
+    def submit_ply(self, gaussians, ply_path, exposure_path=None):
+        """Snapshot the Gaussians as a PLY (and the per-image exposures as JSON)."""
+        names = gaussians.construct_list_of_attributes()
+        layout = gaussians.ply_layout()
+        sources = gaussians.ply_sources()
+        image_names = list(gaussians.exposure_mapping) if exposure_path is not None else []
+        exposures = None
+        if image_names:
+            exposures = torch.stack([gaussians.get_exposure_from_name(name) for name in image_names])
+
+        def write(host):
+            sources, exposures = host
+            mkdir_p(os.path.dirname(ply_path))
+            attributes = gaussians.ply_attributes(sources, layout)
+            write_float_vertex_ply(_atomic_path(ply_path), attributes, names)
+            os.replace(_atomic_path(ply_path), ply_path)
+            if exposure_path is not None:
+                exposure_dict = {}
+                if exposures is not None:
+                    exposure_dict = dict(zip(image_names, exposures.numpy().tolist()))
+                with open(_atomic_path(exposure_path), "w") as f:
+                    json.dump(exposure_dict, f, indent=2)
+                os.replace(_atomic_path(exposure_path), exposure_path)
+
+        self._submit(host_copy((sources, exposures)), write)
+
+    def submit_checkpoint(self, obj, path, encode=None):
+        """
+        Snapshot an arbitrary structure of tensors (e.g. (gaussians.capture(), iteration)) with torch.save.
+        encode, if given, transforms the host copy on the worker before it is saved.
+        """
+        def write(host):
+            if encode is not None:
+                host = encode(host)
+            torch.save(host, _atomic_path(path))
+            os.replace(_atomic_path(path), path)
+
+        self._submit(host_copy(obj), write)
+
+    def flush(self):
+        """Block until every submitted snapshot is on disk."""
+        self._queue.join()
+        self._raise_pending_error()
+
+    def close(self):
+        self.flush()
+        self._queue.put(None)
+        self._thread.join()
@@ -0,0 +1,237 @@
+import os
+import json
+import math
+import time
+from collections import deque
+from contextlib import contextmanager
+import torch
+
+class DurationHistogram:
+    """
+    Log-spaced histogram of durations in milliseconds: BINS_PER_OCTAVE bins per doubling
+    from MIN_MS up, so percentiles are accurate to a few percent at constant memory.
+    """
+
+    MIN_MS = 1e-3
+    BINS_PER_OCTAVE = 4
+    NUM_BINS = 4 * 28  # 1 us .. ~4.5 min
+
+    def __init__(self):
+        self.bins = [0] * self.NUM_BINS
+        self.count = 0
+        self.total = 0.0
+        self.min = math.inf
+        self.max = 0.0
+
+    def add(self, ms):
+        index = 0 if ms <= self.MIN_MS else int(math.log2(ms / self.MIN_MS) * self.BINS_PER_OCTAVE)
+        self.bins[min(index, self.NUM_BINS - 1)] += 1
+        self.count += 1
+        self.total += ms
+        self.min = min(self.min, ms)
+        self.max = max(self.max, ms)
+
+    def mean(self):
+        return self.total / self.count if self.count else 0.0
+
+    def percentile(self, q):
+        """Geometric center of the bin holding the q-th percentile, clamped to the observed range."""
+        if self.count == 0:
+            return 0.0
+        rank = q / 100 * self.count
+        seen = 0
+        for index, n in enumerate(self.bins):
+            seen += n
+            if n and seen >= rank:
+                center = self.MIN_MS * 2 ** ((index + 0.5) / self.BINS_PER_OCTAVE)
+                return min(max(center, self.min), self.max)
+        return self.max
+
+class TrainingProfiler:
+    """
+    Per-phase timer for the training loop.
+
+    Each `with profiler.phase(name)` block is timed on the CPU with perf_counter and, with
+    cuda=True, on the GPU with a pair of CUDA events recorded on the current stream. Events
+    come from a reusable pool and are read back only once the GPU has passed them, so the
+    profiler never synchronizes except when exporting. Durations feed per-phase histograms
+    (since the last export and since the start); every `interval` iterations, step() writes
+    a Chrome trace (chrome://tracing, Perfetto) of the spans since the previous export and
+    a summary table to output_dir. Disabled, phase() is a no-op context.
+
+    CPU time is the time the loop spent in a phase (kernel launches, plus any waits on the
+    GPU); GPU time is the time the phase's work took on the stream.
+    """
+
+    CPU_TRACK, GPU_TRACK = 0, 1
+
+    def __init__(self, output_dir, interval=1000, enabled=True, cuda=True):
+        self.output_dir = output_dir
+        self.interval = interval
+        self.enabled = enabled
+        self.cuda = enabled and cuda and torch.cuda.is_available()
+        self._window = {}
+        self._total = {}
+        self._trace = []
+        self._spans = []
+        self._pending = deque()
+        self._event_pool = []
+        self._iteration_start = None
+        if enabled:
+            os.makedirs(output_dir, exist_ok=True)
+            self._anchor()
+            self._origin = self._cpu_anchor
+
+    def _anchor(self):
+        # trace timestamps are relative to this point; GPU spans are placed relative to an
+        # event recorded with the GPU idle at the same instant
+        if self.cuda:
+            torch.cuda.synchronize()
+            self._gpu_anchor = torch.cuda.Event(enable_timing=True)
+            self._gpu_anchor.record()
+            torch.cuda.synchronize()
+        self._cpu_anchor = time.perf_counter()
+
+    def _event(self):
+        if self._event_pool:
+            return self._event_pool.pop()
+        return torch.cuda.Event(enable_timing=True)
+
+    def _add(self, name, track, ms):
+        key = (name, track)
+        for histograms in (self._window, self._total):
+            if key not in histograms:
+                histograms[key] = DurationHistogram()
+            histograms[key].add(ms)
+
+    @contextmanager
+    def _timed(self, name):
+        if self._iteration_start is None:
+            self._iteration_start = time.perf_counter()
+        start_event = end_event = None
+        if self.cuda:
+            start_event = self._event()
+            start_event.record()
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            end = time.perf_counter()
+            if self.cuda:
+                end_event = self._event()
+                end_event.record()
+            self._spans.append((name, start, end, start_event, end_event))
+
+    def phase(self, name):
+        if not self.enabled:
+            return _NULL_PHASE
+        return self._timed(name)
+
+    def _resolve(self, iteration, spans):
+        for name, start, end, start_event, end_event in spans:
+            ms = (end - start) * 1000
+            self._add(name, self.CPU_TRACK, ms)
+            self._trace.append((name, iteration, self.CPU_TRACK, (start - self._origin) * 1e6, ms * 1000))
+            if start_event is not None:
+                gpu_ms = start_event.elapsed_time(end_event)
+                offset_ms = self._gpu_anchor.elapsed_time(start_event)
+                self._add(name, self.GPU_TRACK, gpu_ms)
+                self._trace.append((name, iteration, self.GPU_TRACK,
+                                    (self._cpu_anchor - self._origin) * 1e6 + offset_ms * 1000, gpu_ms * 1000))
+                self._event_pool.extend((start_event, end_event))
+
+    def _drain(self, block):
+        while self._pending:
+            iteration, spans = self._pending[0]
+            last = spans[-1][4] if spans else None
+            if last is not None and not block and not last.query():
+                return
+            self._pending.popleft()
+            self._resolve(iteration, spans)
+
+    def step(self, iteration):
+        """
+        Closes the iteration. Returns {phase: mean ms} of the window when this iteration
+        exported a trace and summary, otherwise None.
+        """
+        if not self.enabled:
+            return None
+        end = time.perf_counter()
+        if self._iteration_start is not None:
+            ms = (end - self._iteration_start) * 1000
+            self._add("iteration", self.CPU_TRACK, ms)
+            self._trace.append(("iteration", iteration, self.CPU_TRACK, (self._iteration_start - self._origin) * 1e6, ms * 1000))
+        self._iteration_start = end
+        self._pending.append((iteration, self._spans))
+        self._spans = []
+        self._drain(block=False)
+        if self.interval > 0 and iteration % self.interval == 0:
+            means = self.export(iteration)
+            # the export itself is not part of the next iteration
+            self._iteration_start = time.perf_counter()
+            return means
+        return None
+
+    def export(self, iteration):
+        """Writes trace_<iteration>.json and summary_<iteration>.txt for the spans since the last export."""
+        if self.cuda:
+            torch.cuda.synchronize()
+        self._drain(block=True)
+        trace_path = os.path.join(self.output_dir, "trace_{:06d}.json".format(iteration))
+        with open(trace_path, "w") as f:
+            json.dump(self.chrome_trace(), f)
+        with open(os.path.join(self.output_dir, "summary_{:06d}.txt".format(iteration)), "w") as f:
+            f.write(self.summary(self._window) + "\n")
+        means = {name + ("/gpu" if track == self.GPU_TRACK else ""): h.mean() for (name, track), h in self._window.items()}
+        self._window = {}
+        self._trace = []
+        # re-anchor so GPU offsets stay small enough for the events' float precision
+        self._anchor()
+        return means
+
+    def chrome_trace(self):
+        events = [{"name": "thread_name", "ph": "M", "pid": 0, "tid": self.CPU_TRACK, "args": {"name": "CPU"}},
+                  {"name": "thread_name", "ph": "M", "pid": 0, "tid": self.GPU_TRACK, "args": {"name": "GPU stream"}}]
+        for name, iteration, track, ts, dur in self._trace:
+            events.append({"name": name, "ph": "X", "pid": 0, "tid": track, "ts": round(ts, 3), "dur": round(dur, 3),
+                           "args": {"iteration": iteration}})
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+    def summary(self, histograms=None):
+        """Per-phase table of count, mean, p50/p90/p99 and max in ms, CPU and GPU, with share of the iteration time."""
+        histograms = self._total if histograms is None else histograms
+        iteration = histograms.get(("iteration", self.CPU_TRACK))
+        iteration_total = iteration.total if iteration is not None else 0.0
+        names = list(dict.fromkeys(name for name, _ in histograms))
+        lines = ["{:<22} {:>7} | {:>8} {:>8} {:>8} {:>8} {:>8} | {:>8} {:>8} {:>8} | {:>6}".format(
+            "phase (ms)", "count", "cpu mean", "p50", "p90", "p99", "max", "gpu mean", "p90", "p99", "share")]
+        for name in names:
+            cpu = histograms.get((name, self.CPU_TRACK), DurationHistogram())
+            gpu = histograms.get((name, self.GPU_TRACK))
+            gpu_columns = "{:>8.3f} {:>8.3f} {:>8.3f}".format(gpu.mean(), gpu.percentile(90), gpu.percentile(99)) \
+                if gpu is not None else "{:>8} {:>8} {:>8}".format("-", "-", "-")
+            share = 100 * cpu.total / iteration_total if iteration_total > 0 else 0.0
+            lines.append("{:<22} {:>7} | {:>8.3f} {:>8.3f} {:>8.3f} {:>8.3f} {:>8.3f} | {} | {:>5.1f}%".format(
+                name, cpu.count, cpu.mean(), cpu.percentile(50), cpu.percentile(90), cpu.percentile(99), cpu.max,
+                gpu_columns, share))
+        return "\n".join(lines)
+
+    def close(self, iteration):
+        """Exports the remaining spans and writes the whole-run summary, which is also returned."""
+        if not self.enabled:
+            return None
+        if self._pending or self._trace:
+            self.export(iteration)
+        summary = self.summary()
+        with open(os.path.join(self.output_dir, "summary_total.txt"), "w") as f:
+            f.write(summary + "\n")
+        return summary
+
+class _NullPhase:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+_NULL_PHASE = _NullPhase()
@@ -0,0 +1,90 @@
+import random
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+import torch
+
+class ViewpointPrefetcher:
+    """
+    Draws training cameras in shuffled epochs (each camera once per epoch, like popping
+    random entries off a viewpoint stack) and stages the ground truth of the next `depth`
+    cameras on a background thread: decoding through the image residency, then copying
+    to the training device on a side CUDA stream. The training loop only waits when
+    staging is slower than an iteration.
+
+    Timing: staged_seconds is the background staging time, waited_seconds the time next()
+    blocked; the difference is transfer/decode time hidden behind render and backward.
+    depth=0 stages synchronously in next() (everything is waited for).
+    """
+
+    def __init__(self, cameras, device="cuda", depth=2):
+        self.cameras = cameras
+        self.device = torch.device(device)
+        self.depth = depth
+        self._order = deque()
+        self._pending = deque()
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="viewpoint-prefetch") if depth > 0 else None
+        self._stream = torch.cuda.Stream(device=self.device) if self.device.type == "cuda" else None
+        self.staged_seconds = 0.0
+        self.waited_seconds = 0.0
+        self.count = 0
+
+    def _next_camera(self):
+        if not self._order:
+            indices = list(range(len(self.cameras)))
+            random.shuffle(indices)
+            self._order.extend(indices)
+        return self.cameras[self._order.popleft()]
+
+    def _stage(self, camera):
+        start = time.perf_counter()
+        event = None
+        if self._stream is not None:
+            with torch.cuda.stream(self._stream):
+                tensors = {name: t.to(self.device, non_blocking=True) if t is not None else None
+                           for name, t in camera.resident_images().items()}
+                event = torch.cuda.Event()
+                event.record(self._stream)
+        else:
+            tensors = {name: t.to(self.device) if t is not None else None
+                       for name, t in camera.resident_images().items()}
+        return camera, tensors, event, time.perf_counter() - start
+
+    def _fill(self):
+        while len(self._pending) < self.depth:
+            self._pending.append(self._executor.submit(self._stage, self._next_camera()))
+
+    def next(self):
+        """The next camera and its ground truth (name -> tensor) on the training device."""
+        start = time.perf_counter()
+        if self._executor is None:
+            camera, tensors, event, staged = self._stage(self._next_camera())
+        else:
+            self._fill()
+            camera, tensors, event, staged = self._pending.popleft().result()
+            self._fill()
+        if event is not None:
+            # order the training stream after the side-stream copies, and keep the side
+            # stream's allocations alive until the training stream is done with them
+            current = torch.cuda.current_stream(self.device)
+            current.wait_event(event)
+            for t in tensors.values():
+                if t is not None and t.is_cuda:
+                    t.record_stream(current)
+        self.waited_seconds += time.perf_counter() - start
+        self.staged_seconds += staged
+        self.count += 1
+        return camera, tensors
+
+    def summary(self):
+        if self.count == 0:
+            return "no viewpoints fetched"
+        hidden = max(self.staged_seconds - self.waited_seconds, 0.0)
+        return "{} viewpoints: staging {:.2f} ms/it, waited {:.2f} ms/it, hidden {:.2f} ms/it ({:.0f}%)".format(
+            self.count, 1000 * self.staged_seconds / self.count, 1000 * self.waited_seconds / self.count,
+            1000 * hidden / self.count, 100 * hidden / self.staged_seconds if self.staged_seconds > 0 else 0)
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._pending.clear()
@@ -1,11 +1,17 @@
+import asyncio
 from fastapi import FastAPI
-from .database import Base, engine
+from .database import Base, engine, async_engine
 from .routers.auth import router as auth_router
 from .routers.getfiles import router as files_router
 from .routers.upload import router as upload_router
+from .routers.jobs import router as jobs_router
+from .services.job_queue import job_queue
+from .services.catalog_service import migrate_file_catalog
+from .services.frame_extraction import shutdown_process_pool
 from fastapi.middleware.cors import CORSMiddleware
 
 Base.metadata.create_all(bind=engine)
+migrate_file_catalog(engine)
 
 app = FastAPI(title="后端已启动")
 
@@ -23,6 +29,17 @@ app.add_middleware(
     max_age=3600,
 )
 
+# 启动/停止后台任务队列
+@app.on_event("startup")
+async def start_job_queue():
+    await job_queue.start()
+
+@app.on_event("shutdown")
+async def stop_job_queue():
+    await job_queue.stop()
+    await asyncio.to_thread(shutdown_process_pool)
+    await async_engine.dispose()
+
 # 添加根路径处理
 @app.get("/")
 def read_root():
@@ -31,3 +48,4 @@ def read_root():
 app.include_router(auth_router)
 app.include_router(files_router)
 app.include_router(upload_router)
+app.include_router(jobs_router)
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, ForeignKey
+from sqlalchemy import Column, Integer, String, Float, ForeignKey, Index
 from sqlalchemy.orm import relationship
 from ..database import Base
 
@@ -6,6 +6,22 @@ class File(Base):
     __tablename__ = "files"
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String)
-    path = Column(String)
+    path = Column(String, index=True)
     owner_id = Column(Integer, ForeignKey("users.id"))
     owner = relationship("User", back_populates="files")
+
+    # 文件目录索引字段，路径结构为 data/{username}/{stage}/[{folder}/]{name}
+    stage = Column(String(20), nullable=True)
+    folder = Column(String, nullable=True, default="")      # stage 下的一级文件夹，顶层条目为空串
+    category = Column(String(20), nullable=True)             # image, video, archive, pointcloud, other, folder
+    extension = Column(String(16), nullable=True)
+    size = Column(Integer, nullable=True)
+    mtime = Column(Float, nullable=True)
+    ctime = Column(Float, nullable=True)
+    width = Column(Integer, nullable=True)
+    height = Column(Integer, nullable=True)
+
+    __table_args__ = (
+        Index("ix_files_owner_stage_folder_name", "owner_id", "stage", "folder", "name"),
+        Index("ix_files_owner_stage_folder_category", "owner_id", "stage", "folder", "category"),
+    )
@@ -0,0 +1,17 @@
+from sqlalchemy import Column, Integer, String, Float, Text, DateTime, ForeignKey
+from datetime import datetime
+from ..database import Base
+
+class Job(Base):
+    __tablename__ = "jobs"
+    id = Column(String(32), primary_key=True, index=True)
+    job_type = Column(String(50))
+    status = Column(String(20), default="pending", index=True)
+    progress = Column(Float, default=0.0)
+    attempts = Column(Integer, default=0)
+    payload = Column(Text)
+    result = Column(Text, nullable=True)
+    error = Column(Text, nullable=True)
+    owner_id = Column(Integer, ForeignKey("users.id"), index=True)
+    created_at = Column(DateTime, default=datetime.utcnow, index=True)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
@@ -2,5 +2,6 @@
 from .auth import router as auth
 from .getfiles import router as files
 from .upload import router as upload
+from .jobs import router as jobs
 
-__all__ = ['auth', 'files', 'upload']
+__all__ = ['auth', 'files', 'upload', 'jobs']
@@ -1,19 +1,24 @@
 from fastapi import APIRouter, UploadFile, File, Depends, Query
-from sqlalchemy.orm import Session
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import Optional
 import os
 from pathlib import Path
-from ..services import file_service
-from ..core.deps import get_db
+from ..services import file_service, user_service, catalog_service
+from ..core.deps import get_async_db, get_current_user
+from ..core.auth_cache import CachedUser
 from ..core.config import settings
+from ..utils.dir_cache import directory_cache, DirEntry
 
 router = APIRouter(prefix="/files", tags=["Files"])
 
 @router.get("/get_files")
-def get_files(
+async def get_files(
     stage: str = Query(..., description="阶段类型: image, colmap, pcd"),
     username: Optional[str] = Query(None, description="用户名"),
-    db: Session = Depends(get_db)
+    page: int = Query(1, ge=1, description="页码（从1开始）"),
+    page_size: Optional[int] = Query(None, ge=1, le=1000, description="每页条目数，不传则返回全部"),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     获取指定用户在指定阶段的文件和文件夹列表
@@ -21,6 +26,11 @@ def get_files(
     参数:
         - stage: 阶段类型 (image, colmap, pcd)
         - username: 用户名（可选，不传则返回所有用户）
+        - page / page_size: 分页参数，文件夹在前、文件在后，均按名称排序
+    
+    指定用户时从数据库中的文件目录索引查询，耗时只与分页大小有关；
+    未指定用户时直接读取磁盘目录。数据库查询走异步会话，磁盘访问放在线程池中，
+    均不阻塞事件循环。
     
     返回:
         - files: 文件列表
@@ -44,31 +54,68 @@ def get_files(
                 "message": f"路径不存在: {base_path}"
             }
         
-        files = []
-        folders = []
+        # 3. 指定了已注册用户时，从目录索引中分页查询
+        user = await db.run_sync(user_service.get_user_by_username, username) if username else None
+        if user:
+            stage_dir = settings.stage_mapping.get(stage, stage)
+            await run_in_threadpool(catalog_service.refresh_catalog, user.id, username, stage_dir)
+            listing = await db.run_sync(catalog_service.list_catalog, user.id, stage_dir, page=page, page_size=page_size)
+            files = []
+            folders = []
+            for row in listing["rows"]:
+                if row.category == catalog_service.FOLDER_CATEGORY:
+                    folders.append(_get_catalog_folder_info(row, listing["image_counts"].get(row.name, 0), stage))
+                else:
+                    files.append(_get_catalog_file_info(row, stage))
+            return {
+                "files": files,
+                "folders": folders,
+                "stage": stage,
+                "username": username,
+                "base_path": base_path,
+                "total_files": listing["total_files"],
+                "total_folders": listing["total_folders"],
+                "total_items": listing["total_files"] + listing["total_folders"],
+                "page": page,
+                "page_size": page_size
+            }
+        
+        # 4. 否则直接读取目录（目录未变化时使用缓存），文件夹在前、文件在后
+        entries = await run_in_threadpool(directory_cache.list_dir, base_path)
+        folder_entries = [entry for entry in entries if entry.is_dir]
+        file_entries = [entry for entry in entries if not entry.is_dir]
+        items = folder_entries + file_entries
         
-        # 3. 遍历目录，分别处理文件和文件夹
-        for item in os.listdir(base_path):
-            item_path = os.path.join(base_path, item)
-            
-            if os.path.isdir(item_path):
-                # 处理文件夹
-                folder_info = _get_folder_info(item, item_path, stage)
-                folders.append(folder_info)
-            else:
-                # 处理文件
-                file_info = _get_file_info(item, item_path, stage)
-                files.append(file_info)
+        # 分页后只为当前页的条目生成详细信息
+        if page_size:
+            start = (page - 1) * page_size
+            items = items[start:start + page_size]
         
-        # 4. 返回结果
+        def describe_items():
+            files = []
+            folders = []
+            for entry in items:
+                if entry.is_dir:
+                    folders.append(_get_folder_info(entry, stage))
+                else:
+                    files.append(_get_file_info(entry, stage))
+            return files, folders
+        
+        # 统计文件夹内图片数量需要读取磁盘
+        files, folders = await run_in_threadpool(describe_items)
+        
+        # 5. 返回结果
         return {
             "files": files,
             "folders": folders,
             "stage": stage,
             "username": username,
             "base_path": base_path,
-            "total_files": len(files),
-            "total_folders": len(folders)
+            "total_files": len(file_entries),
+            "total_folders": len(folder_entries),
+            "total_items": len(folder_entries) + len(file_entries),
+            "page": page,
+            "page_size": page_size
         }
         
     except Exception as e:
@@ -82,6 +129,17 @@ def get_files(
             "traceback": traceback.format_exc()
         }
 
+@router.post("/reconcile")
+async def reconcile_files(
+    stage: Optional[str] = Query(None, description="阶段类型，不传则同步全部阶段"),
+    current_user: CachedUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """在后台同步当前用户的磁盘文件与文件目录索引"""
+    stage_dir = settings.stage_mapping.get(stage, stage) if stage else None
+    job = await db.run_sync(catalog_service.request_reconcile, current_user.id, current_user.username, stage_dir)
+    return {"job_id": job.id, "status": job.status}
+
 def _get_stage_path(stage: str, username: Optional[str] = None) -> str:
     """根据阶段和用户获取对应的路径"""
 
@@ -100,9 +158,10 @@ def _get_stage_path(stage: str, username: Optional[str] = None) -> str:
     stage_dir = stage_mapping.get(stage, stage)
     return os.path.join(user_dir, stage_dir)
 
-def _get_file_info(filename: str, filepath: str, stage: str) -> dict:
+def _get_file_info(entry: DirEntry, stage: str) -> dict:
     """获取文件信息"""
-    stat = os.stat(filepath)
+    filename = entry.name
+    filepath = entry.path
     file_ext = Path(filename).suffix.lower()
     
     # 根据扩展名确定文件类型和分类
@@ -113,8 +172,8 @@ def _get_file_info(filename: str, filepath: str, stage: str) -> dict:
         "name": filename,
         "path": filepath,
         "type": file_type,
-        "size": stat.st_size,
-        "created_time": int(stat.st_ctime),
+        "size": entry.size,
+        "created_time": int(entry.ctime),
         "item_type": "file",
         "extension": file_ext,
         "category": category,  # 文件分类：image, video, archive, pointcloud, other
@@ -122,44 +181,58 @@ def _get_file_info(filename: str, filepath: str, stage: str) -> dict:
         "folder": os.path.dirname(filepath)
     }
 
-def _get_folder_info(foldername: str, folderpath: str, stage: str) -> dict:
+def _get_folder_info(entry: DirEntry, stage: str) -> dict:
     """获取文件夹信息"""
-    stat = os.stat(folderpath)
-    
     # 统计图片数量
-    image_count = _count_images_in_folder(folderpath)
+    image_count = _count_images_in_folder(entry.path)
     
     # 根据阶段确定文件夹分类
     category = _get_folder_category(stage)
     
     return {
-        "name": foldername,
+        "name": entry.name,
         "type": "folder",
         "image_count": image_count,
         "has_images": image_count > 0,  # 是否包含图片
-        "created_time": int(stat.st_ctime),
+        "created_time": int(entry.ctime),
         "item_type": "folder",
         "category": category,  # 文件夹分类：images, colmap, pcd
         "stage": stage  # 所属阶段
     }
 
+def _get_catalog_file_info(row, stage: str) -> dict:
+    """根据目录索引记录生成文件信息"""
+    return {
+        "name": row.name,
+        "path": row.path,
+        "type": _get_file_type(row.extension or ""),
+        "size": row.size,
+        "created_time": int(row.ctime or 0),
+        "item_type": "file",
+        "extension": row.extension,
+        "category": row.category,
+        "stage": stage,
+        "folder": os.path.dirname(row.path),
+        "width": row.width,
+        "height": row.height
+    }
+
+def _get_catalog_folder_info(row, image_count: int, stage: str) -> dict:
+    """根据目录索引记录生成文件夹信息"""
+    return {
+        "name": row.name,
+        "type": "folder",
+        "image_count": image_count,
+        "has_images": image_count > 0,  # 是否包含图片
+        "created_time": int(row.ctime or 0),
+        "item_type": "folder",
+        "category": _get_folder_category(stage),
+        "stage": stage
+    }
+
 def _get_file_category(file_ext: str) -> str:
     """根据文件扩展名确定分类"""
-    image_exts = {'.jpg', '.jpeg', '.png', '.bmp', '.tiff', '.tif', '.webp'}
-    video_exts = {'.mp4', '.avi', '.mov', '.mkv', '.wmv', '.flv'}
-    archive_exts = {'.zip', '.rar', '.7z', '.tar', '.gz'}
-    pointcloud_exts = {'.ply', '.pcd', '.xyz', '.las', '.laz'}
-    
-    if file_ext in image_exts:
-        return "image"
-    elif file_ext in video_exts:
-        return "video"
-    elif file_ext in archive_exts:
-        return "archive"
-    elif file_ext in pointcloud_exts:
-        return "pointcloud"
-    else:
-        return "other"
+    return catalog_service.get_file_category(file_ext)
 
 def _get_file_type(file_ext: str) -> str:
     """根据文件扩展名确定文件类型描述"""
@@ -182,15 +255,8 @@ def _get_folder_category(stage: str) -> str:
     return stage_mapping.get(stage, "images")
 
 def _count_images_in_folder(folderpath: str) -> int:
-    """统计文件夹中的图片数量"""
-    image_exts = {'.jpg', '.jpeg', '.png', '.bmp', '.tiff', '.tif', '.webp'}
-    count = 0
-    
+    """统计文件夹中的图片数量（按文件夹 mtime 缓存）"""
     try:
-        for item in os.listdir(folderpath):
-            if Path(item).suffix.lower() in image_exts:
-                count += 1
-    except:
-        pass
-    
-    return count
\ No newline at end of file
+        return directory_cache.count_files(folderpath, catalog_service.IMAGE_EXTS)
+    except OSError:
+        return 0
\ No newline at end of file
@@ -0,0 +1,32 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.orm import Session
+from typing import Optional
+
+from ..services.job_queue import job_queue
+from ..core.deps import get_db, get_current_user
+from ..core.auth_cache import CachedUser
+
+router = APIRouter(prefix="/jobs", tags=["Jobs"])
+
+@router.get("/")
+def list_jobs(
+    status: Optional[str] = Query(None, description="任务状态: pending, running, completed, failed"),
+    limit: int = Query(50, ge=1, le=500),
+    current_user: CachedUser = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """获取当前用户的后台任务列表"""
+    jobs = job_queue.list_jobs(db, current_user.id, status=status, limit=limit)
+    return {"jobs": [job_queue.to_dict(job) for job in jobs]}
+
+@router.get("/{job_id}")
+def get_job(
+    job_id: str,
+    current_user: CachedUser = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """获取任务状态和进度"""
+    job = job_queue.get_job(db, job_id, current_user.id)
+    if not job:
+        raise HTTPException(status_code=404, detail=f"任务不存在: {job_id}")
+    return job_queue.to_dict(job)
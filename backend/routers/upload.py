@@ -1,10 +1,14 @@
-from fastapi import APIRouter, UploadFile, File, Depends, Form, HTTPException
+from fastapi import APIRouter, UploadFile, File, Depends, Form, HTTPException, Header, Query, Request
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List, Optional
 
 from ..services.upload_service import upload_service
-from ..core.deps import get_db, get_current_user
-from ..models.user_model import User
+from ..services.resumable_upload_service import resumable_upload_service
+from ..core.deps import get_db, get_async_db, get_current_user
+from ..core.auth_cache import CachedUser
+from ..schemas.file_schema import ResumableUploadInit
 
 router = APIRouter(prefix="/upload", tags=["Files"])
 
@@ -16,8 +20,8 @@ async def upload_files(
     upload_type: Optional[str] = Form(None),
     extract_all_frames: Optional[str] = Form(None),
     frame_rate: Optional[str] = Form(None),
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: CachedUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
 ):
     try:
         # 处理视频帧提取参数
@@ -52,7 +56,8 @@ async def upload_files(
                     "success_count": result.success_count,
                     "failed_count": result.failed_count,
                     "upload_type": upload_type
-                }
+                },
+                "jobs": result.metadata.get("jobs", [])
             }
         else:
             error_msg = result.failed_files[0]["error"] if result.failed_files else "未知错误"
@@ -62,3 +67,88 @@ async def upload_files(
         raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"上传失败: {str(e)}")
+
+
+@router.post("/resumable/init")
+async def init_resumable_upload(
+    body: ResumableUploadInit,
+    current_user: CachedUser = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """创建断点续传会话，返回 upload_id 以及需要上传的块"""
+    return await run_in_threadpool(
+        resumable_upload_service.init_upload,
+        filename=body.filename,
+        total_size=body.total_size,
+        username=current_user.username,
+        owner_id=current_user.id,
+        chunk_size=body.chunk_size,
+        stage=body.stage,
+        final_folder_name=body.finalFolderName,
+        file_sha256=body.file_sha256,
+        db=db
+    )
+
+@router.put("/resumable/{upload_id}")
+async def put_resumable_chunk(
+    upload_id: str,
+    request: Request,
+    offset: int = Query(..., description="块在文件中的字节偏移"),
+    x_chunk_sha256: Optional[str] = Header(None),
+    current_user: CachedUser = Depends(get_current_user)
+):
+    """按偏移上传一个块，请求体为块的原始字节"""
+    # 先确定块应有的长度，请求体按此上限流式读取，避免把超大请求整个读进内存
+    expected = await run_in_threadpool(
+        resumable_upload_service.expected_chunk_length, upload_id, offset, current_user.id
+    )
+    content_length = request.headers.get("content-length")
+    if content_length is not None and content_length.isdigit() and int(content_length) > expected:
+        raise HTTPException(
+            status_code=413,
+            detail=f"块大小不正确: 期望 {expected} 字节，实际 {content_length} 字节"
+        )
+    data = bytearray()
+    async for piece in request.stream():
+        if len(data) + len(piece) > expected:
+            raise HTTPException(status_code=413, detail=f"块大小不正确: 超过 {expected} 字节")
+        data += piece
+    return await run_in_threadpool(
+        resumable_upload_service.write_chunk,
+        upload_id=upload_id,
+        offset=offset,
+        data=data,
+        owner_id=current_user.id,
+        chunk_sha256=x_chunk_sha256
+    )
+
+@router.get("/resumable/{upload_id}")
+async def get_resumable_status(
+    upload_id: str,
+    current_user: CachedUser = Depends(get_current_user)
+):
+    """查询上传进度，missing_chunks 即需要续传的块"""
+    return resumable_upload_service.get_status(upload_id, current_user.id)
+
+@router.post("/resumable/{upload_id}/finalize")
+async def finalize_resumable_upload(
+    upload_id: str,
+    current_user: CachedUser = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """所有块上传完成后组装文件并创建记录"""
+    return await run_in_threadpool(
+        resumable_upload_service.finalize_upload,
+        upload_id=upload_id,
+        owner_id=current_user.id,
+        db=db
+    )
+
+@router.delete("/resumable/{upload_id}")
+async def abort_resumable_upload(
+    upload_id: str,
+    current_user: CachedUser = Depends(get_current_user)
+):
+    """放弃上传会话"""
+    await run_in_threadpool(resumable_upload_service.abort_upload, upload_id, current_user.id)
+    return {"message": f"上传会话 {upload_id} 已取消"}
@@ -1,9 +1,9 @@
 # schemas/__init__.py
 from .user_schema import UserCreate, UserLogin, UserResponse
-from .file_schema import FileCreate, FileResponse
+from .file_schema import FileCreate, FileResponse, ResumableUploadInit
 
 __all__ = [
     'UserCreate', 'UserLogin', 'UserResponse',
-    'FileCreate', 'FileResponse'
+    'FileCreate', 'FileResponse', 'ResumableUploadInit'
 ]
 
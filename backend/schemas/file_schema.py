@@ -1,3 +1,4 @@
+from typing import Optional
 from pydantic import BaseModel
 
 class FileBase(BaseModel):
@@ -12,3 +13,11 @@ class FileResponse(FileBase):
 
     class Config:
         from_attributes = True
+
+class ResumableUploadInit(BaseModel):
+    filename: str
+    total_size: int
+    chunk_size: Optional[int] = None
+    stage: Optional[str] = None
+    finalFolderName: Optional[str] = None
+    file_sha256: Optional[str] = None
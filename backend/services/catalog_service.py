@@ -0,0 +1,389 @@
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+from pathlib import Path
+from sqlalchemy import inspect, text, func, case
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+from fastapi.concurrency import run_in_threadpool
+import threading
+import json
+import time
+import os
+
+import logging
+
+from ..core.config import settings
+from ..database import SessionLocal
+from ..models import file_model, job_model
+from ..services.job_queue import job_queue
+
+logger = logging.getLogger(__name__)
+
+try:
+    from PIL import Image
+    PIL_AVAILABLE = True
+except ImportError:
+    PIL_AVAILABLE = False
+    logger.warning("Pillow not available. Image dimensions will not be indexed.")
+
+IMAGE_EXTS = {'.jpg', '.jpeg', '.png', '.bmp', '.tiff', '.tif', '.webp'}
+VIDEO_EXTS = {'.mp4', '.avi', '.mov', '.mkv', '.wmv', '.flv'}
+ARCHIVE_EXTS = {'.zip', '.rar', '.7z', '.tar', '.gz'}
+POINTCLOUD_EXTS = {'.ply', '.pcd', '.xyz', '.las', '.laz'}
+
+FOLDER_CATEGORY = "folder"
+# 流式上传过程中的临时文件后缀，不纳入索引
+PARTIAL_SUFFIX = ".part"
+
+# 目录索引同步任务类型
+CATALOG_RECONCILE_JOB = "catalog_reconcile"
+
+# mtime 距今小于该秒数时不记录签名，避免文件系统时间戳精度导致漏掉同一时刻的修改
+MTIME_SETTLE_SECONDS = 1.0
+
+# 上次同步时各 (owner_id, stage) 的目录签名及同步时间（time.monotonic）
+_stage_signatures: Dict[Tuple[int, str], Tuple[Optional[Tuple], float]] = {}
+_stage_signatures_lock = threading.Lock()
+
+
+def get_file_category(file_ext: str) -> str:
+    """根据文件扩展名确定分类"""
+    if file_ext in IMAGE_EXTS:
+        return "image"
+    elif file_ext in VIDEO_EXTS:
+        return "video"
+    elif file_ext in ARCHIVE_EXTS:
+        return "archive"
+    elif file_ext in POINTCLOUD_EXTS:
+        return "pointcloud"
+    else:
+        return "other"
+
+
+def migrate_file_catalog(engine: Engine) -> None:
+    """为已有的 files 表补齐目录索引字段和索引（SQLite 的 create_all 不会修改已存在的表）"""
+    table = file_model.File.__table__
+    existing = {column["name"] for column in inspect(engine).get_columns(table.name)}
+    with engine.begin() as conn:
+        for column in table.columns:
+            if column.name not in existing:
+                column_type = column.type.compile(dialect=engine.dialect)
+                conn.execute(text(f'ALTER TABLE {table.name} ADD COLUMN "{column.name}" {column_type}'))
+    for index in table.indexes:
+        index.create(bind=engine, checkfirst=True)
+
+
+def _split_catalog_path(path: Path) -> Optional[Tuple[str, str]]:
+    """从 data/{username}/{stage}/[{folder}/]{name} 中解析出 (stage, folder)"""
+    try:
+        parts = path.relative_to(settings.upload_base_dir).parts
+    except ValueError:
+        return None
+    if len(parts) < 3:
+        return None
+    stage = parts[1]
+    folder = parts[2] if len(parts) > 3 else ""
+    return stage, folder
+
+
+def _image_size(path: Path) -> Tuple[Optional[int], Optional[int]]:
+    if not PIL_AVAILABLE:
+        return None, None
+    try:
+        # 只读取文件头，不解码像素
+        with Image.open(path) as img:
+            return img.size
+    except Exception:
+        return None, None
+
+
+def describe_file(path: Path, stat: Optional[os.stat_result] = None) -> Dict[str, Any]:
+    """生成文件的目录索引字段"""
+    path = Path(path)
+    stat = stat or path.stat()
+    stage, folder = _split_catalog_path(path) or (None, "")
+    extension = path.suffix.lower()
+    category = get_file_category(extension)
+    width, height = _image_size(path) if category == "image" else (None, None)
+    return {
+        "name": path.name,
+        "path": str(path),
+        "stage": stage,
+        "folder": folder,
+        "category": category,
+        "extension": extension,
+        "size": stat.st_size,
+        "mtime": stat.st_mtime,
+        "ctime": stat.st_ctime,
+        "width": width,
+        "height": height
+    }
+
+
+def describe_folder(path: Path, stat: Optional[os.stat_result] = None) -> Dict[str, Any]:
+    """生成 stage 下一级文件夹的目录索引字段"""
+    path = Path(path)
+    stat = stat or path.stat()
+    stage, _ = _split_catalog_path(path / "_") or (None, "")
+    return {
+        "name": path.name,
+        "path": str(path),
+        "stage": stage,
+        "folder": "",
+        "category": FOLDER_CATEGORY,
+        "extension": "",
+        "size": 0,
+        "mtime": stat.st_mtime,
+        "ctime": stat.st_ctime,
+        "width": None,
+        "height": None
+    }
+
+
+def ensure_folder_records(db: Session, owner_id: int, paths: Iterable[str]) -> None:
+    """确保文件所在的一级文件夹在目录索引中有记录（不提交事务）"""
+    folders: Set[Path] = set()
+    for path in paths:
+        try:
+            parts = Path(path).relative_to(settings.upload_base_dir).parts
+        except ValueError:
+            continue
+        if len(parts) > 3:
+            folders.add(Path(settings.upload_base_dir, *parts[:3]))
+    if not folders:
+        return
+    existing = {
+        p for (p,) in db.query(file_model.File.path).filter(
+            file_model.File.owner_id == owner_id,
+            file_model.File.category == FOLDER_CATEGORY,
+            file_model.File.path.in_([str(f) for f in folders])
+        )
+    }
+    mappings = []
+    for folder in folders:
+        if str(folder) not in existing and folder.is_dir():
+            mapping = describe_folder(folder)
+            mapping["owner_id"] = owner_id
+            mappings.append(mapping)
+    if mappings:
+        db.bulk_insert_mappings(file_model.File, mappings)
+
+
+def reconcile_catalog(db: Session, username: str, owner_id: int, stage: Optional[str] = None) -> Dict[str, int]:
+    """
+    同步磁盘与目录索引
+
+    遍历 data/{username}/[{stage}]，为新文件插入记录、为大小或修改时间变化的文件更新记录、
+    删除磁盘上已不存在的记录。在单个事务中完成。
+
+    Returns:
+        新增 / 更新 / 删除的记录数
+    """
+    user_dir = Path(settings.upload_base_dir) / username
+    stages = [stage] if stage else sorted(settings.valid_stages)
+
+    on_disk: Dict[str, Tuple[bool, os.stat_result]] = {}
+    for stage_name in stages:
+        stage_dir = user_dir / stage_name
+        if not stage_dir.is_dir():
+            continue
+        for entry in os.scandir(stage_dir):
+            try:
+                if entry.is_dir():
+                    on_disk[entry.path] = (True, entry.stat())
+                    # 文件夹内的一级文件
+                    for child in os.scandir(entry.path):
+                        if child.is_file() and not child.name.endswith(PARTIAL_SUFFIX):
+                            on_disk[child.path] = (False, child.stat())
+                elif entry.is_file() and not entry.name.endswith(PARTIAL_SUFFIX):
+                    on_disk[entry.path] = (False, entry.stat())
+            except OSError:
+                continue
+
+    query = db.query(file_model.File).filter(file_model.File.owner_id == owner_id)
+    prefixes = [os.path.join(str(user_dir / stage_name), "") for stage_name in stages]
+    records = [
+        record for record in query.filter(
+            file_model.File.path.startswith(os.path.join(str(user_dir), ""), autoescape=True)
+        )
+        if any(record.path.startswith(prefix) for prefix in prefixes)
+    ]
+
+    added = updated = removed = 0
+    seen: Set[str] = set()
+    for record in records:
+        disk = on_disk.get(record.path)
+        if disk is None and os.path.exists(record.path):
+            # 更深层级的文件不在遍历范围内，保持原样
+            continue
+        if disk is None or record.path in seen:
+            db.delete(record)
+            removed += 1
+            continue
+        seen.add(record.path)
+        is_dir, stat = disk
+        if record.stage is None or record.size is None or record.mtime != stat.st_mtime or (
+                not is_dir and record.size != stat.st_size):
+            values = describe_folder(Path(record.path), stat) if is_dir else describe_file(Path(record.path), stat)
+            for key, value in values.items():
+                setattr(record, key, value)
+            updated += 1
+
+    mappings = []
+    for path, (is_dir, stat) in on_disk.items():
+        if path in seen:
+            continue
+        mapping = describe_folder(Path(path), stat) if is_dir else describe_file(Path(path), stat)
+        mapping["owner_id"] = owner_id
+        mappings.append(mapping)
+    if mappings:
+        db.bulk_insert_mappings(file_model.File, mappings)
+        added = len(mappings)
+
+    db.commit()
+    logger.info(f"目录索引同步完成 ({username}): 新增 {added}, 更新 {updated}, 删除 {removed}")
+    return {"added": added, "updated": updated, "removed": removed}
+
+
+def has_catalog(db: Session, owner_id: int, stage: str) -> bool:
+    """该用户该阶段是否已建立目录索引"""
+    return db.query(file_model.File.id).filter(
+        file_model.File.owner_id == owner_id,
+        file_model.File.stage == stage
+    ).first() is not None
+
+
+def list_catalog(
+    db: Session,
+    owner_id: int,
+    stage: str,
+    page: int = 1,
+    page_size: Optional[int] = None
+) -> Dict[str, Any]:
+    """
+    从目录索引中分页读取 stage 顶层的文件夹和文件
+
+    文件夹在前、文件在后，按名称排序；只为当前页的文件夹统计图片数量，
+    查询均命中 (owner_id, stage, folder, ...) 复合索引。
+    """
+    File = file_model.File
+    top_level = db.query(File).filter(File.owner_id == owner_id, File.stage == stage, File.folder == "")
+
+    total_folders = top_level.filter(File.category == FOLDER_CATEGORY).count()
+    total_files = top_level.filter(File.category != FOLDER_CATEGORY).count()
+
+    ordered = top_level.order_by(case((File.category == FOLDER_CATEGORY, 0), else_=1), File.name)
+    if page_size:
+        ordered = ordered.offset((page - 1) * page_size).limit(page_size)
+    rows: List[file_model.File] = ordered.all()
+
+    folder_names = [row.name for row in rows if row.category == FOLDER_CATEGORY]
+    image_counts: Dict[str, int] = {}
+    if folder_names:
+        image_counts = dict(
+            db.query(File.folder, func.count(File.id))
+            .filter(
+                File.owner_id == owner_id,
+                File.stage == stage,
+                File.folder.in_(folder_names),
+                File.category == "image"
+            )
+            .group_by(File.folder)
+            .all()
+        )
+
+    return {
+        "rows": rows,
+        "image_counts": image_counts,
+        "total_files": total_files,
+        "total_folders": total_folders
+    }
+
+
+def request_reconcile(db: Session, owner_id: int, username: str, stage: Optional[str] = None) -> Optional[job_model.Job]:
+    """
+    将目录索引同步加入后台任务队列
+
+    已有排队中的同步任务覆盖同一 stage（或全部 stage）时不重复创建。
+    """
+    pending = db.query(job_model.Job).filter_by(
+        owner_id=owner_id, job_type=CATALOG_RECONCILE_JOB, status="pending"
+    ).all()
+    for job in pending:
+        pending_stage = json.loads(job.payload).get("stage")
+        if pending_stage is None or pending_stage == stage:
+            return job
+    return job_queue.enqueue(
+        db=db,
+        job_type=CATALOG_RECONCILE_JOB,
+        payload={"owner_id": owner_id, "username": username, "stage": stage},
+        owner_id=owner_id
+    )
+
+
+def _stage_signature(stage_dir: Path) -> Optional[Tuple]:
+    """
+    stage 目录及其一级文件夹的 mtime，覆盖 reconcile_catalog 遍历的范围
+
+    在已有文件夹中新增或删除文件只改变该文件夹的 mtime，因此需要逐个记录。
+    任一 mtime 过新时返回 None，表示签名尚不可信。
+    """
+    stat = stage_dir.stat()
+    mtimes = [("", stat.st_mtime_ns)]
+    with os.scandir(stage_dir) as it:
+        for entry in it:
+            try:
+                if entry.is_dir():
+                    mtimes.append((entry.name, entry.stat().st_mtime_ns))
+            except OSError:
+                continue
+    if time.time() - max(mtime for _, mtime in mtimes) / 1e9 < MTIME_SETTLE_SECONDS:
+        return None
+    return tuple(sorted(mtimes))
+
+
+def refresh_catalog(owner_id: int, username: str, stage: str) -> None:
+    """
+    保证目录索引可用于查询
+
+    首次查询时同步建立索引；之后若 stage 目录或其一级文件夹的 mtime 相比上次同步发生变化
+    （例如 COLMAP、抽帧等外部流程直接写入了文件），同样就地同步，本次查询即可看到新文件，
+    不必排在同一用户正在运行的视频等任务之后。
+    文件被原地改写不会改变目录 mtime，因此距上次同步超过 catalog_reconcile_interval 时
+    （或签名尚不可信时）在后台安排一次同步。
+    通过 API 上传的文件在写入时已经入库，不依赖这里的同步。
+    需要遍历磁盘，使用独立的同步会话，由调用方放在线程池中执行。
+    """
+    stage_dir = Path(settings.upload_base_dir) / username / stage
+    try:
+        signature = _stage_signature(stage_dir)
+    except OSError:
+        return
+
+    key = (owner_id, stage)
+    now = time.monotonic()
+    with _stage_signatures_lock:
+        previous = _stage_signatures.get(key)
+        if (previous is not None and signature is not None and previous[0] == signature
+                and now - previous[1] < settings.catalog_reconcile_interval):
+            return
+        _stage_signatures[key] = (signature, now)
+    changed = previous is not None and signature is not None and previous[0] != signature
+    db = SessionLocal()
+    try:
+        if changed or not has_catalog(db, owner_id, stage):
+            reconcile_catalog(db, username, owner_id, stage)
+        else:
+            request_reconcile(db, owner_id, username, stage)
+    finally:
+        db.close()
+
+
+@job_queue.register(CATALOG_RECONCILE_JOB)
+async def _reconcile_job(payload: Dict[str, Any], report_progress) -> Dict[str, int]:
+    def run() -> Dict[str, int]:
+        db = SessionLocal()
+        try:
+            return reconcile_catalog(db, payload["username"], payload["owner_id"], payload.get("stage"))
+        finally:
+            db.close()
+    return await run_in_threadpool(run)
@@ -1,14 +1,98 @@
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
+from fastapi.concurrency import run_in_threadpool
+from typing import List, Tuple, Dict, Any, Set
+from pathlib import Path
 from ..models import file_model
+from ..services import catalog_service
 import shutil, os
 
+def _catalog_fields(path: str) -> Dict[str, Any]:
+    """文件已写入磁盘时补充目录索引字段"""
+    try:
+        fields = catalog_service.describe_file(Path(path))
+    except OSError:
+        return {}
+    fields.pop("name")
+    fields.pop("path")
+    return fields
+
 def create_file_record(db: Session, filename: str, path: str, owner_id: int):
-    file = file_model.File(name=filename, path=path, owner_id=owner_id)
+    file = file_model.File(name=filename, path=path, owner_id=owner_id, **_catalog_fields(path))
+    catalog_service.ensure_folder_records(db, owner_id, [path])
     db.add(file)
     db.commit()
     db.refresh(file)
     return file
 
+def build_file_mappings(files: List[Tuple[str, str]], owner_id: int) -> List[Dict[str, Any]]:
+    """为 (文件名, 路径) 列表生成待插入的记录（读取文件元数据，不访问数据库）"""
+    return [
+        {"name": filename, "path": path, "owner_id": owner_id, **_catalog_fields(path)}
+        for filename, path in files
+    ]
+
+def insert_file_mappings(
+    db: Session,
+    mappings: List[Dict[str, Any]],
+    return_ids: bool = True
+) -> List[Dict[str, Any]]:
+    """在单个事务中批量插入 build_file_mappings 生成的记录"""
+    if not mappings:
+        return []
+    try:
+        catalog_service.ensure_folder_records(db, mappings[0]["owner_id"], [m["path"] for m in mappings])
+        db.bulk_insert_mappings(file_model.File, mappings, return_defaults=return_ids)
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    return mappings
+
+def create_file_records(
+    db: Session,
+    files: List[Tuple[str, str]],
+    owner_id: int,
+    return_ids: bool = True
+) -> List[Dict[str, Any]]:
+    """
+    在单个事务中批量创建文件记录
+
+    Args:
+        db: 数据库会话
+        files: (文件名, 路径) 列表
+        owner_id: 所有者ID
+        return_ids: 是否回填自增ID（不需要ID时关闭可以走 executemany 快速路径）
+
+    Returns:
+        记录字典列表，包含 name / path / owner_id（以及 id）
+    """
+    return insert_file_mappings(db, build_file_mappings(files, owner_id), return_ids=return_ids)
+
+async def create_file_records_async(
+    db: AsyncSession,
+    files: List[Tuple[str, str]],
+    owner_id: int,
+    return_ids: bool = True
+) -> List[Dict[str, Any]]:
+    """
+    create_file_records 的异步版本
+
+    读取文件元数据放在线程池中，插入通过异步会话执行，均不阻塞事件循环。
+    """
+    mappings = await run_in_threadpool(build_file_mappings, files, owner_id)
+    return await db.run_sync(insert_file_mappings, mappings, return_ids)
+
+def get_file_paths_in_folder(db: Session, owner_id: int, folder: str) -> Set[str]:
+    """获取某个文件夹下已有记录的文件路径"""
+    prefix = os.path.join(folder, "")
+    rows = (
+        db.query(file_model.File.path)
+        .filter(file_model.File.owner_id == owner_id, file_model.File.path.startswith(prefix, autoescape=True))
+        .all()
+    )
+    return {path for (path,) in rows}
+
 def delete_file(db: Session, file_id: int):
     file = db.query(file_model.File).filter_by(id=file_id).first()
     if not file:
@@ -0,0 +1,391 @@
+from typing import Dict, List, Optional, Tuple, Type, Union
+from pathlib import Path
+from dataclasses import dataclass
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from collections import deque
+import multiprocessing
+import threading
+import time
+import os
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+try:
+    import cv2
+    CV2_AVAILABLE = True
+except ImportError:
+    CV2_AVAILABLE = False
+
+# 精确 seek 落在目标之后时，每次回退的源帧数（此后翻倍）
+SEEK_BACKOFF_FRAMES = 300
+
+# 先在本进程中提取开头的这些源帧，测出每帧的实际耗时，再决定是否切分
+PROBE_FRAMES = 120
+
+# 每段的解码工作量至少是该段固定开销（打开视频、seek）的这么多倍才切分，即开销不超过约 1/4
+MIN_WORK_RATIO = 4.0
+
+# 首次并行时创建进程池的耗时估计（spawn 解释器并导入 cv2），只在进程池尚未创建时计入
+POOL_START_SECONDS = 0.5
+
+# 所有抽帧任务共享的解码进程池，同时运行多个任务时进程总数仍不超过池大小
+_process_pool: Optional[ProcessPoolExecutor] = None
+_process_pool_lock = threading.Lock()
+
+
+class FrameEncoder:
+    """帧编码器基类，子类决定输出格式和编码参数"""
+    extension = ".jpg"
+
+    def encode(self, frame, path: str) -> bool:
+        raise NotImplementedError
+
+
+class JpegEncoder(FrameEncoder):
+    """JPEG 编码器"""
+    extension = ".jpg"
+
+    def __init__(self, quality: int = 95):
+        self.quality = quality
+
+    def encode(self, frame, path: str) -> bool:
+        return cv2.imwrite(path, frame, [cv2.IMWRITE_JPEG_QUALITY, self.quality])
+
+
+class PngEncoder(FrameEncoder):
+    """PNG 编码器（无损，体积较大）"""
+    extension = ".png"
+
+    def __init__(self, compression: int = 3):
+        self.compression = compression
+
+    def encode(self, frame, path: str) -> bool:
+        return cv2.imwrite(path, frame, [cv2.IMWRITE_PNG_COMPRESSION, self.compression])
+
+
+# 可用的编码器，按名称选择
+FRAME_ENCODERS: Dict[str, Type[FrameEncoder]] = {
+    "jpg": JpegEncoder,
+    "jpeg": JpegEncoder,
+    "png": PngEncoder,
+}
+
+
+def get_frame_encoder(encoder: Union[str, FrameEncoder, None]) -> FrameEncoder:
+    """根据名称或实例获取编码器，默认 JPEG"""
+    if encoder is None:
+        return JpegEncoder()
+    if isinstance(encoder, FrameEncoder):
+        return encoder
+    encoder_cls = FRAME_ENCODERS.get(encoder.lower())
+    if encoder_cls is None:
+        raise ValueError(f"不支持的帧编码器: {encoder}")
+    return encoder_cls()
+
+
+@dataclass
+class FrameExtractionStats:
+    """帧提取统计信息"""
+    saved_frames: int
+    total_frames: int
+    frame_interval: int
+    segments: int
+    elapsed: float
+
+    @property
+    def frames_per_second(self) -> float:
+        return self.saved_frames / self.elapsed if self.elapsed > 0 else 0.0
+
+
+def _frame_filename(index: int, encoder: FrameEncoder) -> str:
+    return f"frame_{index:06d}{encoder.extension}"
+
+
+def _init_worker() -> None:
+    # 并行度由进程池和编码线程决定，关闭 OpenCV 自身的线程池避免超额订阅
+    cv2.setNumThreads(1)
+
+
+def _get_process_pool(workers: int) -> ProcessPoolExecutor:
+    """获取共享进程池，首次调用时按 workers 创建"""
+    global _process_pool
+    with _process_pool_lock:
+        if _process_pool is None:
+            # 使用 spawn 避免在多线程的服务进程中 fork
+            ctx = multiprocessing.get_context("spawn")
+            _process_pool = ProcessPoolExecutor(max_workers=workers, mp_context=ctx, initializer=_init_worker)
+        return _process_pool
+
+
+def _discard_process_pool(pool: ProcessPoolExecutor) -> None:
+    """子进程异常退出后进程池不可再用，丢弃后下次重新创建"""
+    global _process_pool
+    with _process_pool_lock:
+        if _process_pool is pool:
+            _process_pool = None
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+def shutdown_process_pool() -> None:
+    """关闭共享进程池（服务停止时调用）"""
+    global _process_pool
+    with _process_pool_lock:
+        pool, _process_pool = _process_pool, None
+    if pool is not None:
+        pool.shutdown(wait=True, cancel_futures=True)
+
+
+def _seek_exact(video, target: int) -> None:
+    """
+    定位到第 target 帧，使下一次 grab() 读到的正是该帧
+
+    多数编码格式下按帧号 seek 只能落到附近的关键帧，实际位置可能在目标之前或之后。
+    落在之后时从更早的位置重新 seek，然后逐帧 grab() 前进到目标帧。
+    """
+    back = 0
+    while True:
+        position = max(0, target - back)
+        video.set(cv2.CAP_PROP_POS_FRAMES, position)
+        current = int(video.get(cv2.CAP_PROP_POS_FRAMES))
+        if 0 <= current <= target:
+            break
+        if position == 0:
+            raise RuntimeError(f"无法定位到第 {target} 帧")
+        back = max(2 * back, SEEK_BACKOFF_FRAMES)
+    while current < target:
+        if not video.grab():
+            raise RuntimeError(f"无法定位到第 {target} 帧")
+        current += 1
+
+
+def _open_video(video_path: str):
+    video = cv2.VideoCapture(video_path)
+    if not video.isOpened():
+        raise RuntimeError(f"无法打开视频文件: {video_path}")
+    return video
+
+
+def _extract_range(
+    video,
+    output_folder: str,
+    start: int,
+    end: Optional[int],
+    frame_interval: int,
+    encoder: FrameEncoder,
+    encode_workers: int
+) -> Tuple[int, int]:
+    """
+    从已定位到第 start 帧的 video 中提取 [start, end) 范围内需要保留的帧
+
+    start 总是 frame_interval 的整数倍，因此第 i 个源帧对应的输出编号
+    就是 i // frame_interval，各段之间无需协调即可得到连续的文件名。
+    不需要的帧只 grab() 不解码，需要的帧才 retrieve()。
+    返回 (保存的帧数, 读到的位置)，读到视频结尾时位置小于 end。
+    """
+    saved = 0
+    with ThreadPoolExecutor(max_workers=encode_workers) as pool:
+        # 限制排队中的帧数，避免编码跟不上解码时帧堆积在内存里
+        pending = deque()
+        frame_idx = start
+        while end is None or frame_idx < end:
+            if not video.grab():
+                break
+            if frame_idx % frame_interval == 0:
+                ret, frame = video.retrieve()
+                if not ret:
+                    break
+                frame_path = os.path.join(output_folder, _frame_filename(frame_idx // frame_interval, encoder))
+                pending.append(pool.submit(encoder.encode, frame, frame_path))
+                if len(pending) > 2 * encode_workers:
+                    saved += bool(pending.popleft().result())
+            frame_idx += 1
+
+        while pending:
+            saved += bool(pending.popleft().result())
+    return saved, frame_idx
+
+
+def _extract_segment(
+    video_path: str,
+    output_folder: str,
+    start: int,
+    end: Optional[int],
+    frame_interval: int,
+    encoder: FrameEncoder,
+    encode_workers: int
+) -> int:
+    """提取 [start, end) 范围内需要保留的帧（在子进程中运行）"""
+    video = _open_video(video_path)
+    try:
+        if start > 0:
+            _seek_exact(video, start)
+        return _extract_range(video, output_folder, start, end, frame_interval, encoder, encode_workers)[0]
+    finally:
+        video.release()
+
+
+def _measure_segment_cost(video_path: str, target: int) -> float:
+    """新开一段的固定开销：打开视频并精确 seek 到 target，与编码格式和关键帧间隔有关"""
+    start_time = time.perf_counter()
+    video = _open_video(video_path)
+    try:
+        _seek_exact(video, target)
+    finally:
+        video.release()
+    return time.perf_counter() - start_time
+
+
+def _plan_segments(
+    start: int,
+    total_frames: int,
+    frame_interval: int,
+    workers: int,
+    frame_cost: float,
+    segment_cost: float
+) -> List[Tuple[int, Optional[int]]]:
+    """
+    把 [start, 视频结尾) 按时间范围切成若干段，段起点对齐到 frame_interval
+
+    frame_cost 为实测的每个源帧耗时，segment_cost 为每段的固定开销。
+    只有每段的工作量不少于 MIN_WORK_RATIO 倍的固定开销时才切分，否则返回整段。
+    """
+    remaining = total_frames - start
+    if remaining <= 0 or workers <= 1:
+        return [(start, None)]
+    min_work = MIN_WORK_RATIO * segment_cost
+    num_segments = workers if min_work <= 0 else min(workers, int(remaining * frame_cost / min_work))
+    if num_segments <= 1:
+        return [(start, None)]
+
+    seg_len = -(-remaining // num_segments)
+    seg_len = -(-seg_len // frame_interval) * frame_interval
+
+    segments = []
+    while start < total_frames:
+        end = start + seg_len
+        # 最后一段读到视频结束，防止帧数元数据偏小时漏帧
+        segments.append((start, end if end < total_frames else None))
+        start = end
+    return segments
+
+
+def _usable_cpus() -> int:
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+def probe_video(video_path: Union[str, Path]) -> Tuple[float, int]:
+    """读取视频的帧率和总帧数"""
+    if not CV2_AVAILABLE:
+        raise RuntimeError("OpenCV未安装，无法提取视频帧")
+    video = cv2.VideoCapture(str(video_path))
+    if not video.isOpened():
+        raise RuntimeError(f"无法打开视频文件: {Path(video_path).name}")
+    try:
+        return video.get(cv2.CAP_PROP_FPS), int(video.get(cv2.CAP_PROP_FRAME_COUNT))
+    finally:
+        video.release()
+
+
+def compute_frame_interval(fps: float, extract_all_frames: bool, frame_rate: int) -> int:
+    """根据抽帧参数计算源帧间隔"""
+    if extract_all_frames:
+        return 1
+    return max(1, int(fps / frame_rate))
+
+
+def extract_frames(
+    video_path: Union[str, Path],
+    output_folder: Union[str, Path],
+    extract_all_frames: bool = False,
+    frame_rate: int = 5,
+    encoder: Union[str, FrameEncoder, None] = None,
+    workers: Optional[int] = None,
+    encode_workers: int = 4
+) -> FrameExtractionStats:
+    """
+    并行提取视频帧
+
+    Args:
+        video_path: 视频文件路径
+        output_folder: 输出文件夹路径
+        extract_all_frames: 是否提取所有帧
+        frame_rate: 每秒提取的帧数（当extract_all_frames为False时使用）
+        encoder: 帧编码器名称（jpg/png）或 FrameEncoder 实例
+        workers: 最多使用的解码进程数，默认且不超过本进程可用的 CPU 核数；各次调用共享同一个进程池，
+            池大小由首次并行调用决定。是否切分、切成几段由实测耗时决定，见 _plan_segments
+        encode_workers: 每个进程内用于编码写盘的线程数
+
+    Returns:
+        FrameExtractionStats
+    """
+    if not CV2_AVAILABLE:
+        raise RuntimeError("OpenCV未安装，无法提取视频帧")
+
+    encoder = get_frame_encoder(encoder)
+    video_path = str(video_path)
+    output_folder = str(output_folder)
+    os.makedirs(output_folder, exist_ok=True)
+
+    fps, total_frames = probe_video(video_path)
+    frame_interval = compute_frame_interval(fps, extract_all_frames, frame_rate)
+
+    # 解码受 CPU 限制，进程数超过可用核数只会互相争抢
+    workers = min(workers or _usable_cpus(), _usable_cpus())
+    start_time = time.perf_counter()
+    video = _open_video(video_path)
+    try:
+        if workers <= 1 or total_frames <= 0:
+            saved, _ = _extract_range(video, output_folder, 0, None, frame_interval, encoder, encode_workers)
+            segments = [(0, None)]
+        else:
+            # 开头一小段在本进程中提取，同时测出每个源帧的耗时
+            probe_end = min(-(-PROBE_FRAMES // frame_interval) * frame_interval, total_frames)
+            saved, position = _extract_range(video, output_folder, 0, probe_end, frame_interval, encoder, encode_workers)
+            frame_cost = (time.perf_counter() - start_time) / max(position, 1)
+            segments = [(position, None)]
+            if position == probe_end < total_frames:
+                segment_cost = _measure_segment_cost(video_path, (probe_end + total_frames) // 2)
+                if _process_pool is None:
+                    segment_cost += POOL_START_SECONDS
+                segments = _plan_segments(probe_end, total_frames, frame_interval, workers, frame_cost, segment_cost)
+                logger.info(f"每帧耗时 {frame_cost * 1000:.2f}ms，每段开销 {segment_cost * 1000:.0f}ms，"
+                            f"剩余 {total_frames - probe_end} 帧分为 {len(segments)} 段")
+            if len(segments) == 1:
+                # 不切分时沿用已打开的视频继续读，无需再次 seek
+                saved += _extract_range(video, output_folder, position, None, frame_interval, encoder, encode_workers)[0]
+    finally:
+        video.release()
+    logger.info(f"视频信息 - FPS: {fps}, 总帧数: {total_frames}, 分段数: {len(segments)}")
+
+    if len(segments) > 1:
+        pool = _get_process_pool(workers)
+        futures = [
+            pool.submit(_extract_segment, video_path, output_folder, start, end,
+                        frame_interval, encoder, encode_workers)
+            for start, end in segments
+        ]
+        try:
+            saved += sum(future.result() for future in futures)
+        except BrokenProcessPool:
+            _discard_process_pool(pool)
+            raise
+        finally:
+            for future in futures:
+                future.cancel()
+    elapsed = time.perf_counter() - start_time
+
+    stats = FrameExtractionStats(
+        saved_frames=saved,
+        total_frames=total_frames,
+        frame_interval=frame_interval,
+        segments=len(segments),
+        elapsed=elapsed
+    )
+    logger.info(f"成功提取 {saved} 帧，耗时 {elapsed:.2f}s ({stats.frames_per_second:.1f} 帧/秒)")
+    return stats
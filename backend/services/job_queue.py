@@ -0,0 +1,288 @@
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+from collections import Counter
+from sqlalchemy.orm import Session
+import asyncio
+import json
+import time
+import uuid
+
+import logging
+
+from ..core.config import settings
+from ..database import SessionLocal
+from ..models import job_model
+
+logger = logging.getLogger(__name__)
+
+# 任务处理函数: async handler(payload, report_progress) -> result
+ProgressReporter = Callable[[float], None]
+JobHandler = Callable[[Dict[str, Any], ProgressReporter], Awaitable[Optional[Dict[str, Any]]]]
+
+
+class JobQueue:
+    """
+    本地后台任务队列
+
+    任务持久化在 SQLite 的 jobs 表中，由运行在事件循环上的调度协程按创建顺序派发，
+    CPU 密集的部分由各处理函数交给线程池/进程池执行。
+    同时运行的任务总数和单个用户的任务数都受配置限制。
+    所有数据库读写都在线程池中执行，不阻塞事件循环上的请求处理；
+    进度上报会合并，同一任务同时最多只有一次进度写入。
+    处理函数抛出异常时任务回到 pending，按 job_retry_delay 指数退避后重试，
+    共执行 job_max_attempts 次仍失败才标记为 failed。
+    服务重启时，上次处于 running 状态的任务会被重置为 pending 并重新执行，
+    因此处理函数需要是幂等的。
+    """
+
+    def __init__(self):
+        self._handlers: Dict[str, JobHandler] = {}
+        self._running: Dict[str, asyncio.Task] = {}
+        self._running_owner: Dict[str, int] = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._dispatcher: Optional[asyncio.Task] = None
+        # job_id -> 最早可重试的时间（time.monotonic）
+        self._retry_after: Dict[str, float] = {}
+        # job_id -> 尚未写入数据库的最新进度
+        self._pending_progress: Dict[str, float] = {}
+
+    def register(self, job_type: str):
+        """注册任务类型的处理函数"""
+        def decorator(handler: JobHandler) -> JobHandler:
+            self._handlers[job_type] = handler
+            return handler
+        return decorator
+
+    # ---------- 生命周期 ----------
+
+    async def start(self) -> None:
+        """启动调度协程，并恢复上次未完成的任务"""
+        if self._dispatcher is not None:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._wakeup = asyncio.Event()
+        recovered = await asyncio.to_thread(self._recover_running_jobs)
+        if recovered:
+            logger.info(f"恢复 {recovered} 个未完成的任务")
+        self._dispatcher = asyncio.create_task(self._dispatch_loop())
+
+    async def stop(self) -> None:
+        """停止调度；运行中的任务保持 running 状态，下次启动时恢复"""
+        tasks = list(self._running.values())
+        if self._dispatcher is not None:
+            tasks.append(self._dispatcher)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._dispatcher = None
+
+    def _recover_running_jobs(self) -> int:
+        db = SessionLocal()
+        try:
+            jobs = db.query(job_model.Job).filter(job_model.Job.status == "running").all()
+            for job in jobs:
+                job.status = "pending"
+            db.commit()
+            return len(jobs)
+        finally:
+            db.close()
+
+    # ---------- 入队与查询 ----------
+
+    def enqueue(self, db: Session, job_type: str, payload: Dict[str, Any], owner_id: int) -> job_model.Job:
+        """
+        创建任务并唤醒调度器
+
+        Args:
+            db: 数据库会话
+            job_type: 任务类型，需已注册处理函数
+            payload: 任务参数（需可 JSON 序列化）
+            owner_id: 所属用户ID
+
+        Returns:
+            新建的任务记录
+        """
+        if job_type not in self._handlers:
+            raise ValueError(f"未知的任务类型: {job_type}")
+        job = job_model.Job(
+            id=uuid.uuid4().hex,
+            job_type=job_type,
+            status="pending",
+            progress=0.0,
+            attempts=0,
+            payload=json.dumps(payload),
+            owner_id=owner_id
+        )
+        db.add(job)
+        db.commit()
+        db.refresh(job)
+        self._notify()
+        return job
+
+    def get_job(self, db: Session, job_id: str, owner_id: int) -> Optional[job_model.Job]:
+        return db.query(job_model.Job).filter_by(id=job_id, owner_id=owner_id).first()
+
+    def list_jobs(self, db: Session, owner_id: int, status: Optional[str] = None, limit: int = 50) -> List[job_model.Job]:
+        query = db.query(job_model.Job).filter_by(owner_id=owner_id)
+        if status:
+            query = query.filter_by(status=status)
+        return query.order_by(job_model.Job.created_at.desc()).limit(limit).all()
+
+    @staticmethod
+    def to_dict(job: job_model.Job) -> Dict[str, Any]:
+        return {
+            "id": job.id,
+            "job_type": job.job_type,
+            "status": job.status,
+            "progress": job.progress,
+            "attempts": job.attempts,
+            "result": json.loads(job.result) if job.result else None,
+            "error": job.error,
+            "created_at": job.created_at.isoformat() if job.created_at else None,
+            "updated_at": job.updated_at.isoformat() if job.updated_at else None
+        }
+
+    # ---------- 调度 ----------
+
+    def _notify(self) -> None:
+        if self._loop is not None and self._wakeup is not None:
+            self._loop.call_soon_threadsafe(self._wakeup.set)
+
+    async def _dispatch_loop(self) -> None:
+        while True:
+            self._wakeup.clear()
+            try:
+                await self._dispatch_pending()
+            except Exception as e:
+                logger.error(f"任务调度失败: {str(e)}")
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=settings.job_poll_interval)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _dispatch_pending(self) -> None:
+        free_slots = settings.job_max_workers - len(self._running)
+        if free_slots <= 0:
+            return
+
+        now = time.monotonic()
+        waiting = {job_id for job_id, after in self._retry_after.items() if after > now}
+        claimed = await asyncio.to_thread(
+            self._claim_pending, free_slots, Counter(self._running_owner.values()), waiting
+        )
+        for job_id, job_type, payload, owner_id, attempts in claimed:
+            self._retry_after.pop(job_id, None)
+            self._running_owner[job_id] = owner_id
+            self._running[job_id] = asyncio.create_task(self._run(job_id, job_type, payload, attempts))
+
+    def _claim_pending(
+        self,
+        free_slots: int,
+        per_owner: Counter,
+        waiting: set
+    ) -> List[Tuple[str, str, Dict[str, Any], int, int]]:
+        """在线程池中执行：按创建顺序挑选可运行的任务并标记为 running"""
+        claimed = []
+        db = SessionLocal()
+        try:
+            pending = (
+                db.query(job_model.Job)
+                .filter(job_model.Job.status == "pending")
+                .order_by(job_model.Job.created_at)
+                .all()
+            )
+            for job in pending:
+                if free_slots <= 0:
+                    break
+                if job.id in waiting or per_owner[job.owner_id] >= settings.job_max_per_user:
+                    continue
+                if job.job_type not in self._handlers:
+                    job.status = "failed"
+                    job.error = f"未知的任务类型: {job.job_type}"
+                    continue
+                if job.attempts >= settings.job_max_attempts:
+                    job.status = "failed"
+                    job.error = job.error or "超过最大重试次数"
+                    continue
+
+                job.status = "running"
+                job.attempts += 1
+                per_owner[job.owner_id] += 1
+                free_slots -= 1
+                claimed.append((job.id, job.job_type, json.loads(job.payload), job.owner_id, job.attempts))
+            db.commit()
+            return claimed
+        finally:
+            db.close()
+
+    async def _run(self, job_id: str, job_type: str, payload: Dict[str, Any], attempts: int) -> None:
+        handler = self._handlers[job_type]
+        try:
+            result = await handler(payload, lambda progress: self._report_progress(job_id, progress))
+            await asyncio.to_thread(self._finish, job_id, "completed", result=result)
+        except asyncio.CancelledError:
+            # 服务停止：保持 running 状态，下次启动时恢复
+            raise
+        except Exception as e:
+            if attempts < settings.job_max_attempts:
+                delay = settings.job_retry_delay * 2 ** (attempts - 1)
+                logger.warning(f"任务 {job_id} ({job_type}) 第 {attempts} 次执行失败，{delay:.0f} 秒后重试: {str(e)}")
+                self._retry_after[job_id] = time.monotonic() + delay
+                await asyncio.to_thread(self._finish, job_id, "pending", error=str(e))
+            else:
+                logger.error(f"任务 {job_id} ({job_type}) 失败: {str(e)}")
+                await asyncio.to_thread(self._finish, job_id, "failed", error=str(e))
+        finally:
+            self._running.pop(job_id, None)
+            self._running_owner.pop(job_id, None)
+            if self._wakeup is not None:
+                self._wakeup.set()
+
+    def _report_progress(self, job_id: str, progress: float) -> None:
+        """处理函数的进度回调：只记录最新值，由后台协程在线程池中写入（可在任意线程调用）"""
+        self._loop.call_soon_threadsafe(self._queue_progress, job_id, progress)
+
+    def _queue_progress(self, job_id: str, progress: float) -> None:
+        writing = job_id in self._pending_progress
+        self._pending_progress[job_id] = progress
+        if not writing:
+            asyncio.ensure_future(self._write_progress(job_id))
+
+    async def _write_progress(self, job_id: str) -> None:
+        while job_id in self._pending_progress:
+            progress = self._pending_progress[job_id]
+            try:
+                await asyncio.to_thread(self.update_progress, job_id, progress)
+            except Exception as e:
+                logger.warning(f"任务 {job_id} 进度更新失败: {str(e)}")
+            if self._pending_progress.get(job_id) == progress:
+                del self._pending_progress[job_id]
+
+    def update_progress(self, job_id: str, progress: float) -> None:
+        """更新运行中任务的进度（0~1）"""
+        db = SessionLocal()
+        try:
+            db.query(job_model.Job).filter_by(id=job_id, status="running").update(
+                {"progress": max(0.0, min(1.0, progress))}
+            )
+            db.commit()
+        finally:
+            db.close()
+
+    def _finish(self, job_id: str, status: str, result: Optional[Dict[str, Any]] = None, error: Optional[str] = None) -> None:
+        db = SessionLocal()
+        try:
+            values = {"status": status, "error": error}
+            if status == "pending":
+                values["progress"] = 0.0
+            if status == "completed":
+                values["progress"] = 1.0
+                values["result"] = json.dumps(result) if result is not None else None
+            db.query(job_model.Job).filter_by(id=job_id).update(values)
+            db.commit()
+        finally:
+            db.close()
+
+
+# 创建全局实例
+job_queue = JobQueue()
@@ -0,0 +1,422 @@
+from typing import Dict, Any, Optional
+from pathlib import Path
+from contextlib import contextmanager
+from fastapi import HTTPException
+from sqlalchemy.orm import Session
+import threading
+import hashlib
+import json
+import uuid
+import os
+
+import logging
+
+from ..core.config import settings
+from ..core.upload_config import UploadPolicyConfig
+from ..services import file_service
+from ..services.upload_service import upload_service
+
+logger = logging.getLogger(__name__)
+
+
+class ResumableUploadService:
+    """
+    可断点续传的分块上传服务
+
+    协议分为三步：
+        1. init: 声明文件名、总大小和块大小，服务端预分配 .part 文件并返回 upload_id
+        2. PUT chunk: 按偏移写入块，每个块以 sha256 记录在清单中，同一偏移重发相同内容时不再写盘
+           （这只让重传幂等，不做跨偏移或跨会话的块级去重）
+        3. finalize: 校验所有块已到齐后将 .part 文件原地重命名到目标目录（无额外拷贝）
+
+    会话状态持久化在 settings.upload_base_dir/.resumable/{upload_id}/manifest.json，
+    服务重启或连接中断后客户端可通过 status 查询缺失的块继续上传。
+    去重只针对整个文件：已完成文件按整体 sha256 建立索引，相同内容再次上传时直接硬链接，无需重新传输。
+
+    并发：每个上传会话各有一把锁，不同会话的块写入互不阻塞；整体 sha256 校验在锁外进行，
+    全局锁只保护去重索引的读改写。
+    """
+
+    MANIFEST_NAME = "manifest.json"
+    INDEX_NAME = "index.json"
+
+    def __init__(self):
+        self.session_root = Path(settings.upload_base_dir) / settings.resumable_dir_name
+        # upload_id -> [锁, 引用计数]，引用归零时删除，避免字典无限增长
+        self._session_locks: Dict[str, list] = {}
+        self._session_locks_guard = threading.Lock()
+        # 只保护 index.json 的读改写
+        self._index_lock = threading.Lock()
+        # 正在校验整体 sha256 的会话，期间拒绝写入新块
+        self._finalizing = set()
+
+    @contextmanager
+    def _session_lock(self, upload_id: str):
+        with self._session_locks_guard:
+            entry = self._session_locks.get(upload_id)
+            if entry is None:
+                entry = self._session_locks[upload_id] = [threading.Lock(), 0]
+            entry[1] += 1
+        try:
+            with entry[0]:
+                yield
+        finally:
+            with self._session_locks_guard:
+                entry[1] -= 1
+                if entry[1] == 0:
+                    del self._session_locks[upload_id]
+
+    # ---------- 会话存储 ----------
+
+    def _session_dir(self, upload_id: str) -> Path:
+        # upload_id 由服务端生成，只允许 uuid hex，防止路径穿越
+        if not upload_id or not all(c in "0123456789abcdef" for c in upload_id):
+            raise HTTPException(status_code=400, detail="无效的 upload_id")
+        return self.session_root / upload_id
+
+    def _load_manifest(self, upload_id: str) -> Dict[str, Any]:
+        manifest_path = self._session_dir(upload_id) / self.MANIFEST_NAME
+        if not manifest_path.exists():
+            raise HTTPException(status_code=404, detail=f"上传会话不存在: {upload_id}")
+        with open(manifest_path, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def _save_manifest(self, manifest: Dict[str, Any]) -> None:
+        manifest_path = self._session_dir(manifest["upload_id"]) / self.MANIFEST_NAME
+        tmp_path = manifest_path.with_suffix(".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(manifest, f)
+        os.replace(tmp_path, manifest_path)
+
+    def _load_index(self) -> Dict[str, Dict[str, Any]]:
+        index_path = self.session_root / self.INDEX_NAME
+        if not index_path.exists():
+            return {}
+        with open(index_path, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def _save_index(self, index: Dict[str, Dict[str, Any]]) -> None:
+        index_path = self.session_root / self.INDEX_NAME
+        tmp_path = index_path.with_suffix(".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(index, f)
+        os.replace(tmp_path, index_path)
+
+    @staticmethod
+    def _index_key(owner_id: int, file_sha256: str) -> str:
+        return f"{owner_id}:{file_sha256}"
+
+    @staticmethod
+    def _file_signature(path: Path) -> Optional[Dict[str, int]]:
+        """文件的 size/mtime_ns/inode，用于判断索引记录之后文件是否被改写"""
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None
+        return {"size": st.st_size, "mtime_ns": st.st_mtime_ns, "ino": st.st_ino}
+
+    def _lookup_index(self, key: str, total_size: int) -> Optional[Path]:
+        """
+        返回内容与索引一致的已有文件；文件已删除、被改写或大小不符时丢弃该记录
+        """
+        with self._index_lock:
+            index = self._load_index()
+            entry = index.get(key)
+            if entry is None:
+                return None
+            # 旧格式（仅路径）无法校验，按过期处理
+            if isinstance(entry, dict):
+                signature = self._file_signature(Path(entry["path"]))
+                if signature is not None and signature["size"] == total_size and all(
+                    entry.get(name) == value for name, value in signature.items()
+                ):
+                    return Path(entry["path"])
+            del index[key]
+            self._save_index(index)
+            return None
+
+    def _record_index(self, key: str, path: Path) -> None:
+        signature = self._file_signature(path)
+        if signature is None:
+            return
+        with self._index_lock:
+            index = self._load_index()
+            index[key] = {"path": str(path), **signature}
+            self._save_index(index)
+
+    def _check_owner(self, manifest: Dict[str, Any], owner_id: int) -> None:
+        if manifest["owner_id"] != owner_id:
+            raise HTTPException(status_code=403, detail="无权访问该上传会话")
+
+    @staticmethod
+    def _num_chunks(total_size: int, chunk_size: int) -> int:
+        return max(1, (total_size + chunk_size - 1) // chunk_size)
+
+    def _status(self, manifest: Dict[str, Any]) -> Dict[str, Any]:
+        num_chunks = self._num_chunks(manifest["total_size"], manifest["chunk_size"])
+        received = sorted(int(i) for i in manifest["chunks"])
+        missing = [i for i in range(num_chunks) if str(i) not in manifest["chunks"]]
+        return {
+            "upload_id": manifest["upload_id"],
+            "filename": manifest["filename"],
+            "total_size": manifest["total_size"],
+            "chunk_size": manifest["chunk_size"],
+            "num_chunks": num_chunks,
+            "received_chunks": received,
+            "missing_chunks": missing,
+            "received_bytes": manifest["received_bytes"],
+            "status": manifest["status"],
+            "path": manifest.get("path")
+        }
+
+    # ---------- 协议 ----------
+
+    def init_upload(
+        self,
+        filename: str,
+        total_size: int,
+        username: str,
+        owner_id: int,
+        chunk_size: Optional[int] = None,
+        stage: Optional[str] = None,
+        final_folder_name: Optional[str] = None,
+        file_sha256: Optional[str] = None,
+        db: Optional[Session] = None
+    ) -> Dict[str, Any]:
+        """
+        创建上传会话
+
+        Args:
+            filename: 文件名
+            total_size: 文件总字节数
+            username: 用户名
+            owner_id: 用户ID
+            chunk_size: 块大小，默认使用 settings.upload_chunk_size
+            stage: 上传阶段
+            final_folder_name: 目标文件夹
+            file_sha256: 整个文件的 sha256（可选，用于秒传和最终校验）
+            db: 数据库会话（秒传命中时用于创建文件记录）
+
+        Returns:
+            会话状态
+        """
+        filename = Path(filename or "").name
+        if not filename:
+            raise HTTPException(status_code=400, detail="文件名不能为空")
+        if total_size < 0 or total_size > settings.max_file_size:
+            raise HTTPException(
+                status_code=400,
+                detail=f"文件大小超过限制 ({settings.max_file_size // (1024*1024)}MB)"
+            )
+        chunk_size = chunk_size or settings.upload_chunk_size
+        if chunk_size <= 0 or chunk_size > settings.resumable_max_chunk_size:
+            raise HTTPException(status_code=400, detail=f"无效的块大小: {chunk_size}")
+
+        stage = UploadPolicyConfig.normalize_stage(stage or "images")
+        upload_path = upload_service._create_upload_path(username, stage, final_folder_name)
+        target_path = upload_path / filename
+
+        upload_id = uuid.uuid4().hex
+        session_dir = self._session_dir(upload_id)
+        session_dir.mkdir(parents=True, exist_ok=True)
+
+        manifest = {
+            "upload_id": upload_id,
+            "filename": filename,
+            "total_size": total_size,
+            "chunk_size": chunk_size,
+            "owner_id": owner_id,
+            "username": username,
+            "stage": stage,
+            "final_folder_name": final_folder_name,
+            "target_path": str(target_path),
+            "file_sha256": file_sha256.lower() if file_sha256 else None,
+            "chunks": {},
+            "received_bytes": 0,
+            "status": "uploading",
+            "path": None
+        }
+
+        # 相同内容的文件已上传过且之后未被改写：直接硬链接，无需再传
+        if manifest["file_sha256"] and self._link_existing(manifest, target_path):
+            num_chunks = self._num_chunks(total_size, chunk_size)
+            manifest["chunks"] = {str(i): None for i in range(num_chunks)}
+            manifest["received_bytes"] = total_size
+            self._complete(manifest, target_path, db)
+            logger.info(f"文件 {filename} 内容已存在，跳过上传")
+            return self._status(manifest)
+
+        # 预分配目标大小，后续各块按偏移直接写入
+        with open(session_dir / "data.part", "wb") as f:
+            f.truncate(total_size)
+        self._save_manifest(manifest)
+        logger.info(f"创建上传会话 {upload_id}: {filename} ({total_size} bytes)")
+        return self._status(manifest)
+
+    def _link_existing(self, manifest: Dict[str, Any], target_path: Path) -> bool:
+        key = self._index_key(manifest["owner_id"], manifest["file_sha256"])
+        existing = self._lookup_index(key, manifest["total_size"])
+        if existing is None:
+            return False
+        signature = self._file_signature(existing)
+        if existing.resolve() != target_path.resolve():
+            if target_path.exists():
+                target_path.unlink()
+            try:
+                os.link(existing, target_path)
+            except OSError:
+                return False
+        # 校验与链接之间文件可能被改写：链接后的 inode 必须仍与索引记录一致
+        if self._file_signature(target_path) != signature:
+            if existing.resolve() != target_path.resolve():
+                target_path.unlink()
+            return False
+        return True
+
+    @staticmethod
+    def _chunk_length(manifest: Dict[str, Any], offset: int) -> int:
+        """校验偏移并返回该位置的块应有的字节数"""
+        total_size = manifest["total_size"]
+        chunk_size = manifest["chunk_size"]
+        if offset < 0 or offset % chunk_size != 0 or offset >= max(total_size, 1):
+            raise HTTPException(status_code=400, detail=f"无效的偏移: {offset}")
+        return min(chunk_size, total_size - offset)
+
+    def expected_chunk_length(self, upload_id: str, offset: int, owner_id: int) -> int:
+        """读取请求体之前调用，返回该偏移处块的字节数，用于限制请求体大小"""
+        manifest = self._load_manifest(upload_id)
+        self._check_owner(manifest, owner_id)
+        return self._chunk_length(manifest, offset)
+
+    def write_chunk(
+        self,
+        upload_id: str,
+        offset: int,
+        data: bytes,
+        owner_id: int,
+        chunk_sha256: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """
+        按偏移写入一个块
+
+        偏移必须按块大小对齐；块内容的 sha256 记录在清单中，
+        同一位置重复发送相同内容时不会再次写盘。
+        """
+        digest = hashlib.sha256(data).hexdigest()
+        if chunk_sha256 and chunk_sha256.lower() != digest:
+            raise HTTPException(status_code=400, detail="块校验失败: sha256 不匹配")
+
+        with self._session_lock(upload_id):
+            manifest = self._load_manifest(upload_id)
+            self._check_owner(manifest, owner_id)
+            if manifest["status"] != "uploading":
+                return self._status(manifest)
+            if upload_id in self._finalizing:
+                raise HTTPException(status_code=409, detail="上传会话正在完成，不能再写入块")
+
+            chunk_size = manifest["chunk_size"]
+            expected = self._chunk_length(manifest, offset)
+            if len(data) != expected:
+                raise HTTPException(
+                    status_code=400,
+                    detail=f"块大小不正确: 期望 {expected} 字节，实际 {len(data)} 字节"
+                )
+
+            index = str(offset // chunk_size)
+            if manifest["chunks"].get(index) == digest:
+                return self._status(manifest)
+
+            with open(self._session_dir(upload_id) / "data.part", "r+b") as f:
+                f.seek(offset)
+                f.write(data)
+
+            if index not in manifest["chunks"]:
+                manifest["received_bytes"] += len(data)
+            manifest["chunks"][index] = digest
+            self._save_manifest(manifest)
+            return self._status(manifest)
+
+    def get_status(self, upload_id: str, owner_id: int) -> Dict[str, Any]:
+        """查询上传会话状态，客户端据此续传缺失的块"""
+        manifest = self._load_manifest(upload_id)
+        self._check_owner(manifest, owner_id)
+        return self._status(manifest)
+
+    def finalize_upload(self, upload_id: str, owner_id: int, db: Session) -> Dict[str, Any]:
+        """
+        完成上传
+
+        所有块到齐后校验整体 sha256（如果在 init 时提供），
+        然后把 .part 文件重命名到目标路径并创建数据库记录。
+        校验在会话锁外进行，期间该会话拒绝写入新块。
+        """
+        with self._session_lock(upload_id):
+            manifest = self._load_manifest(upload_id)
+            self._check_owner(manifest, owner_id)
+            if manifest["status"] == "completed":
+                return self._status(manifest)
+            if upload_id in self._finalizing:
+                raise HTTPException(status_code=409, detail="上传会话正在完成中")
+
+            status = self._status(manifest)
+            if status["missing_chunks"]:
+                raise HTTPException(
+                    status_code=409,
+                    detail=f"仍有 {len(status['missing_chunks'])} 个块未上传"
+                )
+            self._finalizing.add(upload_id)
+
+        try:
+            part_path = self._session_dir(upload_id) / "data.part"
+            if manifest["file_sha256"]:
+                hasher = hashlib.sha256()
+                with open(part_path, "rb") as f:
+                    for block in iter(lambda: f.read(settings.upload_chunk_size), b""):
+                        hasher.update(block)
+                if hasher.hexdigest() != manifest["file_sha256"]:
+                    raise HTTPException(status_code=400, detail="文件校验失败: sha256 不匹配")
+
+            with self._session_lock(upload_id):
+                manifest = self._load_manifest(upload_id)
+                target_path = Path(manifest["target_path"])
+                target_path.parent.mkdir(parents=True, exist_ok=True)
+                os.replace(part_path, target_path)
+                self._complete(manifest, target_path, db)
+                logger.info(f"上传会话 {upload_id} 完成: {target_path}")
+                return self._status(manifest)
+        finally:
+            with self._session_lock(upload_id):
+                self._finalizing.discard(upload_id)
+
+    def _complete(self, manifest: Dict[str, Any], target_path: Path, db: Optional[Session]) -> None:
+        manifest["status"] = "completed"
+        manifest["path"] = str(target_path)
+        if db is not None:
+            file_record = file_service.create_file_record(
+                db=db,
+                filename=manifest["filename"],
+                path=str(target_path),
+                owner_id=manifest["owner_id"]
+            )
+            manifest["file_id"] = file_record.id
+        self._session_dir(manifest["upload_id"]).mkdir(parents=True, exist_ok=True)
+        self._save_manifest(manifest)
+
+        if manifest["file_sha256"]:
+            self._record_index(self._index_key(manifest["owner_id"], manifest["file_sha256"]), target_path)
+
+    def abort_upload(self, upload_id: str, owner_id: int) -> None:
+        """放弃上传会话并删除已写入的数据"""
+        with self._session_lock(upload_id):
+            manifest = self._load_manifest(upload_id)
+            self._check_owner(manifest, owner_id)
+            if upload_id in self._finalizing:
+                raise HTTPException(status_code=409, detail="上传会话正在完成中")
+            session_dir = self._session_dir(upload_id)
+            for item in session_dir.iterdir():
+                item.unlink()
+            session_dir.rmdir()
+
+
+# 创建全局实例
+resumable_upload_service = ResumableUploadService()
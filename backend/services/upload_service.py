@@ -1,17 +1,22 @@
-from typing import List, Optional, Dict, Any, Union
+from typing import Callable, List, Optional, Dict, Any, Union
 from pathlib import Path
 from fastapi import UploadFile, HTTPException
-from sqlalchemy.orm import Session
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.ext.asyncio import AsyncSession
 from datetime import datetime
 import tempfile
+import asyncio
 import os
 
 import logging
 
 from ..core.config import settings
 from ..core.upload_config import UploadPolicyConfig
-from ..utils.file_util import validate_file_size, ensure_dir
+from ..utils.file_util import save_upload_file, ensure_dir
 from ..services import file_service
+from ..services.frame_extraction import extract_frames, probe_video, compute_frame_interval, FrameExtractionStats
+from ..services.job_queue import job_queue
+from ..database import SessionLocal
 
 logger = logging.getLogger(__name__)
 
@@ -22,6 +27,9 @@ except ImportError:
     CV2_AVAILABLE = False
     logger.warning("OpenCV (cv2) not available. Video frame extraction will not work.")
 
+# 视频帧提取任务类型
+VIDEO_FRAMES_JOB = "video_frames"
+
 class UploadResult:
     """上传结果封装"""
     def __init__(self):
@@ -70,16 +78,18 @@ class FileUploadService:
         return base_path
 
 
-    def _extract_video_frames(
+    async def _extract_video_frames(
         self,
         video_path: Path,
         output_folder: Path,
         extract_all_frames: bool = False,
         frame_rate: int = 5
-    ) -> int:
+    ) -> FrameExtractionStats:
         """
         从视频中提取帧
         
+        解码和编码都在线程池/进程池中完成，不阻塞事件循环。
+        
         Args:
             video_path: 视频文件路径
             output_folder: 输出文件夹路径
@@ -87,56 +97,87 @@ class FileUploadService:
             frame_rate: 每秒提取的帧数（当extract_all_frames为False时使用）
             
         Returns:
-            提取的帧数
+            帧提取统计信息
         """
         if not CV2_AVAILABLE:
             raise HTTPException(status_code=500, detail="OpenCV未安装，无法提取视频帧")
         
-        ensure_dir(str(output_folder))
+        try:
+            return await run_in_threadpool(
+                extract_frames,
+                video_path=video_path,
+                output_folder=output_folder,
+                extract_all_frames=extract_all_frames,
+                frame_rate=frame_rate,
+                encoder=settings.frame_encoder,
+                workers=settings.frame_extraction_workers,
+                encode_workers=settings.frame_encode_workers
+            )
+        except RuntimeError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+    
+    async def run_video_frames_job(
+        self,
+        payload: Dict[str, Any],
+        report_progress: Callable[[float], None]
+    ) -> Dict[str, Any]:
+        """
+        后台任务: 提取视频帧并为帧创建数据库记录
         
-        # 打开视频文件
-        video = cv2.VideoCapture(str(video_path))
-        if not video.isOpened():
-            raise HTTPException(status_code=400, detail=f"无法打开视频文件: {video_path.name}")
+        帧文件名由源帧序号决定，已有记录的帧不会重复入库，
+        因此任务在中断后重新执行是安全的。
+        """
+        video_path = Path(payload["video_path"])
+        output_folder = Path(payload["output_folder"])
+        owner_id = payload["owner_id"]
         
-        try:
-            # 获取视频信息
-            fps = video.get(cv2.CAP_PROP_FPS)
-            total_frames = int(video.get(cv2.CAP_PROP_FRAME_COUNT))
-            
-            logger.info(f"视频信息 - FPS: {fps}, 总帧数: {total_frames}")
-            
-            frame_count = 0
-            saved_count = 0
-            
-            # 计算帧间隔
-            if extract_all_frames:
-                frame_interval = 1
-            else:
-                frame_interval = max(1, int(fps / frame_rate))
-            
-            while True:
-                ret, frame = video.read()
-                if not ret:
-                    break
-                
-                # 判断是否保存当前帧
-                if frame_count % frame_interval == 0:
-                    # 生成帧文件名，格式: frame_000001.jpg
-                    frame_filename = f"frame_{saved_count:06d}.jpg"
-                    frame_path = output_folder / frame_filename
-                    
-                    # 保存帧
-                    cv2.imwrite(str(frame_path), frame)
-                    saved_count += 1
-                
-                frame_count += 1
-            
-            logger.info(f"成功提取 {saved_count} 帧，共处理 {frame_count} 帧")
-            return saved_count
-            
-        finally:
-            video.release()
+        fps, total_frames = await run_in_threadpool(probe_video, video_path)
+        frame_interval = compute_frame_interval(fps, payload["extract_all_frames"], payload["frame_rate"])
+        expected_frames = -(-total_frames // frame_interval) if total_frames > 0 else 0
+        
+        extraction = asyncio.ensure_future(self._extract_video_frames(
+            video_path=video_path,
+            output_folder=output_folder,
+            extract_all_frames=payload["extract_all_frames"],
+            frame_rate=payload["frame_rate"]
+        ))
+        def count_written_frames() -> int:
+            try:
+                with os.scandir(output_folder) as it:
+                    return sum(1 for entry in it if entry.name.startswith("frame_"))
+            except FileNotFoundError:
+                return 0
+        
+        # 抽帧在其他进程中进行，通过统计已写出的帧数估算进度；
+        # 上万帧的目录遍历放在线程池中，不阻塞事件循环
+        while not extraction.done():
+            await asyncio.wait({extraction}, timeout=settings.job_poll_interval)
+            if expected_frames and not extraction.done():
+                written = await run_in_threadpool(count_written_frames)
+                report_progress(0.9 * min(1.0, written / expected_frames))
+        stats = extraction.result()
+        
+        def create_frame_records() -> int:
+            db = SessionLocal()
+            try:
+                existing = file_service.get_file_paths_in_folder(db, owner_id, str(output_folder))
+                new_frames = [
+                    (frame_file.name, str(frame_file))
+                    for frame_file in sorted(output_folder.glob("frame_*"))
+                    if str(frame_file) not in existing
+                ]
+                file_service.create_file_records(db=db, files=new_frames, owner_id=owner_id, return_ids=False)
+                return len(new_frames)
+            finally:
+                db.close()
+        
+        await run_in_threadpool(create_frame_records)
+        logger.info(f"视频 {video_path.name} 成功提取 {stats.saved_frames} 帧到 {output_folder}")
+        return {
+            "frames_extracted": stats.saved_frames,
+            "frames_path": str(output_folder),
+            "frames_per_second": round(stats.frames_per_second, 1)
+        }
     
     def _is_video_file(self, filename: str) -> bool:
         """判断是否为视频文件"""
@@ -148,7 +189,7 @@ class FileUploadService:
         self,
         files: Union[UploadFile, List[UploadFile]],
         username: str,
-        db: Session,
+        db: AsyncSession,
         owner_id: int,
         stage: Optional[str] = None,
         final_folder_name: Optional[str] = None,
@@ -183,49 +224,23 @@ class FileUploadService:
             result.upload_path = upload_path
             logger.info(f"上传路径: {upload_path}, 文件夹: {final_folder_name}")
             
+            # 已保存但尚未入库的文件: (文件名, 路径, 大小)，循环结束后在一个事务中批量入库
+            saved_files = []
+            
             # 处理所有文件
             for file in file_list:
                 try:
                     if not file.filename:
                         raise ValueError("文件名不能为空")
                     
-                    # 读取文件内容
-                    file_content = await file.read()
-                    
-                    # 验证文件大小
-                    validate_file_size(file_content)
-                    
-                    # 保存文件
+                    # 分块流式保存文件，超过大小限制时提前中止
                     file_path = upload_path / file.filename
-                    with open(file_path, "wb") as f:
-                        f.write(file_content)
-                    
-                    # 创建数据库记录
-                    file_record = file_service.create_file_record(
-                        db=db,
-                        filename=file.filename,
-                        path=str(file_path),
-                        owner_id=owner_id
-                    )
-                    
-                    # 添加成功记录
-                    result.add_success({
-                        "file_record": {
-                            "id": file_record.id,
-                            "name": file_record.name,
-                            "path": file_record.path,
-                            "owner_id": file_record.owner_id
-                        },
-                        "file_info": {
-                            "filename": file.filename,
-                            "size": len(file_content),
-                            "path": str(file_path)
-                        }
-                    })
+                    file_size = await save_upload_file(file, file_path)
+                    saved_files.append((file.filename, str(file_path), file_size))
                     
                     # 如果是视频文件且upload_type为video，进行帧提取
                     if upload_type == 'video' and self._is_video_file(file.filename):
-                        logger.info(f"检测到视频文件 {file.filename}，开始提取帧")
+                        logger.info(f"检测到视频文件 {file.filename}，创建帧提取任务")
                         
                         # 生成帧保存文件夹名称，格式参照图片上传逻辑
                         # 格式: {username}_images_{timestamp} 或 {finalFolderName}_frames_{timestamp}
@@ -243,30 +258,32 @@ class FileUploadService:
                         )
                         
                         try:
-                            # 提取视频帧
-                            extracted_count = self._extract_video_frames(
-                                video_path=file_path,
-                                output_folder=frames_output_path,
-                                extract_all_frames=extract_all_frames,
-                                frame_rate=frame_rate
+                            # 帧提取和入库交给后台任务队列，请求立即返回
+                            job = await db.run_sync(
+                                job_queue.enqueue,
+                                job_type=VIDEO_FRAMES_JOB,
+                                payload={
+                                    "video_path": str(file_path),
+                                    "output_folder": str(frames_output_path),
+                                    "extract_all_frames": extract_all_frames,
+                                    "frame_rate": frame_rate,
+                                    "owner_id": owner_id
+                                },
+                                owner_id=owner_id
                             )
                             
-                            # 为每个提取的帧创建数据库记录
-                            for frame_file in frames_output_path.glob("frame_*.jpg"):
-                                frame_record = file_service.create_file_record(
-                                    db=db,
-                                    filename=frame_file.name,
-                                    path=str(frame_file),
-                                    owner_id=owner_id
-                                )
-                            
-                            logger.info(f"视频 {file.filename} 成功提取 {extracted_count} 帧到 {frames_output_path}")
-                            result.metadata['frames_extracted'] = extracted_count
+                            logger.info(f"视频 {file.filename} 的帧提取任务已入队: {job.id}")
+                            result.metadata.setdefault('jobs', []).append({
+                                "job_id": job.id,
+                                "job_type": VIDEO_FRAMES_JOB,
+                                "filename": file.filename,
+                                "frames_folder": frames_folder_name
+                            })
                             result.metadata['frames_folder'] = frames_folder_name
                             result.metadata['frames_path'] = str(frames_output_path)
                             
                         except Exception as e:
-                            logger.error(f"提取视频帧失败: {str(e)}")
+                            logger.error(f"创建帧提取任务失败: {str(e)}")
                             # 帧提取失败不影响视频文件的上传
                             result.metadata['frame_extraction_error'] = str(e)
                     
@@ -274,6 +291,32 @@ class FileUploadService:
                     result.add_failure(file.filename or "unknown", str(e))
                     continue
             
+            # 批量创建数据库记录
+            try:
+                records = await file_service.create_file_records_async(
+                    db=db,
+                    files=[(filename, path) for filename, path, _ in saved_files],
+                    owner_id=owner_id
+                )
+                for record, (filename, path, size) in zip(records, saved_files):
+                    result.add_success({
+                        "file_record": {
+                            "id": record.get("id"),
+                            "name": record["name"],
+                            "path": record["path"],
+                            "owner_id": record["owner_id"]
+                        },
+                        "file_info": {
+                            "filename": filename,
+                            "size": size,
+                            "path": path
+                        }
+                    })
+            except Exception as e:
+                logger.error(f"创建文件记录失败: {str(e)}")
+                for filename, _, _ in saved_files:
+                    result.add_failure(filename, f"创建文件记录失败: {str(e)}")
+            
             # 设置元数据
             result.set_metadata(
                 stage=stage,
@@ -291,4 +334,5 @@ class FileUploadService:
 
 
 # 创建全局实例
-upload_service = FileUploadService()
\ No newline at end of file
+upload_service = FileUploadService()
+job_queue.register(VIDEO_FRAMES_JOB)(upload_service.run_video_frames_job)
\ No newline at end of file
@@ -1,5 +1,7 @@
-from sqlalchemy.orm import Session
+from sqlalchemy import event
+from sqlalchemy.orm import Session, object_session
 from ..models import user_model
+from ..core.auth_cache import token_cache
 from ..core.security import hash_password, verify_password, create_access_token
 from fastapi import HTTPException, status
 
@@ -24,3 +26,22 @@ def authenticate_user(db: Session, username: str, password: str):
 def get_user_by_username(db: Session, username: str):
     """根据用户名获取用户"""
     return db.query(user_model.User).filter_by(username=username).first()
+
+
+# 用户被修改或删除后清除其 token 缓存。任何经 ORM 会话的修改都会经过这里；
+# 在提交后才清除，避免并发请求在提交前把旧数据重新放回缓存
+@event.listens_for(user_model.User, "after_update")
+@event.listens_for(user_model.User, "after_delete")
+def _mark_user_changed(mapper, connection, target):
+    session = object_session(target)
+    if session is not None:
+        session.info.setdefault("changed_user_ids", set()).add(target.id)
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_changed_users(session):
+    for user_id in session.info.pop("changed_user_ids", ()):
+        token_cache.invalidate_user(user_id)
+
+@event.listens_for(Session, "after_rollback")
+def _discard_changed_users(session):
+    session.info.pop("changed_user_ids", None)
@@ -0,0 +1,113 @@
+import os
+import time
+import threading
+from collections import OrderedDict
+from typing import List, NamedTuple, Optional, Set, Tuple
+from ..core.config import settings
+
+
+class DirEntry(NamedTuple):
+    """目录项元数据"""
+    name: str
+    path: str
+    is_dir: bool
+    size: int
+    ctime: float
+    mtime: float
+
+
+class DirectoryCache:
+    """
+    以目录 mtime 为键的目录元数据缓存
+
+    新增、删除、重命名目录项都会改变目录的 mtime，
+    因此只要目录 mtime 不变，缓存的列表和图片数量就仍然有效，
+    热路径上每次只需要一次 os.stat。冷路径使用 os.scandir 一次遍历。
+    缓存按 LRU 淘汰，条目数量受 settings.listing_cache_size 限制。
+    """
+
+    # mtime 距今小于该秒数时不使用缓存，避免文件系统时间戳精度导致漏掉同一时刻的修改
+    MTIME_SETTLE_SECONDS = 1.0
+
+    def __init__(self, max_entries: Optional[int] = None):
+        self.max_entries = max_entries or settings.listing_cache_size
+        self._listings: "OrderedDict[str, Tuple[int, List[DirEntry]]]" = OrderedDict()
+        self._image_counts: "OrderedDict[Tuple[str, frozenset], Tuple[int, int]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _get(self, cache: OrderedDict, key, mtime_ns: int):
+        with self._lock:
+            cached = cache.get(key)
+            if cached is None or cached[0] != mtime_ns:
+                return None
+            cache.move_to_end(key)
+            return cached[1]
+
+    def _put(self, cache: OrderedDict, key, mtime_ns: int, value) -> None:
+        # 刚被修改过的目录不缓存
+        if time.time() - mtime_ns / 1e9 < self.MTIME_SETTLE_SECONDS:
+            return
+        with self._lock:
+            cache[key] = (mtime_ns, value)
+            cache.move_to_end(key)
+            while len(cache) > self.max_entries:
+                cache.popitem(last=False)
+
+    def list_dir(self, path: str) -> List[DirEntry]:
+        """列出目录项（含大小和时间），目录未变化时直接返回缓存"""
+        mtime_ns = os.stat(path).st_mtime_ns
+        entries = self._get(self._listings, path, mtime_ns)
+        if entries is not None:
+            return entries
+
+        entries = []
+        with os.scandir(path) as it:
+            for entry in it:
+                try:
+                    stat = entry.stat()
+                    is_dir = entry.is_dir()
+                except OSError:
+                    # 遍历期间被删除
+                    continue
+                entries.append(DirEntry(
+                    name=entry.name,
+                    path=entry.path,
+                    is_dir=is_dir,
+                    size=stat.st_size,
+                    ctime=stat.st_ctime,
+                    mtime=stat.st_mtime
+                ))
+        entries.sort(key=lambda e: e.name)
+        self._put(self._listings, path, mtime_ns, entries)
+        return entries
+
+    def count_files(self, path: str, extensions: Set[str]) -> int:
+        """统计目录中指定扩展名的文件数量，目录未变化时直接返回缓存"""
+        key = (path, frozenset(extensions))
+        mtime_ns = os.stat(path).st_mtime_ns
+        count = self._get(self._image_counts, key, mtime_ns)
+        if count is not None:
+            return count
+
+        count = 0
+        with os.scandir(path) as it:
+            for entry in it:
+                if os.path.splitext(entry.name)[1].lower() in extensions:
+                    count += 1
+        self._put(self._image_counts, key, mtime_ns, count)
+        return count
+
+    def invalidate(self, path: Optional[str] = None) -> None:
+        """清除指定目录（或全部）的缓存"""
+        with self._lock:
+            if path is None:
+                self._listings.clear()
+                self._image_counts.clear()
+                return
+            self._listings.pop(path, None)
+            for key in [k for k in self._image_counts if k[0] == path]:
+                self._image_counts.pop(key, None)
+
+
+# 创建全局实例
+directory_cache = DirectoryCache()
@@ -2,6 +2,7 @@ import os
 from pathlib import Path
 from typing import Optional, Set
 from fastapi import HTTPException, UploadFile
+from fastapi.concurrency import run_in_threadpool
 from ..core.config import settings
 
 def ensure_dir(path: str):
@@ -43,11 +44,56 @@ def validate_file(file: UploadFile, allowed_types: Set[str]) -> None:
             detail=f"不支持的文件类型: {file.content_type}。支持的类型: {', '.join(allowed_types)}"
         )
 
-def validate_file_size(content: bytes, max_size: int = None) -> None:
+async def save_upload_file(
+    file: UploadFile,
+    dest_path: Path,
+    max_size: int = None,
+    chunk_size: int = None
+) -> int:
+    """
+    以固定大小的块将上传文件流式写入磁盘
+
+    边读边计数，超过大小限制时立即中止并删除已写入的部分，
+    因此单个上传的内存占用只与块大小有关，与文件大小无关。
+    打开、写入、重命名等磁盘操作都在线程池中执行，不阻塞事件循环。
+
+    Args:
+        file: 上传的文件
+        dest_path: 目标文件路径
+        max_size: 最大文件大小，默认使用 settings.max_file_size
+        chunk_size: 每次读取的块大小，默认使用 settings.upload_chunk_size
+
+    Returns:
+        写入的字节数
+    """
     max_size = max_size or settings.max_file_size
-    if len(content) > max_size:
-        raise HTTPException(
-            status_code=400, 
-            detail=f"文件大小超过限制 ({max_size // (1024*1024)}MB)"
-        )
+    chunk_size = chunk_size or settings.upload_chunk_size
+    dest_path = Path(dest_path)
+    # 先写入临时文件，完成后再重命名，避免留下不完整的目标文件
+    part_path = dest_path.with_name(dest_path.name + ".part")
+
+    total = 0
+    try:
+        f = await run_in_threadpool(open, part_path, "wb")
+        try:
+            while True:
+                chunk = await file.read(chunk_size)
+                if not chunk:
+                    break
+                total += len(chunk)
+                if total > max_size:
+                    raise HTTPException(
+                        status_code=400,
+                        detail=f"文件大小超过限制 ({max_size // (1024*1024)}MB)"
+                    )
+                await run_in_threadpool(f.write, chunk)
+            await run_in_threadpool(f.close)
+        finally:
+            # 出错或任务被取消时不能再 await，直接关闭（已关闭时为空操作）
+            f.close()
+        await run_in_threadpool(os.replace, part_path, dest_path)
+    except BaseException:
+        part_path.unlink(missing_ok=True)
+        raise
 
+    return total